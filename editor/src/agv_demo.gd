@@ -43,12 +43,22 @@ func _process_message(msg) -> void:
 		#print("Invalid message!", msg)
 		return
 	
-	var agv_transform = msg["agv_transforms"]
+	var agv_transforms: PackedFloat32Array = msg["agv_transforms"]
 	var agvs = $AGVs.get_children()
-	for i in len(agv_transform):
-		agvs[i].transform = agv_transform[i]
+	for i in len(agv_transforms) / 12:
+		agvs[i].transform = _transform_at(agv_transforms, i)
 	
-	var shelf_transform = msg["shelf_transforms"]
+	var shelf_transforms: PackedFloat32Array = msg["shelf_transforms"]
 	var shelves = $Shelves.get_children()
-	for i in len(shelf_transform):
-		shelves[i].transform = shelf_transform[i]
+	for i in len(shelf_transforms) / 12:
+		shelves[i].transform = _transform_at(shelf_transforms, i)
+
+## The i-th transform of a PackedFloat32Array of 12 floats per transform,
+## laid out like an encoded Transform3D: the rows of the basis, then the origin.
+func _transform_at(data: PackedFloat32Array, i: int) -> Transform3D:
+	var o := i * 12
+	var basis := Basis(
+		Vector3(data[o], data[o + 3], data[o + 6]),
+		Vector3(data[o + 1], data[o + 4], data[o + 7]),
+		Vector3(data[o + 2], data[o + 5], data[o + 8]))
+	return Transform3D(basis, Vector3(data[o + 9], data[o + 10], data[o + 11]))
@@ -1,19 +1,49 @@
 from gdmath import *
-from typing import Optional, MutableSequence, Sequence, Iterable
+from typing import Optional, MutableSequence, Sequence, Iterable, TYPE_CHECKING
 from abc import ABC, abstractmethod
 
 from sim.contents.sim_obj import SimObj
 from sim.data.property import SimInstanceProperty
+if TYPE_CHECKING:
+    from sim.contents.transform_store import TransformStore
+
+
+class _TransformProperty(SimInstanceProperty):
+    """SimInstanceProperty that the local transform of its Agent depends on."""
+
+    __slots__ = ()
+
+    def __set__(self, instance, value):
+        super().__set__(instance, value)
+        instance._transform_changed()
 
 
 class Agent(SimObj):
+    """
+    Node of the agent hierarchy.
+
+    global_transform is cached per agent and dropped for the whole subtree when the local transform or the parent
+    of an agent changes. Subclasses overriding transform are assumed to compute it on the fly (like from the sim time)
+    and are never cached, nor is anything below them, unless they set static_transform = True and call
+    _transform_changed() whenever their transform changes.
+    The TransformStore an agent is in is told about changes the same way.
+    """
+
     name = SimInstanceProperty()
+    static_transform = True
+    _transform_store: Optional["TransformStore"] = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "transform" in cls.__dict__ and "static_transform" not in cls.__dict__:
+            cls.static_transform = False
 
     def __init__(self, name: str):
         super().__init__()
         self.name = name
         self._children: MutableSequence[Agent] = []
         self._parent: Optional[Agent] = None
+        self._global_transform: Optional[Transform3D] = None
 
     def __repr__(self):
         return self.name
@@ -22,15 +52,18 @@ class Agent(SimObj):
         assert child._parent is None, "The agent already has a parent."
         self._children.append(child)
         child._parent = self
+        child._transform_changed()
 
     def remove_child(self, child: "Agent") -> None:
         assert child in self._children, "The agent is not a child of this agent."
         self._children.remove(child)
         child._parent = None
+        child._transform_changed()
 
     def clear_child(self) -> None:
         for c in self._children:
             c._parent = None
+            c._transform_changed()
         self._children.clear()
 
     def find_child(self, name: str) -> Optional["Agent"]:
@@ -53,7 +86,6 @@ class Agent(SimObj):
             self._parent.remove_child(self)
         value.add_child(self)
 
-
     def _xform(self, transform: Transform3D) -> Transform3D:
         """
         Transform a Transform3D with this agent's local transform.
@@ -77,16 +109,37 @@ class Agent(SimObj):
     def position(self, value: Vec3) -> None:
         raise AttributeError("This agent's position can't be set")
 
+    def _transform_changed(self) -> None:
+        """Drop the cached global transforms of this agent and its subtree, and tell its TransformStore."""
+        store = self._transform_store
+        if store is not None:
+            store._changed(self)
+        # A cached agent always has a cached parent, so the push-down can stop at agents without a cache
+        if self._global_transform is None:
+            return
+        stack = [self]
+        while stack:
+            agent = stack.pop()
+            agent._global_transform = None
+            for child in agent._children:
+                if child._global_transform is not None:
+                    stack.append(child)
+
     @property
     def global_transform(self) -> Transform3D:
         """
-        Calculate the transform of this agent from the root of its branch.
+        The transform of this agent from the root of its branch.
+        The result may be the cached one, which must not be modified.
         """
+        transform = self._global_transform
+        if transform is not None:
+            return transform
         transform = Transform3D(self.transform)
-        agent = self._parent
-        while agent is not None:
-            transform @= agent.transform
-            agent = agent._parent
+        parent = self._parent
+        if parent is not None:
+            transform @= parent.global_transform
+        if self.static_transform and (parent is None or parent._global_transform is not None):
+            self._global_transform = transform
         return transform
 
     @property
@@ -98,7 +151,10 @@ class Agent(SimObj):
 
 
 class SpatialAgent(Agent):
-    _transform: Transform3D = SimInstanceProperty()
+    """Agent with an arbitrary local transform, assign a new one instead of modifying it in place."""
+
+    _transform: Transform3D = _TransformProperty()
+    static_transform = True
 
     def __init__(self, name: str, transform: Transform3D):
         super().__init__(name)
@@ -122,23 +178,38 @@ class SpatialAgent(Agent):
 
     @position.setter
     def position(self, value: Vec3) -> None:
-        self.transform.origin = value
+        transform = Transform3D(self._transform)
+        transform.origin = value
+        self._transform = transform
 
 
 class PositionalAgent(Agent):
-    position: Vec3 = SimInstanceProperty()
+    """Agent with a translation only."""
+
+    position: Vec3 = _TransformProperty()
+    static_transform = True
 
     def __init__(self, name: str, position: Vec3):
+        self._transform: Optional[Transform3D] = None
         super().__init__(name)
         self.position = position
 
     def _xform(self, transform: Transform3D) -> Transform3D:
         transform.translate_ip(self.position)
+        return transform
+
+    def _transform_changed(self) -> None:
+        self._transform = None
+        super()._transform_changed()
 
     @property
     def transform(self) -> Transform3D:
-        return Transform3D.translating(self.position)
+        transform = self._transform
+        if transform is None:
+            transform = self._transform = Transform3D.translating(self.position)
+        return transform
 
     @transform.setter
     def transform(self, value: Transform3D) -> None:
-        self.transform = value
+        """Only the translation of value is kept."""
+        self.position = value.origin
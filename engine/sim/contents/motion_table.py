@@ -0,0 +1,145 @@
+from typing import Iterable, MutableMapping, MutableSequence, Optional, Sequence
+
+import numpy as np
+from gdmath import *
+
+from sim.contents.agent import Agent
+
+# Columns of a segment
+_START = slice(0, 3)
+_END = slice(3, 6)
+_START_ROTATION = 6
+_END_ROTATION = 7
+_START_TIME = 8
+_END_TIME = 9
+
+
+class MotionTable:
+    """
+    The current motion segment of every agent in a set, in one array, so that their poses at a time can be
+    evaluated for all of them at once.
+
+    A segment goes in a straight line from a start to an end pose between a start and an end time, a pose being a local
+    position and a rotation about the y axis. Before the start and after the end, the agent is at the start or the end
+    pose. An agent at rest has a segment with the same start and end pose.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self._segments = np.zeros((capacity, 10))
+        self._agents: MutableSequence[Agent] = []
+        self._rows: MutableMapping[Agent, int] = {}
+        # Incremented whenever rows are added or moved
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+    def __contains__(self, agent: Agent) -> bool:
+        return agent in self._rows
+
+    @property
+    def agents(self) -> Sequence[Agent]:
+        """The agents in the order of their rows."""
+        return tuple(self._agents)
+
+    def row_of(self, agent: Agent) -> Optional[int]:
+        return self._rows.get(agent)
+
+    def rows(self, agents: Iterable[Agent]) -> np.ndarray:
+        """The rows of agents, to pass to the batch queries repeatedly. Valid until an agent is removed."""
+        return np.array([self._rows[a] for a in agents], dtype=np.intp)
+
+    def add(self, agent: Agent, position: Vec3, rotation: float = 0.0, time: float = 0.0) -> None:
+        """Add agent, at rest."""
+        assert agent not in self._rows, "The agent is already in the table."
+        row = len(self._agents)
+        if row == len(self._segments):
+            self._segments = np.concatenate((self._segments, np.zeros_like(self._segments)))
+        self._agents.append(agent)
+        self._rows[agent] = row
+        self.version += 1
+        self.stop(agent, position, rotation, time)
+
+    def remove(self, agent: Agent) -> None:
+        row = self._rows.pop(agent)
+        last = len(self._agents) - 1
+        moved = self._agents.pop()
+        if row != last:
+            # Fill the hole with the last row
+            self._agents[row] = moved
+            self._rows[moved] = row
+            self._segments[row] = self._segments[last]
+        self.version += 1
+
+    def clear(self) -> None:
+        self._agents.clear()
+        self._rows.clear()
+        self.version += 1
+
+    def move(self, agent: Agent, start: Vec3, start_rotation: float, start_time: float,
+             end: Vec3, end_rotation: float, end_time: float) -> None:
+        """Set the segment of agent."""
+        self._segments[self._rows[agent]] = (*start, *end, start_rotation, end_rotation, start_time, end_time)
+
+    def stop(self, agent: Agent, position: Vec3, rotation: float, time: float) -> None:
+        """Put agent at rest at a pose."""
+        self.move(agent, position, rotation, time, position, rotation, time)
+
+    def _progress(self, row: int, time: float) -> tuple[Vec3, Vec3, float, float, float]:
+        x0, y0, z0, x1, y1, z1, r0, r1, t0, t1 = self._segments[row].tolist()
+        progress = min(max((time - t0) / (t1 - t0), 0.0), 1.0) if t1 > t0 else 0.0
+        return Vec3(x0, y0, z0), Vec3(x1, y1, z1), r0, r1, progress
+
+    def position(self, agent: Agent, time: float) -> Vec3:
+        start, end, _, _, progress = self._progress(self._rows[agent], time)
+        return start + (end - start) * progress
+
+    def rotation(self, agent: Agent, time: float) -> float:
+        _, _, start, end, progress = self._progress(self._rows[agent], time)
+        return start + (end - start) * progress
+
+    def transform(self, agent: Agent, time: float) -> Transform3D:
+        start, end, r0, r1, progress = self._progress(self._rows[agent], time)
+        return Transform3D.rotating(Vec3(0, 1, 0), r0 + (r1 - r0) * progress, origin=start + (end - start) * progress)
+
+    def _batch_progress(self, time: float, rows: Optional[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+        segments = self._segments[:len(self._agents)] if rows is None else self._segments[rows]
+        span = segments[:, _END_TIME] - segments[:, _START_TIME]
+        progress = np.divide(time - segments[:, _START_TIME], span, out=np.zeros_like(span), where=span > 0)
+        np.clip(progress, 0.0, 1.0, out=progress)
+        return segments, progress
+
+    def positions(self, time: float, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        The positions at time of the agents at rows (all of them by default), as a (n, 3) array.
+        :param rows: from rows()
+        """
+        segments, progress = self._batch_progress(time, rows)
+        start = segments[:, _START]
+        return start + (segments[:, _END] - start) * progress[:, None]
+
+    def rotations(self, time: float, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """The rotations at time of the agents at rows (all of them by default), as a (n,) array."""
+        segments, progress = self._batch_progress(time, rows)
+        start = segments[:, _START_ROTATION]
+        return start + (segments[:, _END_ROTATION] - start) * progress
+
+    def transforms(self, time: float, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        The local transforms at time of the agents at rows (all of them by default), as a (n, 4, 3) array of
+        the x, y and z basis vectors and the origin, like TransformStore.
+        """
+        segments, progress = self._batch_progress(time, rows)
+        start = segments[:, _START]
+        rotation = segments[:, _START_ROTATION]
+        rotation = rotation + (segments[:, _END_ROTATION] - rotation) * progress
+        cos = np.cos(rotation)
+        sin = np.sin(rotation)
+        result = np.zeros((len(segments), 4, 3))
+        result[:, 0, 0] = cos
+        result[:, 0, 2] = -sin
+        result[:, 1, 1] = 1.0
+        result[:, 2, 0] = sin
+        result[:, 2, 2] = cos
+        result[:, 3] = start + (segments[:, _END] - start) * progress[:, None]
+        return result
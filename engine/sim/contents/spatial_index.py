@@ -0,0 +1,190 @@
+import math
+from functools import partial
+from typing import Callable, Iterator, MutableMapping, MutableSequence, Optional, Sequence
+
+from gdmath import *
+
+from sim.contents.agent import Agent
+from sim.data.property import SimInstanceProperty
+
+Cell = tuple[int, int, int]
+
+
+class SpatialIndex:
+    """
+    Uniform grid hash of agents by position, for nearest and radius queries that only look at the nearby cells.
+
+    Agents are indexed by the position given to insert()/update(), or kept up to date by watch(). Queries rank
+    candidates by their exact position (position_func, global_position by default), which may be up to slack away
+    from the indexed one, e.g. for agents indexed at the point they drive from. Ties are broken by insertion order,
+    so results are deterministic.
+    """
+
+    def __init__(self, cell_size: float = 4.0, slack: float = 0.0,
+                 position_func: Callable[[Agent], Vec3] = lambda agent: agent.global_position):
+        """
+        :param cell_size: edge length of the cells, about the typical query radius works well
+        :param slack: how far the exact position of an agent may be from the indexed one
+        """
+        self.cell_size = cell_size
+        self.slack = slack
+        self.position_func = position_func
+        self._cells: MutableMapping[Cell, MutableSequence[Agent]] = {}
+        self._cell_of: MutableMapping[Agent, Cell] = {}
+        self._order: MutableMapping[Agent, int] = {}
+        self._next_order = 0
+        self._watches: MutableMapping[Agent, tuple[SimInstanceProperty, Callable[[], None]]] = {}
+        # Smallest and largest cell coordinates ever occupied, bounds the queries
+        self._min = [0, 0, 0]
+        self._max = [-1, -1, -1]
+
+    def __len__(self) -> int:
+        return len(self._cell_of)
+
+    def __contains__(self, agent: Agent) -> bool:
+        return agent in self._cell_of
+
+    def __iter__(self) -> Iterator[Agent]:
+        return iter(self._order)
+
+    def _cell(self, position: Vec3) -> Cell:
+        size = self.cell_size
+        return math.floor(position.x / size), math.floor(position.y / size), math.floor(position.z / size)
+
+    def insert(self, agent: Agent, position: Optional[Vec3] = None) -> None:
+        """Index agent at position, its exact position by default."""
+        assert agent not in self._cell_of, "The agent is already indexed."
+        self._order[agent] = self._next_order
+        self._next_order += 1
+        self._place(agent, self.position_func(agent) if position is None else position)
+
+    def _place(self, agent: Agent, position: Vec3) -> None:
+        cell = self._cell(position)
+        self._cell_of[agent] = cell
+        self._cells.setdefault(cell, []).append(agent)
+        if self._max[0] < self._min[0]:
+            self._min = list(cell)
+            self._max = list(cell)
+        else:
+            for i in range(3):
+                self._min[i] = min(self._min[i], cell[i])
+                self._max[i] = max(self._max[i], cell[i])
+
+    def _unplace(self, agent: Agent) -> None:
+        cell = self._cell_of.pop(agent)
+        agents = self._cells[cell]
+        agents.remove(agent)
+        if not agents:
+            del self._cells[cell]
+
+    def update(self, agent: Agent, position: Optional[Vec3] = None) -> None:
+        """Move agent to position, its exact position by default."""
+        position = self.position_func(agent) if position is None else position
+        if self._cell(position) != self._cell_of[agent]:
+            self._unplace(agent)
+            self._place(agent, position)
+
+    def remove(self, agent: Agent) -> None:
+        self.unwatch(agent)
+        self._unplace(agent)
+        del self._order[agent]
+
+    def watch(self, agent: Agent, prop: str | SimInstanceProperty, position: Optional[Callable[[], Vec3]] = None):
+        """
+        Insert agent if needed and update it whenever prop is set.
+        :param position: gives the position to index agent at after a change, its exact position by default
+        """
+        if isinstance(prop, str):
+            prop = getattr(type(agent), prop)
+        assert isinstance(prop, SimInstanceProperty), "Only SimInstanceProperties can be watched."
+        self.unwatch(agent)
+        if agent not in self._cell_of:
+            self.insert(agent, None if position is None else position())
+        if position is None:
+            callback = partial(self.update, agent)
+        else:
+            callback = lambda: self.update(agent, position())
+        prop.watch(agent, callback)
+        self._watches[agent] = prop, callback
+
+    def unwatch(self, agent: Agent) -> None:
+        watch = self._watches.pop(agent, None)
+        if watch is not None:
+            prop, callback = watch
+            prop.unwatch(agent, callback)
+
+    def _candidates(self, cells: Iterator[Cell], point: Vec3, predicate: Optional[Callable[[Agent], bool]],
+                    found: MutableSequence[tuple[float, int, Agent]]) -> None:
+        position_func = self.position_func
+        order = self._order
+        for cell in cells:
+            agents = self._cells.get(cell)
+            if agents is None:
+                continue
+            for agent in agents:
+                if predicate is None or predicate(agent):
+                    found.append((position_func(agent) | point, order[agent], agent))
+
+    def _ring(self, center: Cell, r: int) -> Iterator[Cell]:
+        """The occupied range of cells at Chebyshev distance r from center."""
+        lo = self._min
+        hi = self._max
+        cx, cy, cz = center
+        for x in range(max(cx - r, lo[0]), min(cx + r, hi[0]) + 1):
+            edge_x = abs(x - cx) == r
+            for y in range(max(cy - r, lo[1]), min(cy + r, hi[1]) + 1):
+                edge_y = edge_x or abs(y - cy) == r
+                if edge_y:
+                    for z in range(max(cz - r, lo[2]), min(cz + r, hi[2]) + 1):
+                        yield x, y, z
+                else:
+                    if cz - r >= lo[2]:
+                        yield x, y, cz - r
+                    if r > 0 and cz + r <= hi[2]:
+                        yield x, y, cz + r
+
+    def nearest(self, point: Vec3, k: int = 1, predicate: Optional[Callable[[Agent], bool]] = None) -> Sequence[Agent]:
+        """
+        The k agents nearest to point that satisfy predicate, nearest first.
+        Rings of cells are searched outwards until no unsearched agent can be nearer than the k-th found one.
+        """
+        if not self._cell_of:
+            return []
+        center = self._cell(point)
+        # Rings beyond this one hold no cells
+        last = max(max(abs(center[i] - self._min[i]), abs(center[i] - self._max[i])) for i in range(3))
+        found: MutableSequence[tuple[float, int, Agent]] = []
+        for r in range(last + 1):
+            self._candidates(self._ring(center, r), point, predicate, found)
+            if len(found) >= k:
+                found.sort(key=lambda c: (c[0], c[1]))
+                # Agents outside rings 0 to r are at least r cells away from point
+                if found[k - 1][0] <= r * self.cell_size - self.slack:
+                    break
+        found.sort(key=lambda c: (c[0], c[1]))
+        return [agent for _, _, agent in found[:k]]
+
+    def within(self, point: Vec3, radius: float, predicate: Optional[Callable[[Agent], bool]] = None) -> Sequence[Agent]:
+        """The agents within radius of point that satisfy predicate, nearest first."""
+        if not self._cell_of:
+            return []
+        reach = radius + self.slack
+        lo = [max(c, m) for c, m in zip(self._cell(point - Vec3(reach)), self._min)]
+        hi = [min(c, m) for c, m in zip(self._cell(point + Vec3(reach)), self._max)]
+        cells = (
+            (x, y, z)
+            for x in range(lo[0], hi[0] + 1) for y in range(lo[1], hi[1] + 1) for z in range(lo[2], hi[2] + 1)
+        )
+        found: MutableSequence[tuple[float, int, Agent]] = []
+        self._candidates(cells, point, predicate, found)
+        found.sort(key=lambda c: (c[0], c[1]))
+        return [agent for distance, _, agent in found if distance <= radius]
+
+    def clear(self) -> None:
+        for agent in list(self._watches):
+            self.unwatch(agent)
+        self._cells.clear()
+        self._cell_of.clear()
+        self._order.clear()
+        self._min = [0, 0, 0]
+        self._max = [-1, -1, -1]
@@ -0,0 +1,229 @@
+from itertools import chain
+from typing import Callable, Iterable, MutableMapping, MutableSequence, MutableSet, Optional, Sequence
+
+import numpy as np
+from gdmath import *
+
+from sim.contents.agent import Agent
+from sim.contents.motion_table import MotionTable
+
+
+def _rows(transforms: Iterable[Transform3D], count: int) -> np.ndarray:
+    """count transforms as a (count, 4, 3) array."""
+    values = chain.from_iterable((*t.x, *t.y, *t.z, *t.origin) for t in transforms)
+    return np.fromiter(values, dtype=np.float64, count=12 * count).reshape(count, 4, 3)
+
+
+class TransformStore:
+    """
+    Structure-of-arrays copy of the local transforms of a set of agents, their global transforms are computed for
+    all of them at once with a few NumPy operations per level of the hierarchy.
+
+    A transform is stored as a (4, 3) row: the x, y and z basis vectors then the origin, the layout of Transform3D in
+    gd_serialize. Agents in the store report changes of their local transform and parent through _transform_changed(),
+    so only the changed rows are copied again, agents without a static transform are copied on every pass, all at once
+    from the MotionTable for the ones in it. The parents of the agents in the store are added to it as needed, up to
+    the roots, so that every pass is done in NumPy.
+    """
+
+    def __init__(self, capacity: int = 64, motions: Optional[MotionTable] = None,
+                 clock: Optional[Callable[[], float]] = None):
+        """
+        :param motions: the local transforms of the agents in it are evaluated there
+        :param clock: gives the time to evaluate motions at, required with motions
+        """
+        assert motions is None or clock is not None, "A clock is required to evaluate the motions."
+        self._local = np.zeros((capacity, 4, 3))
+        self._global = np.zeros((capacity, 4, 3))
+        self._agents: MutableSequence[Agent] = []
+        self._slots: MutableMapping[Agent, int] = {}
+        self._parents: MutableSequence[Optional[Agent]] = []
+        self._dirty: MutableSet[int] = set()
+        self.motions = motions
+        self.clock = clock
+        # Slots of the agents without a static transform outside motions, then the ones in it and their motion rows
+        self._dynamic: Optional[np.ndarray] = None
+        self._moving: tuple[np.ndarray, np.ndarray] = np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+        self._motions_version = -1
+        # The roots, then (slots, parent slots) by depth
+        self._levels: Optional[tuple[np.ndarray, Sequence[tuple[np.ndarray, np.ndarray]]]] = None
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+    def __contains__(self, agent: Agent) -> bool:
+        return agent in self._slots
+
+    @property
+    def agents(self) -> Sequence[Agent]:
+        """The agents in the order of their rows."""
+        return tuple(self._agents)
+
+    def add(self, agent: Agent) -> None:
+        assert agent._transform_store is None, "The agent is already in a store."
+        slot = len(self._agents)
+        if slot == len(self._local):
+            self._local = np.concatenate((self._local, np.zeros_like(self._local)))
+            self._global = np.concatenate((self._global, np.zeros_like(self._global)))
+        agent._transform_store = self
+        self._agents.append(agent)
+        self._slots[agent] = slot
+        self._parents.append(agent._parent)
+        self._dirty.add(slot)
+        self._levels = None
+        if not agent.static_transform:
+            self._dynamic = None
+
+    def add_subtree(self, root: Agent) -> None:
+        """Add root and all the agents below it that are not in the store yet."""
+        stack = [root]
+        while stack:
+            agent = stack.pop()
+            if agent not in self._slots:
+                self.add(agent)
+            stack.extend(reversed(agent._children))
+
+    def remove(self, agent: Agent) -> None:
+        """Remove agent, it is added again on the next pass if it is still the parent of an agent in the store."""
+        slot = self._slots.pop(agent)
+        agent._transform_store = None
+        last = len(self._agents) - 1
+        moved = self._agents.pop()
+        parent = self._parents.pop()
+        self._dirty.discard(last)
+        if slot != last:
+            # Fill the hole with the last row
+            self._agents[slot] = moved
+            self._parents[slot] = parent
+            self._slots[moved] = slot
+            self._local[slot] = self._local[last]
+            self._dirty.add(slot)
+        self._levels = None
+        self._dynamic = None
+
+    def clear(self) -> None:
+        for agent in self._agents:
+            agent._transform_store = None
+        self._agents.clear()
+        self._slots.clear()
+        self._parents.clear()
+        self._dirty.clear()
+        self._levels = None
+        self._dynamic = None
+
+    def _changed(self, agent: Agent) -> None:
+        """Called by agent when its local transform or its parent changed."""
+        self._dirty.add(self._slots[agent])
+
+    def _sync(self) -> None:
+        while True:
+            self._read_changes()
+            if self._levels is not None:
+                return
+            if not self._add_parents():
+                self._build_levels()
+                return
+
+    def _split_dynamic(self) -> None:
+        motions = self.motions
+        dynamic = []
+        moving = []
+        for i, agent in enumerate(self._agents):
+            if not agent.static_transform:
+                (moving if motions is not None and agent in motions else dynamic).append(i)
+        self._dynamic = np.array(dynamic, dtype=np.intp)
+        if motions is not None:
+            self._moving = np.array(moving, dtype=np.intp), motions.rows(self._agents[i] for i in moving)
+            self._motions_version = motions.version
+
+    def _read_changes(self) -> None:
+        agents = self._agents
+        local = self._local
+        if self._dynamic is None or self.motions is not None and self.motions.version != self._motions_version:
+            self._split_dynamic()
+        dirty = self._dirty
+        if dirty:
+            slots = np.fromiter(dirty, dtype=np.intp, count=len(dirty))
+            dirty.clear()
+            local[slots] = _rows((agents[i].transform for i in slots), len(slots))
+            parents = self._parents
+            for i in slots.tolist():
+                parent = agents[i]._parent
+                if parent is not parents[i]:
+                    parents[i] = parent
+                    self._levels = None
+        slots = self._dynamic
+        if len(slots):
+            local[slots] = _rows((agents[i].transform for i in slots), len(slots))
+        slots, rows = self._moving
+        if len(slots):
+            local[slots] = self.motions.transforms(self.clock(), rows)
+
+    def _add_parents(self) -> bool:
+        """Add the parents missing from the store, return whether there were any."""
+        added = False
+        parents = self._parents
+        i = 0
+        # add() appends to parents, so this reaches the roots
+        while i < len(parents):
+            parent = parents[i]
+            if parent is not None and parent not in self._slots:
+                self.add(parent)
+                added = True
+            i += 1
+        return added
+
+    def _build_levels(self) -> None:
+        slots = self._slots
+        parent_slots = [slots[p] if p is not None else -1 for p in self._parents]
+        depths = [-1] * len(parent_slots)
+        for i in range(len(parent_slots)):
+            # Walk up to the first agent with a known depth, then assign the depths on the way back
+            chain = []
+            j = i
+            while j != -1 and depths[j] == -1:
+                chain.append(j)
+                j = parent_slots[j]
+            depth = depths[j] if j != -1 else -1
+            for j in reversed(chain):
+                depth += 1
+                depths[j] = depth
+
+        by_depth: MutableMapping[int, MutableSequence[int]] = {}
+        for i, depth in enumerate(depths):
+            by_depth.setdefault(depth, []).append(i)
+        levels = []
+        for depth in sorted(by_depth):
+            if depth > 0:
+                level = np.array(by_depth[depth], dtype=np.intp)
+                levels.append((level, np.array([parent_slots[i] for i in level], dtype=np.intp)))
+        self._levels = np.array(by_depth.get(0, ()), dtype=np.intp), levels
+
+    def _compute(self) -> np.ndarray:
+        self._sync()
+        local = self._local
+        result = self._global
+        roots, levels = self._levels
+        result[roots] = local[roots]
+        for level, parents in levels:
+            # global = parent global @ local, with the (4, 3) rows: local rows @ parent basis, plus the parent origin
+            parent = result[parents]
+            result[level] = np.matmul(local[level], parent[:, :3])
+            result[level, 3] += parent[:, 3]
+        return result
+
+    def slots(self, agents: Iterable[Agent]) -> np.ndarray:
+        """The rows of agents, to pass to global_transforms() repeatedly. Valid until an agent is removed."""
+        return np.array([self._slots[a] for a in agents], dtype=np.intp)
+
+    def global_transforms(self, agents: Optional[Iterable[Agent] | np.ndarray] = None) -> np.ndarray:
+        """
+        The global transforms of agents (all the agents in the store by default), as a new (n, 4, 3) array.
+        :param agents: agents in the store, or their rows from slots()
+        """
+        result = self._compute()
+        if agents is None:
+            return result[:len(self._agents)].copy()
+        if not isinstance(agents, np.ndarray):
+            agents = self.slots(agents)
+        return result[agents]
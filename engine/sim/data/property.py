@@ -1,6 +1,6 @@
 from weakref import WeakSet
 from abc import ABC, abstractmethod
-from typing import MutableSequence
+from typing import MutableSequence, Callable
 
 
 class SimProperty(ABC):
@@ -48,6 +48,7 @@ class SimInstanceProperty(SimProperty):
     __slots__ = (
         "value_name",
         "dirty_name",
+        "watchers_name",
         "instances",
     )
 
@@ -60,12 +61,30 @@ class SimInstanceProperty(SimProperty):
 
         self.value_name: str = f"_sim_value_{name}"
         self.dirty_name: str = f"_sim_dirty_{name}"
+        self.watchers_name: str = f"_sim_watchers_{name}"
 
         self.instances: WeakSet = WeakSet()
 
     def __get__(self, instance, owner):
+        if instance is None:
+            return self
         return getattr(instance, self.value_name)
 
     def __set__(self, instance, value):
         setattr(instance, self.value_name, value)
         setattr(instance, self.dirty_name, True)
+        watchers = getattr(instance, self.watchers_name, None)
+        if watchers:
+            for callback in tuple(watchers):
+                callback()
+
+    def watch(self, instance, callback: Callable[[], None]) -> None:
+        """Call callback every time this property of instance is set."""
+        watchers = getattr(instance, self.watchers_name, None)
+        if watchers is None:
+            watchers = {}
+            setattr(instance, self.watchers_name, watchers)
+        watchers[callback] = None
+
+    def unwatch(self, instance, callback: Callable[[], None]) -> None:
+        getattr(instance, self.watchers_name).pop(callback, None)
@@ -1,21 +1,21 @@
+import array
 import enum
-import struct
-from math import ceil
-from struct import pack
-from typing import Any, Sequence, Mapping, Union
+from functools import partial
+from itertools import chain
+from struct import Struct
+from typing import Any, Callable, MutableMapping, Sequence, Mapping, Union
 
+import numpy as np
 from gdmath import *
 
 
-def _header(value_type: int, flags: int = 0) -> bytes:
-    return struct.pack("<i", value_type + (flags << 16))
-
-def _gd_float(n: int):
-    return f"<{n}f"
+def _header(value_type: int, flags: int = 0) -> int:
+    return value_type + (flags << 16)
 
 
 class GDArrayType(enum.Enum):
     Any = enum.auto()
+    Byte = enum.auto()
     Int32 = enum.auto()
     Int64 = enum.auto()
     Int = Int32
@@ -28,11 +28,6 @@ class GDArrayType(enum.Enum):
     Color = enum.auto()
 
 
-def _pad(dat: bytes) -> bytes:
-    if len(dat) % 4 == 0:
-        return dat
-    return dat + b"\x00" * (4 - len(dat) % 4)
-
 _Serializable = Union[
     None,
     bool,
@@ -44,98 +39,227 @@ _Serializable = Union[
     Transform2D,
     Transform3D,
     Vec4,
-    bytes
+    bytes,
+    np.ndarray,
+    array.array,
 ]
 _Serializable = Union[_Serializable, Sequence[_Serializable], Mapping[_Serializable, _Serializable]]
 
+# Writers append the serialization of a value to a bytearray
+_Writer = Callable[[bytearray, Any], None]
+
+# Every value starts with its header, packed together with the fixed size part of the value
+_NIL = Struct("<i").pack(_header(0))
+_BOOL = partial(Struct("<ii").pack, _header(1))
+_INT = partial(Struct("<ii").pack, _header(2, 0))
+_INT64 = partial(Struct("<iq").pack, _header(2, 1))
+_FLOAT = partial(Struct("<id").pack, _header(3, 1))
+_VEC2 = partial(Struct("<i2f").pack, _header(5))
+_VEC3 = partial(Struct("<i3f").pack, _header(9))
+_TRANSFORM2D = partial(Struct("<i6f").pack, _header(11))
+_TRANSFORM3D = partial(Struct("<i12f").pack, _header(18))
+_VEC4 = partial(Struct("<i4f").pack, _header(20))
+# Header and size
+_SIZED = Struct("<ii").pack
+_INT32 = Struct("<i").pack
+_PADDING = (b"", b"\x00\x00\x00", b"\x00\x00", b"\x00")
+
+
+def _write_none(out: bytearray, _) -> None:
+    out += _NIL
+
+
+def _write_bool(out: bytearray, value: bool) -> None:
+    out += _BOOL(int(value))
+
+
+def _write_int(out: bytearray, value: int) -> None:
+    if -0x80000000 <= value <= 0x7FFFFFFF:
+        out += _INT(value)
+    else:
+        out += _INT64(value)
+
+
+def _write_float(out: bytearray, value: float) -> None:
+    out += _FLOAT(value)
+
+
+def _write_str(out: bytearray, value: str) -> None:
+    bytes_str = value.encode("utf8")
+    out += _SIZED(_header(4), len(bytes_str))
+    out += bytes_str
+    out += _PADDING[len(bytes_str) % 4]
+
+
+def _write_vec2(out: bytearray, value: Vec2) -> None:
+    out += _VEC2(*value)
+
+
+def _write_vec3(out: bytearray, value: Vec3) -> None:
+    out += _VEC3(*value)
+
+
+def _write_transform2d(out: bytearray, value: Transform2D) -> None:
+    out += _TRANSFORM2D(*value.x, *value.y, *value.origin)
+
+
+def _write_transform3d(out: bytearray, value: Transform3D) -> None:
+    out += _TRANSFORM3D(*value.x, *value.y, *value.z, *value.origin)
+
+
+def _write_vec4(out: bytearray, value: Vec4) -> None:
+    out += _VEC4(*value)
+
+
+def _write_mapping(out: bytearray, value: Mapping) -> None:
+    out += _SIZED(_header(27), len(value))
+    writers = _writers
+    for k, v in value.items():
+        (writers.get(type(k)) or _resolve(type(k)))(out, k)
+        (writers.get(type(v)) or _resolve(type(v)))(out, v)
+
+
+def _write_sequence(out: bytearray, value: Sequence) -> None:
+    out += _SIZED(_header(28), len(value))
+    writers = _writers
+    # Arrays mostly hold values of one type
+    last_type = writer = None
+    for v in value:
+        if type(v) is not last_type:
+            last_type = type(v)
+            writer = writers.get(last_type) or _resolve(last_type)
+        writer(out, v)
+
+
+# Packed arrays: (header, element dtype, components per element) by array type
+_PACKED = {
+    GDArrayType.Byte: (_header(29), np.dtype("u1"), 1),
+    GDArrayType.Int32: (_header(30), np.dtype("<i4"), 1),
+    GDArrayType.Int64: (_header(31), np.dtype("<i8"), 1),
+    GDArrayType.Float32: (_header(32), np.dtype("<f4"), 1),
+    GDArrayType.Float64: (_header(33), np.dtype("<f8"), 1),
+    GDArrayType.Vec2: (_header(35), np.dtype("<f4"), 2),
+    GDArrayType.Vec3: (_header(36), np.dtype("<f4"), 3),
+    GDArrayType.Color: (_header(37), np.dtype("<f4"), 4),
+}
+
+
+def _write_packed(out: bytearray, value: Any, array_type: GDArrayType) -> None:
+    """
+    Write value as a packed array. value is anything supporting the buffer protocol, converted as a whole with all its
+    components flattened, or a Sequence of numbers, or of vectors for the vector types.
+    """
+    header, dtype, width = _PACKED[array_type]
+    try:
+        data = value if isinstance(value, np.ndarray) else np.asarray(memoryview(value))
+    except TypeError:
+        numbers = value if width == 1 else chain.from_iterable(value)
+        data = np.fromiter(numbers, dtype=dtype, count=len(value) * width)
+    data = np.ascontiguousarray(data, dtype=dtype)
+    assert data.size % width == 0, "The components don't make up whole elements."
+    out += _SIZED(header, data.size // width)
+    out += data.reshape(-1).data
+    if array_type is GDArrayType.Byte:
+        out += _PADDING[data.size % 4]
+
+
+def _write_strings(out: bytearray, value: Sequence[str]) -> None:
+    out += _SIZED(_header(34), len(value))
+    for v in value:
+        # Null terminated, and the length includes the terminator
+        bytes_str = v.encode("utf8") + b"\x00"
+        out += _INT32(len(bytes_str))
+        out += bytes_str
+        out += _PADDING[len(bytes_str) % 4]
+
+
+def _write_typed(out: bytearray, value: Any, array_type: GDArrayType) -> None:
+    if array_type is GDArrayType.Any:
+        _write_sequence(out, value)
+    elif array_type is GDArrayType.String:
+        _write_strings(out, value)
+    else:
+        _write_packed(out, value, array_type)
+
+
+def _packed_type(dtype: np.dtype) -> GDArrayType:
+    """The packed array type for elements of dtype."""
+    if dtype == np.uint8:
+        return GDArrayType.Byte
+    if dtype.kind == "f":
+        return GDArrayType.Float32 if dtype.itemsize <= 4 else GDArrayType.Float64
+    if dtype.kind in "biu":
+        return GDArrayType.Int32 if np.can_cast(dtype, np.int32) else GDArrayType.Int64
+    raise TypeError(f"No packed array holds {dtype}")
+
+
+def _write_buffer(out: bytearray, value: Any) -> None:
+    data = value if isinstance(value, np.ndarray) else np.asarray(memoryview(value))
+    _write_packed(out, data, _packed_type(data.dtype))
+
+
+# Writers by exact type, subclasses are resolved by _resolve() and added on first use
+_writers: MutableMapping[type, _Writer] = {
+    type(None): _write_none,
+    bool: _write_bool,
+    int: _write_int,
+    float: _write_float,
+    str: _write_str,
+    Vec2: _write_vec2,
+    Vec3: _write_vec3,
+    Transform2D: _write_transform2d,
+    Transform3D: _write_transform3d,
+    Vec4: _write_vec4,
+    dict: _write_mapping,
+    list: _write_sequence,
+    tuple: _write_sequence,
+    bytes: _write_buffer,
+    bytearray: _write_buffer,
+    memoryview: _write_buffer,
+    array.array: _write_buffer,
+    np.ndarray: _write_buffer,
+}
+
+# In the order a value is checked against them
+_writers_by_base: Sequence[tuple[type | tuple[type, ...], _Writer]] = (
+    (bool, _write_bool),
+    (int, _write_int),
+    (float, _write_float),
+    (str, _write_str),
+    (Vec2, _write_vec2),
+    (Vec3, _write_vec3),
+    (Transform2D, _write_transform2d),
+    (Transform3D, _write_transform3d),
+    (Vec4, _write_vec4),
+    (Mapping, _write_mapping),
+    ((bytes, bytearray, memoryview, array.array, np.ndarray), _write_buffer),
+    (Sequence, _write_sequence),
+)
+
+
+def _resolve(cls: type) -> _Writer:
+    for base, writer in _writers_by_base:
+        if issubclass(cls, base):
+            _writers[cls] = writer
+            return writer
+    raise TypeError(f"Can not serialize {cls.__name__}")
+
+
+def gd_serialize_into(out: bytearray, value: _Serializable, array_type: GDArrayType = None) -> None:
+    """
+    Append the serialization of value to out, so that a buffer can be reused from message to message.
+    Buffers (NumPy arrays, array.array, bytes...) are written as the packed array of their element type by default,
+    with all their components flattened, like the float32 transforms of a TransformStore.
+    :param array_type: element type of value if it is a Sequence or a buffer
+    """
+    writer = _writers.get(type(value)) or _resolve(type(value))
+    if array_type is not None and (writer is _write_sequence or writer is _write_buffer):
+        _write_typed(out, value, array_type)
+    else:
+        writer(out, value)
+
+
 def gd_serialize(value: _Serializable, array_type: GDArrayType = None) -> bytes:
-    if value is None:
-        return _header(0)
-
-    if isinstance(value, bool):
-        return _header(1) + pack("<i", int(value))
-
-    if isinstance(value, int):
-        if -0x80000000 <= value <= 0x7FFFFFFF:
-            return _header(2, 0) + pack("<i", value)
-        else:
-            return _header(2, 1) + pack("<q", value)
-
-    if isinstance(value, float):
-        return _header(3, 1) + pack("<d", value)
-
-    if isinstance(value, str):
-        bytes_str = value.encode("utf8")
-        return _header(4) + pack("<i", len(bytes_str)) + _pad(bytes_str)
-
-    if isinstance(value, Vec2):
-        return _header(5) + pack(_gd_float(2), *value)
-
-    if isinstance(value, Vec3):
-        return _header(9) + pack(_gd_float(3), *value)
-
-    if isinstance(value, Transform2D):
-        return _header(11) + pack(_gd_float(6), *value.x, *value.y, *value.origin)
-
-    if isinstance(value, Transform3D):
-        return _header(18) + pack(_gd_float(12), *value.x, *value.y, *value.z, *value.origin)
-
-    if isinstance(value, Vec4):
-        return _header(20) + pack(_gd_float(4), *value)
-
-    if isinstance(value, Mapping):
-        dat = _header(27) + pack("<i", len(value))
-        for k, v in value.items():
-            dat += gd_serialize(k)
-            dat += gd_serialize(v)
-        return dat
-
-    if isinstance(value, Sequence):
-        if array_type is None:
-            array_type = GDArrayType.Any
-        dat = {
-            GDArrayType.Any: _header(28),
-            # TODO: FIX GD SERIALIZE
-            # GDArrayType.Int32: _header(21),
-            # GDArrayType.Int64: _header(22),
-            # GDArrayType.Float32: _header(23),
-            # GDArrayType.Float64: _header(24),
-            # GDArrayType.String: _header(25),
-            # GDArrayType.Vec2: _header(26),
-            # GDArrayType.Vec3: _header(27),
-            # GDArrayType.Color: _header(28),
-        }[array_type] + pack("<i", len(value))
-        match array_type:
-            case GDArrayType.Any:
-                for v in value:
-                    dat += gd_serialize(v)
-            case GDArrayType.Int32, GDArrayType.Int64, GDArrayType.Float32, GDArrayType.Float64:
-                fmt = "<" + {
-                    GDArrayType.Int32: "i",
-                    GDArrayType.Int64: "q",
-                    GDArrayType.Float32: "f",
-                    GDArrayType.Float64: "d",
-                }[array_type] * len(array_type)
-                dat += pack(fmt, *value)
-            case GDArrayType.String:
-                for v in value:
-                    bytes_str = v.encode("utf8")
-                    dat += pack("<i", len(bytes_str))
-                    dat += _pad(bytes_str)
-            case GDArrayType.Vec2, GDArrayType.Vec3, GDArrayType.Color:
-                def it():
-                    for vec in value:
-                        for n in vec:
-                            yield n
-                cnt = {
-                    GDArrayType.Vec2: 2,
-                    GDArrayType.Vec3: 3,
-                    GDArrayType.Color: 4
-                }[array_type]
-                dat += pack(_gd_float(len(value) * cnt), *it())
-        return dat
-
-    if isinstance(value, bytes) or isinstance(value, bytearray):
-        if not isinstance(value, bytes):
-            value = bytes(value)
-        return _header(29) + pack("<i", len(value)) + _pad(value)
+    out = bytearray()
+    gd_serialize_into(out, value, array_type)
+    return bytes(out)
@@ -1,23 +1,39 @@
 from abc import ABC, abstractmethod
-from typing import Callable
+from typing import Callable, Optional, Iterable, Sequence
 
 import sim.simulator
 
 
 class Event(ABC):
+    __slots__ = "_handle",
+
     def __init__(self):
-        pass
+        # Handle of the last time this event was scheduled, see EventQueue.add()
+        self._handle: Optional["sim.event.event_queue.EventHandle"] = None
 
     @abstractmethod
     def execute(self, simulator: "sim.simulator.Simulator") -> None:
         pass
 
+    @classmethod
+    def execute_batch(cls, events: Sequence["Event"], simulator: "sim.simulator.Simulator") -> None:
+        """
+        Execute events of exactly this class sharing a sim_time at once, see Simulator.batch_execution.
+        Override to process the batch in one go (e.g. with NumPy), classes that don't are executed one by one in order.
+        """
+        for event in events:
+            event.execute(simulator)
+
 class TimedEvent(Event, ABC):
+    __slots__ = "sim_time",
+
     def __init__(self, sim_time: float):
         super().__init__()
         self.sim_time = sim_time
 
 class TimedEventImpl(TimedEvent):
+    __slots__ = "execute_func",
+
     def __init__(self, sim_time: float, execute_func: Callable[["TimedEventImpl", "sim.simulator.Simulator"], None]):
         super().__init__(sim_time)
 
@@ -26,17 +42,48 @@ class TimedEventImpl(TimedEvent):
     def execute(self, simulator: "sim.simulator.Simulator") -> None:
         self.execute_func(self, simulator)
 
+class CallbackEvent(TimedEvent):
+    """A callback scheduled with EventQueue.schedule_at(), only created when it has to be handled as an Event."""
+
+    __slots__ = "callback", "args"
+
+    def __init__(self, sim_time: float, callback: Callable, args: tuple):
+        super().__init__(sim_time)
+
+        self.callback = callback
+        self.args = args
+
+    def execute(self, simulator: "sim.simulator.Simulator") -> None:
+        self.callback(*self.args)
+
+# (object, property) pairs a ConditionalEvent depends on, properties may be given by name
+Dependencies = Iterable[tuple["sim.contents.sim_obj.SimObj", "sim.data.property.SimInstanceProperty | str"]]
+
 class ConditionalEvent(Event, ABC):
-    def __init__(self):
+    __slots__ = "dependencies",
+
+    def __init__(self, dependencies: Optional[Dependencies] = None):
+        """
+        :param dependencies: the SimInstanceProperties check() reads, the event is only checked again after one of them
+            is set. None means check() is polled after every event.
+        """
         super().__init__()
+        self.dependencies = dependencies
 
     @abstractmethod
     def check(self) -> bool:
         pass
 
 class ConditionalEventImpl(ConditionalEvent):
-    def __init__(self, check_func: Callable[[], bool], execute_func: Callable[["sim.simulator.Simulator"], None]):
-        super().__init__()
+    __slots__ = "check_func", "execute_func"
+
+    def __init__(
+        self,
+        check_func: Callable[[], bool],
+        execute_func: Callable[["sim.simulator.Simulator"], None],
+        dependencies: Optional[Dependencies] = None
+    ):
+        super().__init__(dependencies)
 
         self.check_func = check_func
         self.execute_func = execute_func
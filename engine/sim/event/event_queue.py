@@ -1,10 +1,13 @@
-import bisect
 import math
-import random
+from collections import deque
 from enum import IntEnum
-from typing import Optional, Iterator, MutableSequence, MutableMapping, TYPE_CHECKING
+from functools import partial
+from typing import Optional, Iterator, MutableSequence, MutableMapping, MutableSet, Callable, TYPE_CHECKING
 
-from sim.event.event import Event, TimedEvent, ConditionalEvent
+from sim.event.event import Event, TimedEvent, ConditionalEvent, CallbackEvent
+from sim.event.timed_queue import TimedQueue, HeapTimedQueue
+from sim.event.timer_wheel import TimerWheel
+from sim.data.property import SimInstanceProperty
 if TYPE_CHECKING:
     from sim.simulator import Simulator
 
@@ -15,64 +18,218 @@ class OrderingMode(IntEnum):
     RANDOM = 2
 
 
+class ConditionCheckMode(IntEnum):
+    POLL = 0
+    """Check every conditional event after every event."""
+    DEPENDENCIES = 1
+    """Only check conditional events after one of their dependencies was set, events without dependencies are polled."""
+
+
+class EventHandle(list):
+    """
+    Handle of a scheduled event or callback, returned by EventQueue.add() and EventQueue.schedule_at().
+
+    The handle is the queue entry itself: [sim_time, key, seq, target, owner, args].
+    The key breaks ties between equal sim_times according to the ordering mode, seq keeps the entries totally ordered.
+    target is the event, or the callback to call with args (args is None for events).
+    owner is the EventQueue or TimerWheel holding the entry, or None once it has been popped or cancelled.
+    Cancelled entries are left in place as tombstones.
+    sim_time is None for conditional events.
+    """
+
+    __slots__ = ()
+
+    @property
+    def sim_time(self) -> float:
+        return self[0]
+
+    @property
+    def event(self) -> Event | Callable:
+        return self[3]
+
+    @property
+    def pending(self) -> bool:
+        return self[4] is not None
+
+    def cancel(self) -> bool:
+        """
+        Cancel the event in O(1).
+        :return: whether the event was pending
+        """
+        queue = self[4]
+        if queue is None:
+            return False
+        queue._cancel(self)
+        return True
+
+    def reschedule(self, sim_time: float) -> "EventHandle":
+        """
+        Move a pending timed event to another sim_time in O(log n).
+        :return: the handle of the rescheduled event, this handle is no longer pending afterward
+        """
+        queue = self[4]
+        assert queue is not None, "The event is not pending."
+        assert self[0] is not None, "Conditional events can not be rescheduled."
+        return queue._reschedule(self, sim_time)
+
+
+class PoppedBatch:
+    """Owner of the handles popped by EventQueue.pop_next_batch() until they are executed, so they can still be cancelled."""
+
+    def __init__(self, event_queue: "EventQueue"):
+        self.event_queue = event_queue
+
+    def _cancel(self, handle: EventHandle) -> None:
+        handle[4] = None
+
+    def _reschedule(self, handle: EventHandle, sim_time: float) -> EventHandle:
+        handle[4] = None
+        if handle[5] is not None:
+            return self.event_queue.schedule_at(sim_time, handle[3], handle[5])
+        handle[3].sim_time = sim_time
+        return self.event_queue._add_timed_event(handle[3])
+
+
 class EventQueue:
-    def __init__(self, simulator: "Simulator", ordering_mode: OrderingMode = OrderingMode.FIFO):
+    def __init__(
+        self,
+        simulator: "Simulator",
+        ordering_mode: OrderingMode = OrderingMode.FIFO,
+        condition_check_mode: ConditionCheckMode = ConditionCheckMode.DEPENDENCIES,
+        timed_queue: Optional[TimedQueue] = None
+    ):
         self.sim = simulator
 
-        self.ordering_mode = ordering_mode
+        self.ordering_mode = OrderingMode(ordering_mode)
+        self.condition_check_mode = ConditionCheckMode(condition_check_mode)
 
-        self._timed_events_queue: MutableSequence[TimedEvent] = []
-        self._condition_events: MutableSequence[ConditionalEvent] = []
-        self._to_check: MutableSequence[ConditionalEvent] = []
+        self._timed_events_queue: TimedQueue = HeapTimedQueue() if timed_queue is None else timed_queue
+        self.timers = TimerWheel(self)
+        self.batch = PoppedBatch(self)
+        self._next_seq = 0
+        self._condition_events: MutableMapping[ConditionalEvent, EventHandle] = {}
+        self._polled_events: MutableMapping[ConditionalEvent, None] = {}
+        self._watches: MutableMapping[ConditionalEvent, tuple[Callable[[], None], list]] = {}
+        self._to_check: deque[ConditionalEvent] = deque()
+        self._to_check_set: MutableSet[ConditionalEvent] = set()
+        # Set by pop_next_batch() while draining, the checks are scheduled once for the whole batch
+        self._draining = False
 
         self._event_id_to_time: MutableMapping[int, float] = {}
         self._time_to_event_id: MutableMapping[float, MutableSequence[int]] = {}
 
         self._test_temp_eid = 0
+        # Total number of ConditionalEvent.check() calls
+        self.condition_checks = 0
+
+    def _new_handle(self, sim_time: float, target: TimedEvent | Callable, args: Optional[tuple]) -> EventHandle:
+        assert sim_time >= self.sim.sim_time
+        seq = self._next_seq
+        self._next_seq = seq + 1
+        mode = self.ordering_mode
+        if mode is OrderingMode.FIFO:
+            key = seq
+        elif mode is OrderingMode.LIFO:
+            key = -seq
+        else:
+            key = self.sim.random.random()
+        return EventHandle((sim_time, key, seq, target, self, args))
+
+    def _add_timed_event(self, event: TimedEvent) -> EventHandle:
+        handle = self._new_handle(event.sim_time, event, None)
+        event._handle = handle
+        self._timed_events_queue.push(handle)
+        return handle
+
+    def schedule_at(self, sim_time: float, callback: Callable, args: tuple = ()) -> EventHandle:
+        """
+        Call callback(*args) at sim_time.
+        Lighter than adding a TimedEvent, the returned handle is the only object stored in the queue.
+        """
+        handle = self._new_handle(sim_time, callback, args)
+        self._timed_events_queue.push(handle)
+        return handle
 
-    def _add_timed_event(self, event: TimedEvent):
-        assert event.sim_time >= self.sim.sim_time
-        match self.ordering_mode:
-            case OrderingMode.FIFO:
-                bisect.insort_right(self._timed_events_queue, event, key=lambda e: e.sim_time)
-            case OrderingMode.LIFO:
-                bisect.insort_left(self._timed_events_queue, event, key=lambda e: e.sim_time)
-            case OrderingMode.RANDOM:
-                # noinspection PyTypeChecker
-                self._timed_events_queue.insert(
-                    self.sim.random.randint(
-                        bisect.bisect_left(self._timed_events_queue, event, key=lambda e: e.sim_time),
-                        bisect.bisect_right(self._timed_events_queue, event, key=lambda e: e.sim_time)
-                    ),
-                    event
-                )
-
-    def _add_condition_event(self, event: ConditionalEvent):
-        self._condition_events.append(event)
-
-    def _remove_timed_event(self, event: TimedEvent):
-        self._timed_events_queue.remove(event)
-
-    def _remove_condition_event(self, event: ConditionalEvent):
-        self._condition_events.remove(event)
-
-    def add(self, event: Event) -> None:
+    def _add_condition_event(self, event: ConditionalEvent) -> EventHandle:
+        seq = self._next_seq
+        self._next_seq = seq + 1
+        handle = EventHandle((None, 0, seq, event, self, None))
+        self._condition_events[event] = handle
+        event._handle = handle
+        if event.dependencies is None:
+            self._polled_events[event] = None
+        else:
+            callback = partial(self._dependency_changed, event)
+            dependencies = []
+            for obj, prop in event.dependencies:
+                if isinstance(prop, str):
+                    prop = getattr(type(obj), prop)
+                assert isinstance(prop, SimInstanceProperty), "Dependencies must be SimInstanceProperties."
+                prop.watch(obj, callback)
+                dependencies.append((obj, prop))
+            self._watches[event] = callback, dependencies
+        if self.condition_check_mode is ConditionCheckMode.DEPENDENCIES:
+            self._dependency_changed(event)
+        return handle
+
+    def _remove_condition_event(self, event: ConditionalEvent) -> None:
+        del self._condition_events[event]
+        if event.dependencies is None:
+            del self._polled_events[event]
+        else:
+            callback, dependencies = self._watches.pop(event)
+            for obj, prop in dependencies:
+                prop.unwatch(obj, callback)
+
+    def _dependency_changed(self, event: ConditionalEvent) -> None:
+        if event not in self._to_check_set:
+            self._to_check_set.add(event)
+            self._to_check.append(event)
+
+    def _schedule_checks(self) -> None:
+        """Queue the conditional events to check after an event was popped."""
+        if self._draining:
+            return
+        if self.condition_check_mode is ConditionCheckMode.POLL:
+            self._to_check = deque(self._condition_events)
+            self._to_check_set = set(self._condition_events)
+        else:
+            for event in self._polled_events:
+                self._dependency_changed(event)
+
+    def _cancel(self, handle: EventHandle) -> None:
+        handle[4] = None
+        if isinstance(handle[3], ConditionalEvent):
+            self._remove_condition_event(handle[3])
+            return
+        self._timed_events_queue.discard(handle)
+
+    def _reschedule(self, handle: EventHandle, sim_time: float) -> EventHandle:
+        self._cancel(handle)
+        if handle[5] is not None:
+            return self.schedule_at(sim_time, handle[3], handle[5])
+        handle[3].sim_time = sim_time
+        return self._add_timed_event(handle[3])
+
+    def compact(self) -> None:
+        """Drop the tombstones of cancelled events."""
+        self._timed_events_queue.compact()
+
+    def add(self, event: Event) -> EventHandle:
         assert isinstance(event, Event)
+        assert event._handle is None or event._handle[4] is None, "The event is already scheduled."
         if isinstance(event, TimedEvent):
-            self._add_timed_event(event)
+            return self._add_timed_event(event)
         elif isinstance(event, ConditionalEvent):
-            self._add_condition_event(event)
+            return self._add_condition_event(event)
         else:
             assert False
 
     def remove(self, event: Event) -> None:
         assert isinstance(event, Event)
-        if isinstance(event, TimedEvent):
-            self._remove_timed_event(event)
-        elif isinstance(event, ConditionalEvent):
-            self._remove_condition_event(event)
-        else:
-            assert False
+        if event not in self:
+            raise ValueError("The event is not in the queue.")
+        event._handle.cancel()
 
     def try_remove(self, event: Event | None) -> None:
         if event is None:
@@ -90,17 +247,14 @@ class EventQueue:
         self.remove(key)
 
     def __contains__(self, item: Event) -> bool:
-        assert item is Event
-        if isinstance(item, TimedEvent):
-            return item in self._timed_events_queue
-        if isinstance(item, ConditionalEvent):
-            return item in self._condition_events
-        assert False
+        assert isinstance(item, Event)
+        handle = item._handle
+        return handle is not None and (handle[4] is self or handle[4] is self.timers or handle[4] is self.batch)
 
     def __iter__(self) -> Iterator[Event]:
         def gen():
-            for e in self._timed_events_queue:
-                yield e
+            for handle in sorted((*self._timed_events_queue, *self.timers._handles())):
+                yield handle[3] if handle[5] is None else CallbackEvent(handle[0], handle[3], handle[5])
             for e in self._condition_events:
                 yield e
         return gen()
@@ -110,23 +264,72 @@ class EventQueue:
         return iter(self._condition_events)
 
     def __len__(self) -> int:
-        return len(self._timed_events_queue) + len(self._condition_events)
+        return len(self._timed_events_queue) + len(self.timers) + len(self._condition_events)
 
     def pop_next_event(self, max_time: float = math.inf) -> Optional[Event]:
-        while self._to_check:
-            event = self._to_check.pop(0)
+        handle = self.pop_next_handle(max_time)
+        if handle is None:
+            return None
+        if handle[5] is not None:
+            return CallbackEvent(handle[0], handle[3], handle[5])
+        return handle[3]
+
+    def pop_next_handle(self, max_time: float = math.inf) -> Optional[EventHandle]:
+        """Like pop_next_event(), but returns the handle so that callbacks don't need to be wrapped in an event."""
+        to_check = self._to_check
+        while to_check:
+            event = to_check.popleft()
+            self._to_check_set.discard(event)
             if event in self._condition_events:
+                self.condition_checks += 1
                 if event.check():
-                    self._remove_condition_event(event)
-                    self._to_check = list(self._condition_events)
+                    handle = self._condition_events[event]
+                    self._cancel(handle)
+                    self._schedule_checks()
                     self._test_temp_eid += 1
-                    return event
+                    return handle
 
-        if not self._timed_events_queue:
-            return None
-        if self._timed_events_queue[0].sim_time > max_time:
+        timers = self.timers
+        while True:
+            if len(timers) and timers.next_time <= max_time:
+                # Only pop events strictly before the next timer slot, timers in it might come first
+                handle = self._timed_events_queue.pop(math.nextafter(timers.next_time, -math.inf))
+                if handle is None:
+                    timers.flush_next()
+                    continue
+            else:
+                handle = self._timed_events_queue.pop(max_time)
+            break
+        if handle is None:
             return None
-        event = self._timed_events_queue.pop(0)
-        self._to_check = list(self._condition_events)
+        handle[4] = None
+        self._schedule_checks()
         self._test_temp_eid += 1
-        return event
+        return handle
+
+    def pop_next_batch(self, max_time: float = math.inf) -> MutableSequence[EventHandle]:
+        """
+        Pop the handles of all timed events sharing the next sim_time, in order, their owner is set to self.batch
+        until the caller executes them. The pending conditional events are checked once first, one that is ready is
+        returned alone. Nothing runs while the batch is popped, so the conditional events are not checked again
+        between its events: their checks are scheduled once, to run at the next pop after the batch was executed.
+        :return: the handles, empty if there is no event until max_time
+        """
+        batch = []
+        sim_time = max_time
+        owner = self.batch
+        self._draining = True
+        try:
+            while (handle := self.pop_next_handle(sim_time)) is not None:
+                batch.append(handle)
+                if handle[0] is not None:
+                    sim_time = handle[0]
+                    handle[4] = owner
+                else:
+                    # Runs at the current sim_time, before any later event
+                    break
+        finally:
+            self._draining = False
+        if batch:
+            self._schedule_checks()
+        return batch
@@ -0,0 +1,137 @@
+from abc import ABC, abstractmethod
+from typing import Callable, Optional, Any, Generator, Coroutine, MutableSequence, TYPE_CHECKING
+
+from sim.event.event import ConditionalEvent, Dependencies
+if TYPE_CHECKING:
+    from sim.simulator import Simulator
+
+
+_NONE_ARGS = (None,)
+
+
+class Waitable(ABC):
+    """
+    Something a Process can yield (or await in a coroutine) to suspend until it is ready.
+    The value it is ready with is sent back into the process.
+    """
+
+    __slots__ = ()
+
+    @abstractmethod
+    def _wait(self, process: "Process") -> None:
+        """Arrange for process._resume(value) to be called once this is ready."""
+        pass
+
+    def __await__(self):
+        return (yield self)
+
+
+class Timeout(Waitable):
+    """Ready after delay seconds. Processes may also yield a plain number of seconds."""
+
+    __slots__ = "delay", "value"
+
+    def __init__(self, delay: float, value: Any = None):
+        self.delay = delay
+        self.value = value
+
+    def _wait(self, process: "Process") -> None:
+        process.sim.schedule(self.delay, process._resume_callback, self.value)
+
+
+class _ConditionWait(ConditionalEvent):
+    __slots__ = "condition", "process"
+
+    def __init__(self, condition: "Condition", process: "Process"):
+        super().__init__(condition.dependencies)
+        self.condition = condition
+        self.process = process
+
+    def check(self) -> bool:
+        return self.condition.check_func()
+
+    def execute(self, simulator: "Simulator") -> None:
+        self.process._resume(None)
+
+
+class Condition(Waitable):
+    """Ready once check_func() returns True, see ConditionalEvent for dependencies."""
+
+    __slots__ = "check_func", "dependencies"
+
+    def __init__(self, check_func: Callable[[], bool], dependencies: Optional[Dependencies] = None):
+        self.check_func = check_func
+        self.dependencies = dependencies
+
+    def _wait(self, process: "Process") -> None:
+        if self.check_func():
+            process.sim.schedule(0, process._resume_callback, None)
+        else:
+            process.sim.event_queue.add(_ConditionWait(self, process))
+
+
+class Signal(Waitable):
+    """One-shot signal, ready once trigger() was called. Bridges callback style code and processes."""
+
+    __slots__ = "sim", "triggered", "value", "_callbacks"
+
+    def __init__(self, simulator: "Simulator"):
+        self.sim = simulator
+        self.triggered = False
+        self.value = None
+        self._callbacks: Optional[MutableSequence[Callable[[Any], None]]] = None
+
+    def trigger(self, value: Any = None) -> None:
+        assert not self.triggered, "The signal has already been triggered."
+        self.triggered = True
+        self.value = value
+        if self._callbacks is not None:
+            for callback in self._callbacks:
+                self.sim.schedule(0, callback, value)
+            self._callbacks = None
+
+    def then(self, callback: Callable[[Any], None]) -> None:
+        """Call callback(value) through the event queue once the signal is triggered."""
+        if self.triggered:
+            self.sim.schedule(0, callback, self.value)
+        elif self._callbacks is None:
+            self._callbacks = [callback]
+        else:
+            self._callbacks.append(callback)
+
+    def _wait(self, process: "Process") -> None:
+        self.then(process._resume_callback)
+
+
+class Process(Signal):
+    """
+    Runs a generator or coroutine as a simulation process, starting at the current sim_time.
+
+    The process is resumed straight from the event queue whenever what it yielded (a Waitable or a number of seconds)
+    is ready. Yielding a Process waits for it to finish and sends back its return value.
+    A Process is itself a Signal triggered with the return value once it finishes.
+    """
+
+    __slots__ = "_generator", "_resume_callback"
+
+    def __init__(self, simulator: "Simulator", generator: Generator[Any, Any, Any] | Coroutine[Any, Any, Any]):
+        super().__init__(simulator)
+        self._generator = generator
+        # Bound once, scheduling it again doesn't allocate a new bound method
+        self._resume_callback = self._resume
+        simulator.schedule(0, self._resume_callback, None)
+
+    @property
+    def finished(self) -> bool:
+        return self.triggered
+
+    def _resume(self, value: Any) -> None:
+        try:
+            target = self._generator.send(value)
+        except StopIteration as e:
+            self.trigger(e.value)
+            return
+        if type(target) is float or type(target) is int:
+            self.sim.event_queue.schedule_at(self.sim.sim_time + target, self._resume_callback, _NONE_ARGS)
+        else:
+            target._wait(self)
@@ -0,0 +1,157 @@
+import heapq
+import math
+from collections import deque
+from typing import Any, Optional, MutableSequence, TYPE_CHECKING
+
+from sim.event.process import Signal
+if TYPE_CHECKING:
+    from sim.simulator import Simulator
+
+
+class Request(Signal):
+    """A pending or granted claim on a Resource, triggered with itself once granted."""
+
+    __slots__ = "resource", "owner", "priority", "granted", "released", "cancelled"
+
+    def __init__(self, resource: "Resource", owner: Any, priority: float):
+        super().__init__(resource.sim)
+        self.resource = resource
+        self.owner = owner
+        self.priority = priority
+        self.granted = False
+        # Granted, then given back
+        self.released = False
+        self.cancelled = False
+
+    def release(self) -> None:
+        self.resource.release(self)
+
+
+class Resource:
+    """
+    Resource with `capacity` slots. Requests are granted in order of priority (lower first), then FIFO.
+
+    Releasing a slot grants exactly the next waiting request, which is resumed through a scheduled event,
+    so contention costs one event per hand-off instead of re-polling every waiter.
+    """
+
+    def __init__(self, simulator: "Simulator", capacity: int = 1):
+        self.sim = simulator
+        self.capacity = capacity
+        self.users: MutableSequence[Request] = []
+        # Heap of (priority, seq, request), cancelled requests are dropped lazily
+        self._waiters: MutableSequence[tuple[float, int, Request]] = []
+        self._next_seq = 0
+
+    @property
+    def count(self) -> int:
+        return len(self.users)
+
+    @property
+    def queue_length(self) -> int:
+        return sum(1 for _, _, r in self._waiters if not r.cancelled)
+
+    def _free(self) -> bool:
+        waiters = self._waiters
+        while waiters and waiters[0][2].cancelled:
+            heapq.heappop(waiters)
+        return len(self.users) < self.capacity and not waiters
+
+    def _grant(self, request: Request) -> None:
+        request.granted = True
+        self.users.append(request)
+        request.trigger(request)
+
+    def request(self, owner: Any = None, priority: float = 0) -> Request:
+        """Claim a slot, the returned Request can be yielded by a process or given a callback with then()."""
+        request = Request(self, owner, priority)
+        if self._free():
+            self._grant(request)
+        else:
+            heapq.heappush(self._waiters, (priority, self._next_seq, request))
+            self._next_seq += 1
+        return request
+
+    def try_request(self, owner: Any = None) -> Optional[Request]:
+        """Claim a slot only if one is free right now, returns the granted Request or None."""
+        if self._free():
+            request = Request(self, owner, 0)
+            self._grant(request)
+            return request
+        return None
+
+    def release(self, request: Request) -> None:
+        """Give back a granted slot, or withdraw a request that is still waiting. A request is released only once."""
+        assert request.resource is self, "The request is for another resource."
+        assert not request.released and not request.cancelled, "The request was already released."
+        if not request.granted:
+            request.cancelled = True
+            return
+        self.users.remove(request)
+        request.granted = False
+        request.released = True
+        waiters = self._waiters
+        while waiters and len(self.users) < self.capacity:
+            _, _, waiter = heapq.heappop(waiters)
+            if not waiter.cancelled:
+                self._grant(waiter)
+
+
+class Lock(Resource):
+    """Resource with a single slot."""
+
+    def __init__(self, simulator: "Simulator"):
+        super().__init__(simulator, 1)
+
+    @property
+    def locked(self) -> bool:
+        return bool(self.users)
+
+    @property
+    def holder(self) -> Any:
+        """Owner of the granted request, None if the lock is free."""
+        return self.users[0].owner if self.users else None
+
+
+class Store:
+    """
+    FIFO store of items with an optional capacity.
+    put() is ready once the item has been stored, get() is ready with the next item. With a capacity of 0 every put()
+    waits for a get() to take its item.
+    """
+
+    def __init__(self, simulator: "Simulator", capacity: float = math.inf):
+        self.sim = simulator
+        self.capacity = capacity
+        self.items: deque[Any] = deque()
+        self._getters: deque[Signal] = deque()
+        self._putters: deque[tuple[Signal, Any]] = deque()
+
+    def put(self, item: Any) -> Signal:
+        signal = Signal(self.sim)
+        if self._getters:
+            self._getters.popleft().trigger(item)
+            signal.trigger()
+        elif len(self.items) < self.capacity:
+            self.items.append(item)
+            signal.trigger()
+        else:
+            self._putters.append((signal, item))
+        return signal
+
+    def get(self) -> Signal:
+        signal = Signal(self.sim)
+        if self.items:
+            signal.trigger(self.items.popleft())
+            if self._putters:
+                putter, item = self._putters.popleft()
+                self.items.append(item)
+                putter.trigger()
+        elif self._putters:
+            # Without capacity (0) items go straight from a putter to a getter
+            putter, item = self._putters.popleft()
+            signal.trigger(item)
+            putter.trigger()
+        else:
+            self._getters.append(signal)
+        return signal
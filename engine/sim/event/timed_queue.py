@@ -0,0 +1,225 @@
+import heapq
+import math
+from abc import ABC, abstractmethod
+from typing import Optional, Iterator, MutableSequence, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from sim.event.event_queue import EventHandle
+
+
+class TimedQueue(ABC):
+    """
+    Storage backend of the timed events of an EventQueue.
+
+    Stores EventHandles ordered by [sim_time, key, seq]. Cancelled handles (handle[4] is None) are left in place as
+    tombstones, skipped when popped and dropped by compact() once they make up more than compact_ratio of the queue.
+    """
+
+    # Compact the queue once tombstones make up more than this share of it
+    compact_ratio: float = 0.5
+    compact_min_size: int = 64
+
+    def __init__(self):
+        self._dead = 0
+
+    @abstractmethod
+    def push(self, handle: "EventHandle") -> None:
+        pass
+
+    @abstractmethod
+    def pop(self, max_time: float = math.inf) -> Optional["EventHandle"]:
+        """Pop the next pending handle, None if there is none at or before max_time."""
+        pass
+
+    @abstractmethod
+    def _size(self) -> int:
+        """Number of stored handles, including tombstones."""
+        pass
+
+    @abstractmethod
+    def _handles(self) -> Iterator["EventHandle"]:
+        """All stored handles in no particular order, including tombstones."""
+        pass
+
+    @abstractmethod
+    def compact(self) -> None:
+        pass
+
+    def discard(self, handle: "EventHandle") -> None:
+        """Notify the queue that a stored handle was cancelled."""
+        self._dead += 1
+        if self._dead > self.compact_min_size and self._dead > self._size() * self.compact_ratio:
+            self.compact()
+
+    def __len__(self) -> int:
+        return self._size() - self._dead
+
+    def __iter__(self) -> Iterator["EventHandle"]:
+        """Pending handles in order."""
+        return iter(sorted(h for h in self._handles() if h[4] is not None))
+
+
+class HeapTimedQueue(TimedQueue):
+    """Binary heap, O(log n) push and pop."""
+
+    def __init__(self):
+        super().__init__()
+        self._heap: MutableSequence["EventHandle"] = []
+
+    def push(self, handle: "EventHandle") -> None:
+        heapq.heappush(self._heap, handle)
+
+    def pop(self, max_time: float = math.inf) -> Optional["EventHandle"]:
+        heap = self._heap
+        while heap:
+            handle = heap[0]
+            if handle[4] is None:
+                heapq.heappop(heap)
+                self._dead -= 1
+                continue
+            if handle[0] > max_time:
+                return None
+            return heapq.heappop(heap)
+        return None
+
+    def _size(self) -> int:
+        return len(self._heap)
+
+    def _handles(self) -> Iterator["EventHandle"]:
+        return iter(self._heap)
+
+    def compact(self) -> None:
+        heap = self._heap
+        heap[:] = [h for h in heap if h[4] is not None]
+        heapq.heapify(heap)
+        self._dead = 0
+
+
+class CalendarTimedQueue(TimedQueue):
+    """
+    Calendar queue (R. Brown, 1988), amortised O(1) push and pop.
+
+    Time is divided into "days" of `width` seconds which are assigned round-robin to the buckets of a "year",
+    each bucket is a small heap. The number of buckets follows the queue size and the day width is re-estimated
+    from the spacing of the earliest events whenever the calendar is resized. Events at an infinite time have no day,
+    they are kept in a separate heap and popped once the calendar is empty.
+    """
+
+    min_buckets: int = 2
+    width_sample_size: int = 25
+
+    def __init__(self, buckets: int = 2, width: float = 1.0):
+        super().__init__()
+        self._width = width
+        self._buckets: MutableSequence[MutableSequence["EventHandle"]] = [[] for _ in range(buckets)]
+        self._mask = buckets - 1
+        assert buckets >= self.min_buckets and buckets & self._mask == 0, "The bucket count must be a power of 2."
+        self._count = 0
+        # Day of the last popped event, no stored event is earlier than this
+        self._day = 0
+        # Handles at sim_time == inf
+        self._overflow: MutableSequence["EventHandle"] = []
+
+    def push(self, handle: "EventHandle") -> None:
+        if handle[0] == math.inf:
+            heapq.heappush(self._overflow, handle)
+            return
+        day = int(handle[0] // self._width)
+        heapq.heappush(self._buckets[day & self._mask], handle)
+        if day < self._day:
+            self._day = day
+        self._count += 1
+        if self._count > 2 * len(self._buckets):
+            self._resize(len(self._buckets) * 2)
+
+    def _find(self) -> Optional[MutableSequence["EventHandle"]]:
+        """Find the bucket holding the next pending handle, advancing the current day to it."""
+        buckets = self._buckets
+        mask = self._mask
+        width = self._width
+        day = self._day
+        for _ in range(len(buckets)):
+            bucket = buckets[day & mask]
+            while bucket and bucket[0][4] is None:
+                heapq.heappop(bucket)
+                self._dead -= 1
+                self._count -= 1
+            if bucket and bucket[0][0] // width <= day:
+                self._day = day
+                return bucket
+            day += 1
+
+        # Nothing within a whole year, jump straight to the earliest event
+        earliest = None
+        for bucket in buckets:
+            while bucket and bucket[0][4] is None:
+                heapq.heappop(bucket)
+                self._dead -= 1
+                self._count -= 1
+            if bucket and (earliest is None or bucket[0] < earliest[0]):
+                earliest = bucket
+        if earliest is not None:
+            self._day = int(earliest[0][0] // width)
+        return earliest
+
+    def _pop_overflow(self, max_time: float) -> Optional["EventHandle"]:
+        overflow = self._overflow
+        while overflow and overflow[0][4] is None:
+            heapq.heappop(overflow)
+            self._dead -= 1
+        if not overflow or overflow[0][0] > max_time:
+            return None
+        return heapq.heappop(overflow)
+
+    def pop(self, max_time: float = math.inf) -> Optional["EventHandle"]:
+        bucket = self._find()
+        if bucket is None:
+            return self._pop_overflow(max_time)
+        if bucket[0][0] > max_time:
+            return None
+        handle = heapq.heappop(bucket)
+        self._count -= 1
+        if self._count < len(self._buckets) // 2 and len(self._buckets) > self.min_buckets:
+            self._resize(len(self._buckets) // 2)
+        return handle
+
+    def _size(self) -> int:
+        return self._count + len(self._overflow)
+
+    def _handles(self) -> Iterator["EventHandle"]:
+        for bucket in self._buckets:
+            yield from bucket
+        yield from self._overflow
+
+    def _estimate_width(self, handles: MutableSequence["EventHandle"]) -> float:
+        sample = heapq.nsmallest(self.width_sample_size, handles)
+        gaps = [b[0] - a[0] for a, b in zip(sample, sample[1:])]
+        if not gaps:
+            return self._width
+        average = sum(gaps) / len(gaps)
+        gaps = [g for g in gaps if g <= average * 2]
+        average = sum(gaps) / len(gaps)
+        if average <= 0:
+            return self._width
+        return average * 3
+
+    def _resize(self, buckets: int) -> None:
+        handles = [h for bucket in self._buckets for h in bucket if h[4] is not None]
+        overflow = self._overflow
+        overflow[:] = [h for h in overflow if h[4] is not None]
+        heapq.heapify(overflow)
+        self._dead = 0
+        self._width = self._estimate_width(handles)
+        self._buckets = [[] for _ in range(buckets)]
+        self._mask = buckets - 1
+        self._count = 0
+        self._day = min((int(h[0] // self._width) for h in handles), default=0)
+        for handle in handles:
+            day = int(handle[0] // self._width)
+            self._buckets[day & self._mask].append(handle)
+            self._count += 1
+        for bucket in self._buckets:
+            heapq.heapify(bucket)
+
+    def compact(self) -> None:
+        self._resize(len(self._buckets))
@@ -0,0 +1,141 @@
+import heapq
+import math
+from typing import Optional, Callable, Iterator, MutableMapping, MutableSequence, TYPE_CHECKING
+
+from sim.event.event import TimedEvent
+if TYPE_CHECKING:
+    from sim.simulator import Simulator
+    from sim.event.event_queue import EventQueue, EventHandle
+
+
+class PeriodicTimer(TimedEvent):
+    __slots__ = "interval", "callback", "active"
+
+    def __init__(self, sim_time: float, interval: float, callback: Callable[["Simulator"], None]):
+        super().__init__(sim_time)
+        self.interval = interval
+        self.callback = callback
+        self.active = True
+
+    def execute(self, simulator: "Simulator") -> None:
+        self.callback(simulator)
+        if self.active:
+            self.sim_time += self.interval
+            simulator.timers.arm(self)
+
+    def cancel(self) -> None:
+        self.active = False
+        if self._handle is not None:
+            self._handle.cancel()
+
+
+class TimerWheel:
+    """
+    Hierarchical timing wheel holding timers until they are about to expire, with O(1) arm and cancel.
+
+    Level k has `slots` slots each spanning slots^k ticks of `resolution` seconds. A timer is put in the lowest
+    level whose current block contains its tick and moves down a level each time its slot comes due, the level 0
+    slots are moved into the EventQueue. Timers are EventHandles numbered by the EventQueue when armed, so they are
+    ordered against all other events exactly as if they had been added to the queue directly.
+    Cancelled timers are dropped when their slot comes due.
+    """
+
+    def __init__(self, event_queue: "EventQueue", resolution: float = 0.1, slot_bits: int = 6, levels: int = 4):
+        self.event_queue = event_queue
+        self.resolution = resolution
+        self._bits = slot_bits
+        self._levels = levels
+
+        # Tick of the last slot that came due, no timer is earlier than this
+        self._cursor = 0
+        self._slots: MutableMapping[tuple[int, int], MutableSequence["EventHandle"]] = {}
+        # Heap of (start tick, level, slot number) of the non-empty slots
+        self._due: MutableSequence[tuple[int, int, int]] = []
+        self._count = 0
+
+    def _tick(self, sim_time: float) -> int:
+        tick = int(sim_time // self.resolution)
+        if tick * self.resolution > sim_time:
+            tick -= 1
+        return tick
+
+    def _place(self, handle: "EventHandle", tick: int) -> bool:
+        cursor = self._cursor
+        bits = self._bits
+        for level in range(self._levels):
+            if tick >> (bits * (level + 1)) == cursor >> (bits * (level + 1)):
+                number = tick >> (bits * level)
+                slot = self._slots.get((level, number))
+                if slot is None:
+                    slot = self._slots[(level, number)] = []
+                    heapq.heappush(self._due, (number << (bits * level), level, number))
+                slot.append(handle)
+                handle[4] = self
+                return True
+        return False
+
+    def arm(self, event: TimedEvent) -> "EventHandle":
+        """Schedule a timed event through the wheel, cheaper than EventQueue.add() when it will likely be cancelled."""
+        assert event._handle is None or event._handle[4] is None, "The event is already scheduled."
+        handle = self.event_queue._new_handle(event.sim_time, event, None)
+        event._handle = handle
+        tick = self._tick(event.sim_time)
+        if tick < self._cursor or not self._place(handle, tick):
+            # Already due or beyond the span of the wheel
+            self.event_queue._timed_events_queue.push(handle)
+        else:
+            self._count += 1
+        return handle
+
+    def arm_periodic(self, interval: float, callback: Callable[["Simulator"], None],
+                     first_time: Optional[float] = None) -> PeriodicTimer:
+        """Call callback every interval seconds, starting at first_time (one interval from now by default)."""
+        if first_time is None:
+            first_time = self.event_queue.sim.sim_time + interval
+        timer = PeriodicTimer(first_time, interval, callback)
+        self.arm(timer)
+        return timer
+
+    def _cancel(self, handle: "EventHandle") -> None:
+        handle[4] = None
+        self._count -= 1
+        if self._count == 0:
+            self._slots.clear()
+            self._due.clear()
+
+    def _reschedule(self, handle: "EventHandle", sim_time: float) -> "EventHandle":
+        self._cancel(handle)
+        handle[3].sim_time = sim_time
+        return self.arm(handle[3])
+
+    @property
+    def next_time(self) -> float:
+        """Lower bound of the times of the timers in the wheel."""
+        if not self._due:
+            return math.inf
+        return self._due[0][0] * self.resolution
+
+    def flush_next(self) -> None:
+        """Move the timers of the earliest slot one level down, or into the EventQueue from level 0."""
+        start, level, number = heapq.heappop(self._due)
+        slot = self._slots.pop((level, number))
+        self._cursor = max(self._cursor, start)
+        timed_events_queue = self.event_queue._timed_events_queue
+        for handle in slot:
+            if handle[4] is None:
+                continue
+            if level == 0:
+                handle[4] = self.event_queue
+                timed_events_queue.push(handle)
+                self._count -= 1
+            else:
+                self._place(handle, self._tick(handle[0]))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _handles(self) -> Iterator["EventHandle"]:
+        for slot in self._slots.values():
+            for handle in slot:
+                if handle[4] is not None:
+                    yield handle
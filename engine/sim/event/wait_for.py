@@ -0,0 +1,104 @@
+from typing import Any, Callable, Iterator, MutableMapping, Optional, Sequence
+
+
+class WaitForGraph:
+    """
+    Which agent waits for which, for detecting deadlocks as they happen.
+
+    Every agent waits for at most one other (the holder of what it needs next), so the graph is a set of chains and
+    closing a cycle can only happen on adding an edge: wait() follows the chain from the new holder, which stays short
+    since chains only form in queues of agents, and reports the cycle if it leads back to the waiter.
+    Callbacks can watch() the edges of an agent, to react to a cycle or a queue changing without polling.
+    """
+
+    def __init__(self, on_deadlock: Optional[Callable[[Sequence[Any]], None]] = None):
+        """
+        :param on_deadlock: called with the agents of every cycle closed by wait(), starting with the waiter
+        """
+        self.on_deadlock = on_deadlock
+        self._holders: MutableMapping[Any, Any] = {}
+        # Waiters by holder, in a dict for a deterministic order
+        self._waiters: MutableMapping[Any, MutableMapping[Any, None]] = {}
+        # Callbacks by agent, see watch()
+        self._watchers: MutableMapping[Any, MutableMapping[Callable[[], None], None]] = {}
+        # Number of cycles detected so far
+        self.deadlocks = 0
+
+    def __len__(self) -> int:
+        return len(self._holders)
+
+    def __contains__(self, waiter: Any) -> bool:
+        return waiter in self._holders
+
+    def holder_of(self, waiter: Any) -> Any:
+        """The agent waiter waits for, None if it doesn't wait."""
+        return self._holders.get(waiter)
+
+    def waiters_of(self, holder: Any) -> Iterator[Any]:
+        """The agents waiting for holder, in the order they started waiting."""
+        return iter(tuple(self._waiters.get(holder, ())))
+
+    def chain(self, agent: Any) -> Iterator[Any]:
+        """agent, the agent it waits for, the one that one waits for and so on, each agent only once."""
+        seen = set()
+        holders = self._holders
+        while agent is not None and agent not in seen:
+            yield agent
+            seen.add(agent)
+            agent = holders.get(agent)
+
+    def watch(self, agent: Any, callback: Callable[[], None]) -> None:
+        """Call callback every time agent starts or stops waiting, or another agent starts or stops waiting for it."""
+        self._watchers.setdefault(agent, {})[callback] = None
+
+    def unwatch(self, agent: Any, callback: Callable[[], None]) -> None:
+        watchers = self._watchers.get(agent)
+        if watchers is not None:
+            watchers.pop(callback, None)
+            if not watchers:
+                del self._watchers[agent]
+
+    def _notify(self, waiter: Any, holder: Any) -> None:
+        """Call the watchers of the agents of an edge that was added or removed."""
+        watchers = self._watchers
+        for agent in (waiter, holder):
+            callbacks = watchers.get(agent)
+            if callbacks:
+                for callback in tuple(callbacks):
+                    callback()
+
+    def wait(self, waiter: Any, holder: Any) -> Optional[Sequence[Any]]:
+        """
+        Make waiter wait for holder (instead of whoever it waited for before).
+        :return: the agents of the cycle this closed, starting with waiter, or None
+        """
+        self.stop_waiting(waiter)
+        self._holders[waiter] = holder
+        self._waiters.setdefault(holder, {})[waiter] = None
+        if self._watchers:
+            self._notify(waiter, holder)
+
+        cycle = [waiter]
+        for agent in self.chain(holder):
+            if agent is waiter:
+                self.deadlocks += 1
+                if self.on_deadlock is not None:
+                    self.on_deadlock(cycle)
+                return cycle
+            cycle.append(agent)
+        return None
+
+    def stop_waiting(self, waiter: Any) -> None:
+        holder = self._holders.pop(waiter, None)
+        if holder is not None:
+            waiters = self._waiters[holder]
+            del waiters[waiter]
+            if not waiters:
+                del self._waiters[holder]
+            if self._watchers:
+                self._notify(waiter, holder)
+
+    def clear(self) -> None:
+        self._holders.clear()
+        self._waiters.clear()
+        self._watchers.clear()
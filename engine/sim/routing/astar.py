@@ -0,0 +1,116 @@
+from heapq import heappush, heappop
+from math import hypot
+from typing import Optional, Collection, MutableSequence, Sequence
+
+from sim.routing.graph import CSRGraph
+
+
+class AStar:
+    """
+    A* on a CSRGraph with the straight line distance as heuristic.
+
+    The rows of the graph are unpacked into tuples (CPython iterates tuples much faster than it indexes arrays), only
+    the rows changed since are unpacked again when the graph changes. The heuristic is computed from the float32
+    positions of the graph, the per node search state lives in lists reused across searches. Nodes stamped with an older
+    search id are treated as unvisited, so no cleanup pass is needed. Among open nodes of equal cost the most recently
+    opened one is expanded first, like path_find in the logistics example.
+    """
+
+    def __init__(self, graph: CSRGraph):
+        self.graph = graph
+        n = graph.node_count
+        self._g_cost = [0.0] * n
+        self._h_cost = [0.0] * n
+        self._parent = [-1] * n
+        self._visited = [0] * n
+        self._closed = [0] * n
+        self._search = 0
+        self._rows: MutableSequence[tuple[tuple[int, float], ...]] = []
+        self._version = -1
+        # Nodes expanded by the last search
+        self.expanded = 0
+
+    def _update(self) -> None:
+        graph = self.graph
+        changed = graph.changed_since(self._version)
+        if changed is None:
+            self._rows = [tuple(graph.neighbors(u)) for u in range(graph.node_count)]
+        else:
+            rows = self._rows
+            for u in changed:
+                rows[u] = tuple(graph.neighbors(u))
+        self._version = graph.version
+
+    def cost(self, path: Sequence[int]) -> float:
+        graph = self.graph
+        return sum(graph.distance(path[i], path[i + 1]) for i in range(len(path) - 1))
+
+    def find(self, begin: int, end: int, blocked: Collection[int] = ()) -> Optional[MutableSequence[int]]:
+        """
+        :param blocked: nodes that may not be entered
+        :return: the nodes of the shortest path, begin and end included, or None if end can't be reached
+        """
+        if self._version != self.graph.version:
+            self._update()
+        rows = self._rows
+        positions = self.graph.positions
+        g_costs = self._g_cost
+        h_costs = self._h_cost
+        parents = self._parent
+        visited = self._visited
+        closed = self._closed
+
+        self._search += 1
+        search = self._search
+        i = 3 * end
+        end_x, end_y, end_z = positions[i], positions[i + 1], positions[i + 2]
+
+        visited[begin] = search
+        parents[begin] = -1
+        g_costs[begin] = 0.0
+        i = 3 * begin
+        h_costs[begin] = hypot(positions[i] - end_x, positions[i + 1] - end_y, positions[i + 2] - end_z)
+        opened = [(h_costs[begin], 0, begin)]
+        pushes = 0
+        expanded = 0
+
+        while opened:
+            f_cost, _, current = heappop(opened)
+            if closed[current] == search or f_cost > g_costs[current] + h_costs[current]:
+                # Already expanded, or superseded by a cheaper entry
+                continue
+
+            if current == end:
+                self.expanded = expanded
+                path = [current]
+                while (current := parents[current]) != -1:
+                    path.append(current)
+                path.reverse()
+                return path
+
+            closed[current] = search
+            expanded += 1
+            current_g_cost = g_costs[current]
+
+            for neighbor, weight in rows[current]:
+                if visited[neighbor] != search:
+                    if neighbor in blocked:
+                        continue
+                    visited[neighbor] = search
+                    i = 3 * neighbor
+                    h_costs[neighbor] = hypot(positions[i] - end_x, positions[i + 1] - end_y, positions[i + 2] - end_z)
+                    g_cost = current_g_cost + weight
+                elif closed[neighbor] == search:
+                    continue
+                else:
+                    g_cost = current_g_cost + weight
+                    if g_cost >= g_costs[neighbor]:
+                        continue
+
+                g_costs[neighbor] = g_cost
+                parents[neighbor] = current
+                pushes += 1
+                heappush(opened, (g_cost + h_costs[neighbor], -pushes, neighbor))
+
+        self.expanded = expanded
+        return None
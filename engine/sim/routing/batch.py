@@ -0,0 +1,199 @@
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+from typing import Collection, Mapping, MutableSequence, Optional, Sequence, TYPE_CHECKING
+
+from sim.routing.graph import CSRGraph
+from sim.routing.astar import AStar
+from sim.event.process import Signal
+if TYPE_CHECKING:
+    from sim.simulator import Simulator
+
+# (origin, destination, blocked nodes)
+RouteRequest = tuple[int, int, Collection[int]]
+
+
+def _graph_view(buffer: memoryview, node_count: int, edge_count: int) -> CSRGraph:
+    """A CSRGraph over the arrays laid out by _export(), without copying them."""
+    sizes = (("d", 8 * edge_count), ("f", 4 * 3 * node_count), ("i", 4 * (node_count + 1)), ("i", 4 * edge_count))
+    views = []
+    start = 0
+    for fmt, size in sizes:
+        views.append(buffer[start:start + size].cast(fmt))
+        start += size
+    weights, positions, offsets, targets = views
+    return CSRGraph.from_buffers(positions, offsets, targets, weights)
+
+
+def _export(graph: CSRGraph) -> shared_memory.SharedMemory:
+    graph.compact()
+    # Doubles first, so that every array is aligned
+    arrays = (graph.weights, graph.positions, graph.offsets, graph.targets)
+    size = sum(len(a) * a.itemsize for a in arrays)
+    memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    start = 0
+    for a in arrays:
+        data = a.tobytes()
+        memory.buf[start:start + len(data)] = data
+        start += len(data)
+    return memory
+
+
+# The version of the graph in the planner, and the outgoing edges of the nodes changed since it was exported
+GraphDelta = tuple[int, Mapping[int, Sequence[tuple[int, float]]]]
+
+# State of a worker process
+_worker_memory: Optional[shared_memory.SharedMemory] = None
+_worker_astar: Optional[AStar] = None
+_worker_version = -1
+
+
+def _init_worker(name: str, node_count: int, edge_count: int, version: int) -> None:
+    global _worker_memory, _worker_astar, _worker_version
+    _worker_memory = shared_memory.SharedMemory(name=name)
+    _worker_astar = AStar(_graph_view(_worker_memory.buf, node_count, edge_count))
+    _worker_version = version
+    # Unpack the rows while the pool starts rather than in the first batch
+    _worker_astar._update()
+
+
+def _apply_delta(delta: GraphDelta) -> None:
+    """Bring the graph of this worker to the version of the planner, rows already up to date are left alone."""
+    global _worker_version
+    version, rows = delta
+    if version == _worker_version:
+        return
+    graph = _worker_astar.graph
+    for u, row in rows.items():
+        if tuple(graph.neighbors(u)) == row:
+            continue
+        for v, _ in tuple(graph.neighbors(u)):
+            graph.remove_edge(u, v)
+        for v, weight in row:
+            graph.add_edge(u, v, weight)
+    _worker_version = version
+
+
+def _solve_chunk(task: tuple[GraphDelta, Sequence[RouteRequest]]) -> list[Optional[MutableSequence[int]]]:
+    delta, requests = task
+    _apply_delta(delta)
+    astar = _worker_astar
+    return [astar.find(origin, destination, blocked) for origin, destination, blocked in requests]
+
+
+class BatchPlanner:
+    """
+    Route planning service that solves all the requests issued at one sim_time together, in parallel.
+
+    request() returns a Signal. The first request at a sim_time schedules a flush at the same sim_time, which runs
+    after the events already pending then, so a wave of events at one sim_time (like timeouts armed together) ends up
+    in one batch. The batch is split into contiguous chunks solved by a process pool, the workers route on the graph
+    in shared memory and only requests and routes are pickled. Results are applied in the order of the requests
+    whatever the number of workers, and A* is deterministic, so simulations stay reproducible.
+
+    Batches smaller than min_parallel are solved in this process, where they are cheaper than a round trip to the
+    workers. The graph is exported and the workers started on the first batch solved in parallel. Later changes of its
+    edges are sent along with the requests, as the rows changed since the export, which the workers apply to their
+    overlay. Once too many rows changed to tell (see CSRGraph.changed_since()), the graph is exported again and the
+    workers restarted.
+    """
+
+    def __init__(self, simulator: "Simulator", graph: CSRGraph, workers: Optional[int] = None, min_parallel: int = 8):
+        """
+        :param workers: size of the process pool, the number of CPUs by default, 0 to solve everything in this process
+        """
+        self.sim = simulator
+        self.graph = graph
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.min_parallel = min_parallel
+        self.astar = AStar(graph)
+        self._memory: Optional[shared_memory.SharedMemory] = None
+        self._pool = None
+        # Version of the exported graph, and the changes since then
+        self._version = -1
+        self._delta: GraphDelta = (-1, {})
+        self._pending: MutableSequence[tuple[RouteRequest, Signal]] = []
+        # Statistics
+        self.batches = 0
+        self.parallel_batches = 0
+        self.requests = 0
+
+    def __enter__(self) -> "BatchPlanner":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def update(self) -> None:
+        """Export the graph and (re)start the workers, done by solve() as needed."""
+        self.close()
+        graph = self.graph
+        if self.workers > 0:
+            self._memory = _export(graph)
+            self._pool = multiprocessing.Pool(
+                self.workers, _init_worker, (self._memory.name, graph.node_count, len(graph.targets), graph.version)
+            )
+        self._version = graph.version
+        self._delta = (graph.version, {})
+
+    def _sync(self) -> GraphDelta:
+        """The changes of the graph to send to the workers, starting or restarting them if needed."""
+        graph = self.graph
+        if self._pool is None:
+            self.update()
+        elif self._delta[0] != graph.version:
+            changed = graph.changed_since(self._version)
+            if changed is None:
+                self.update()
+            else:
+                self._delta = (graph.version, {u: tuple(graph.neighbors(u)) for u in changed})
+        return self._delta
+
+    def close(self) -> None:
+        """Stop the workers and free the shared memory."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        if self._memory is not None:
+            self._memory.close()
+            self._memory.unlink()
+            self._memory = None
+
+    def request(self, origin: int, destination: int, blocked: Collection[int] = ()) -> Signal:
+        """
+        Request a route, the returned Signal is triggered at the current sim_time with the route (None if there is
+        none) once the batch was solved.
+        :param blocked: nodes that may not be entered, copied right away
+        """
+        signal = Signal(self.sim)
+        if not self._pending:
+            self.sim.schedule(0, self._flush)
+        self._pending.append(((origin, destination, frozenset(blocked)), signal))
+        return signal
+
+    def _flush(self) -> None:
+        pending = self._pending
+        self._pending = []
+        routes = self.solve([r for r, _ in pending])
+        for (_, signal), route in zip(pending, routes):
+            signal.trigger(route)
+
+    def solve(self, requests: Sequence[RouteRequest]) -> list[Optional[MutableSequence[int]]]:
+        """Solve a batch of requests right away, the routes are in the order of the requests."""
+        self.batches += 1
+        self.requests += len(requests)
+        if self.workers == 0 or len(requests) < self.min_parallel:
+            astar = self.astar
+            return [astar.find(origin, destination, blocked) for origin, destination, blocked in requests]
+
+        delta = self._sync()
+        self.parallel_batches += 1
+        # A few chunks per worker, contiguous so that concatenating them keeps the order
+        chunk_count = min(len(requests), self.workers * 4)
+        bounds = [len(requests) * i // chunk_count for i in range(chunk_count + 1)]
+        chunks = [requests[bounds[i]:bounds[i + 1]] for i in range(chunk_count)]
+        routes = []
+        for chunk in self._pool.map(_solve_chunk, [(delta, chunk) for chunk in chunks]):
+            routes.extend(chunk)
+        return routes
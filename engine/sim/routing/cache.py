@@ -0,0 +1,150 @@
+from collections import OrderedDict
+from typing import Any, Callable, Collection, Hashable, Iterator, MutableMapping, MutableSet, Optional, Sequence
+
+# search(origin, destination, blocked) -> nodes of the route or None, blocked may only be tested with `in`
+Search = Callable[[Any, Any, Collection[Any]], Optional[Sequence[Any]]]
+
+
+class _RecordingBlocked:
+    """Wraps the blocked nodes given to a search and records which of them the search ran into."""
+
+    __slots__ = "blocked", "hits"
+
+    def __init__(self, blocked: Collection[Any]):
+        self.blocked = blocked
+        self.hits: MutableSet[Any] = set()
+
+    def __contains__(self, node: Any) -> bool:
+        if node in self.blocked:
+            self.hits.add(node)
+            return True
+        return False
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.blocked)
+
+    def __len__(self) -> int:
+        return len(self.blocked)
+
+
+class _Entry:
+    __slots__ = "route", "obstacles"
+
+    def __init__(self, route: Optional[tuple[Any, ...]], obstacles: frozenset):
+        self.route = route
+        # Blocked nodes the search ran into, the route is only reproducible while all of them are still blocked
+        self.obstacles = obstacles
+
+
+class RouteCache:
+    """
+    LRU cache of routes by (origin, destination, key), for searches repeated against nearly the same blocked nodes.
+
+    A cached route is reused as long as none of its nodes is blocked and all the blocked nodes its search ran into
+    are still blocked, which is checked on every lookup, so a search with a different set of blocked nodes never
+    gets a wrong route. invalidate_node() drops exactly the routes a change of one node can affect.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        # Keys of the entries whose route or obstacles contain the node
+        self._by_node: MutableMapping[Any, MutableSet[Hashable]] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _valid(self, entry: _Entry, blocked: Collection[Any]) -> bool:
+        for node in entry.obstacles:
+            if node not in blocked:
+                return False
+        route = entry.route
+        if route is not None:
+            # Like the searches, the origin itself may be blocked
+            for i in range(1, len(route)):
+                if route[i] in blocked:
+                    return False
+        return True
+
+    def find(self, search: Search, origin: Any, destination: Any, blocked: Collection[Any] = (),
+             key: Hashable = None) -> Optional[tuple[Any, ...]]:
+        """
+        Return the cached route from origin to destination or run search(origin, destination, blocked) and cache it.
+        :param key: tells apart searches that differ in more than the blocked nodes
+        :return: the nodes of the route, None if there is none
+        """
+        cache_key = (origin, destination, key)
+        entry = self._entries.get(cache_key)
+        if entry is not None:
+            if self._valid(entry, blocked):
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return entry.route
+            self._remove(cache_key)
+
+        self.misses += 1
+        recording = _RecordingBlocked(blocked)
+        route = search(origin, destination, recording)
+        if route is not None:
+            route = tuple(route)
+        entry = _Entry(route, frozenset(recording.hits))
+        self._entries[cache_key] = entry
+        for node in self._nodes(entry):
+            keys = self._by_node.get(node)
+            if keys is None:
+                keys = self._by_node[node] = set()
+            keys.add(cache_key)
+        if len(self._entries) > self.capacity:
+            self._remove(next(iter(self._entries)))
+        return route
+
+    @staticmethod
+    def _nodes(entry: _Entry) -> Iterator[Any]:
+        yield from entry.obstacles
+        if entry.route is not None:
+            yield from entry.route
+
+    def _remove(self, cache_key: Hashable) -> None:
+        entry = self._entries.pop(cache_key)
+        for node in self._nodes(entry):
+            keys = self._by_node.get(node)
+            if keys is not None:
+                keys.discard(cache_key)
+                if not keys:
+                    del self._by_node[node]
+
+    def invalidate_node(self, node: Any, blocked: bool) -> None:
+        """
+        Drop only the cached results a change of node can affect: the routes through it once it is blocked,
+        the routes and failed searches that ran into it once it is freed.
+        """
+        keys = self._by_node.get(node)
+        if keys is None:
+            return
+        for cache_key in list(keys):
+            entry = self._entries[cache_key]
+            if (node in entry.obstacles) != blocked:
+                self._remove(cache_key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_node.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,202 @@
+import math
+from array import array
+from typing import Any, Optional, Collection, Iterable, Iterator, Sequence, MutableMapping, MutableSequence, MutableSet
+
+from gdmath import *
+
+from sim.contents.agent import Agent
+
+
+class CSRGraph:
+    """
+    Directed graph in compressed sparse row form, nodes are the integers 0 to node_count - 1.
+
+    The outgoing edges of node u are targets[offsets[u]:offsets[u + 1]] with the matching weights. Positions are
+    float32 xyz triples and the weights are the distances between them, so routing needs no Vec3 at all.
+    Edges added or removed after building go to a small overlay consulted by neighbors(), compact() merges it back
+    once it holds more than compact_ratio of the edges.
+    """
+
+    compact_ratio = 0.25
+    compact_min_size = 64
+
+    def __init__(self, positions: Sequence[Vec3], edges: Iterable[tuple[int, int]], objects: Optional[Sequence[Any]] = None):
+        """
+        :param positions: position of every node
+        :param edges: (from, to) pairs
+        :param objects: the object every node stands for, e.g. a Point, see id_of()
+        """
+        self.node_count = len(positions)
+        self.positions = array("f")
+        for position in positions:
+            self.positions.extend((position.x, position.y, position.z))
+
+        rows: list[list[tuple[int, float]]] = [[] for _ in range(self.node_count)]
+        for u, v in edges:
+            rows[u].append((v, self.distance(u, v)))
+        self.offsets = array("i")
+        self.targets = array("i")
+        self.weights = array("d")
+        self._build(rows)
+        self._init_state(objects)
+
+    def _init_state(self, objects: Optional[Sequence[Any]]) -> None:
+        self.objects: Sequence[Any] = list(objects) if objects is not None else list(range(self.node_count))
+        self._ids: MutableMapping[Any, int] = {obj: i for i, obj in enumerate(self.objects)}
+        # Overlay of the changes since the last compact()
+        self._added: MutableMapping[int, MutableSequence[tuple[int, float]]] = {}
+        self._removed: MutableSet[int] = set()
+        self._overlay_size = 0
+        # Incremented on every change of the edges
+        self.version = 0
+        # Source node of every change since version _log_start, see changed_since()
+        self._log: MutableSequence[int] = []
+        self._log_start = 0
+
+    @classmethod
+    def from_network(cls, network: Agent) -> "CSRGraph":
+        """
+        Compile the children of a network Agent, children with begin and end (like Paths) are edges between
+        the other children (like Points).
+        """
+        nodes = [c for c in network.children if not (hasattr(c, "begin") and hasattr(c, "end"))]
+        ids = {node: i for i, node in enumerate(nodes)}
+        edges = [
+            (ids[c.begin], ids[c.end]) for c in network.children
+            if hasattr(c, "begin") and hasattr(c, "end")
+        ]
+        return cls([node.position for node in nodes], edges, nodes)
+
+    @classmethod
+    def from_buffers(cls, positions: Sequence[float], offsets: Sequence[int], targets: Sequence[int],
+                     weights: Sequence[float], objects: Optional[Sequence[Any]] = None) -> "CSRGraph":
+        """
+        A graph over existing arrays laid out like the ones of a graph, e.g. memoryviews of shared memory,
+        which are used without copying. Changes go to the overlay, only compact() replaces the arrays.
+        """
+        graph = cls.__new__(cls)
+        graph.node_count = len(offsets) - 1
+        graph.positions = positions
+        graph.offsets = offsets
+        graph.targets = targets
+        graph.weights = weights
+        graph._init_state(objects)
+        return graph
+
+    def _build(self, rows: Sequence[Sequence[tuple[int, float]]]) -> None:
+        offsets = array("i", [0])
+        targets = array("i")
+        weights = array("d")
+        for row in rows:
+            for v, w in row:
+                targets.append(v)
+                weights.append(w)
+            offsets.append(len(targets))
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+
+    def id_of(self, obj: Any) -> int:
+        return self._ids[obj]
+
+    def distance(self, u: int, v: int) -> float:
+        p = self.positions
+        return math.sqrt(
+            (p[3 * u] - p[3 * v]) ** 2 + (p[3 * u + 1] - p[3 * v + 1]) ** 2 + (p[3 * u + 2] - p[3 * v + 2]) ** 2
+        )
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets) - len(self._removed) + sum(len(a) for a in self._added.values())
+
+    @property
+    def has_overlay(self) -> bool:
+        return self._overlay_size > 0
+
+    def neighbors(self, u: int) -> Iterator[tuple[int, float]]:
+        """(target, weight) of the outgoing edges of u."""
+        removed = self._removed
+        targets = self.targets
+        weights = self.weights
+        for i in range(self.offsets[u], self.offsets[u + 1]):
+            if not removed or i not in removed:
+                yield targets[i], weights[i]
+        added = self._added.get(u)
+        if added is not None:
+            yield from added
+
+    def has_edge(self, u: int, v: int) -> bool:
+        return any(target == v for target, _ in self.neighbors(u))
+
+    def add_edge(self, u: int, v: int, weight: Optional[float] = None) -> None:
+        """Add an edge, weighted with the distance between the nodes by default."""
+        if weight is None:
+            weight = self.distance(u, v)
+        self._added.setdefault(u, []).append((v, weight))
+        self._overlay_size += 1
+        self._changed(u)
+
+    def remove_edge(self, u: int, v: int) -> bool:
+        """
+        Remove one edge from u to v.
+        :return: whether there was one
+        """
+        added = self._added.get(u)
+        if added is not None:
+            for i, (target, _) in enumerate(added):
+                if target == v:
+                    del added[i]
+                    if not added:
+                        del self._added[u]
+                    self._overlay_size -= 1
+                    self._changed(u)
+                    return True
+        targets = self.targets
+        for i in range(self.offsets[u], self.offsets[u + 1]):
+            if targets[i] == v and i not in self._removed:
+                self._removed.add(i)
+                self._overlay_size += 1
+                self._changed(u)
+                return True
+        return False
+
+    def _changed(self, u: int) -> None:
+        self.version += 1
+        log = self._log
+        log.append(u)
+        if len(log) > self.node_count:
+            # Rebuilding everything is as cheap by now
+            log.clear()
+            self._log_start = self.version
+        if self._overlay_size > max(self.compact_min_size, len(self.targets) * self.compact_ratio):
+            self.compact()
+
+    def changed_since(self, version: int) -> Optional[Collection[int]]:
+        """
+        The nodes whose outgoing edges changed since version, so that copies of the rows can be patched.
+        :return: None if version is too old to tell, everything has to be read again
+        """
+        if version < self._log_start:
+            return None
+        return set(self._log[version - self._log_start:])
+
+    def add_path(self, path: Agent) -> None:
+        """Add the edge of a Path like Agent between two nodes of the graph."""
+        self.add_edge(self._ids[path.begin], self._ids[path.end])
+
+    def remove_path(self, path: Agent) -> bool:
+        return self.remove_edge(self._ids[path.begin], self._ids[path.end])
+
+    def edges(self) -> Iterator[tuple[int, int]]:
+        for u in range(self.node_count):
+            for v, _ in self.neighbors(u):
+                yield u, v
+
+    def compact(self) -> None:
+        """Merge the overlay into the arrays."""
+        if not self._overlay_size:
+            return
+        self._build([list(self.neighbors(u)) for u in range(self.node_count)])
+        self._added.clear()
+        self._removed.clear()
+        self._overlay_size = 0
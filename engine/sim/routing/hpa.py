@@ -0,0 +1,331 @@
+import math
+from heapq import heappush, heappop
+from typing import Optional, Iterator, MutableMapping, MutableSequence, MutableSet, Sequence
+
+from gdmath import *
+
+from sim.routing.graph import CSRGraph
+
+
+class HierarchicalRoute:
+    """
+    Route planned on the abstract graph of a HierarchicalRouter and refined into graph nodes only as far as it is read.
+
+    Iterating yields the nodes from origin to destination, refining one abstract hop at a time.
+    """
+
+    def __init__(self, router: "HierarchicalRouter", abstract: Sequence[int], cost: float):
+        self.router = router
+        # Origin, the transition nodes passed through, destination
+        self.abstract = abstract
+        # Cost on the abstract graph, an upper bound of the cost of the refined route
+        self.cost = cost
+        self._nodes: MutableSequence[int] = [abstract[0]]
+        self._refined = 0
+
+    @property
+    def complete(self) -> bool:
+        return self._refined == len(self.abstract) - 1
+
+    def _refine_next(self) -> bool:
+        if self.complete:
+            return False
+        a = self.abstract[self._refined]
+        b = self.abstract[self._refined + 1]
+        segment = self.router._segment(a, b)
+        if segment is None:
+            raise RuntimeError("The route was invalidated by a change of the blocked nodes.")
+        self._nodes.extend(segment[1:])
+        self._refined += 1
+        return True
+
+    def prefix(self, count: int) -> Sequence[int]:
+        """The first count nodes of the route (fewer if it is shorter), refining only as much as needed."""
+        while len(self._nodes) < count and self._refine_next():
+            pass
+        return self._nodes[:count]
+
+    def __iter__(self) -> Iterator[int]:
+        i = 0
+        while True:
+            while i >= len(self._nodes):
+                if not self._refine_next():
+                    return
+            yield self._nodes[i]
+            i += 1
+
+
+class HierarchicalRouter:
+    """
+    Hierarchical path-finding (HPA*) on a CSRGraph.
+
+    Nodes are grouped into clusters by a square grid over x and z. Between every two adjacent clusters a few of the
+    edges crossing their border are picked as transitions, and within every cluster the shortest routes between its
+    transition nodes are precomputed, which gives a much smaller abstract graph. A query connects origin and destination
+    to the transition nodes of their clusters, runs A* on the abstract graph, and refines the result lazily
+    (see HierarchicalRoute). Routes are near-optimal, not optimal.
+
+    Blocked nodes are part of the state of the router. Changing one only marks its cluster (and the neighbouring clusters
+    when it ends a border edge) to be recomputed before the next query. Changes of the edges of the graph are not
+    followed, build a new router for them.
+    """
+
+    def __init__(self, graph: CSRGraph, cluster_size: float = 15.0, transition_spacing: int = 6):
+        """
+        :param cluster_size: side length of the clusters, in world units
+        :param transition_spacing: number of border edges per transition
+        """
+        graph.compact()
+        self.graph = graph
+        self.cluster_size = cluster_size
+        self.transition_spacing = transition_spacing
+        n = graph.node_count
+        p = graph.positions
+        self._positions = [Vec3(p[3 * i], p[3 * i + 1], p[3 * i + 2]) for i in range(n)]
+
+        self._successors: Sequence[Sequence[tuple[int, float]]] = [tuple(graph.neighbors(u)) for u in range(n)]
+        predecessors: list[list[tuple[int, float]]] = [[] for _ in range(n)]
+        for u in range(n):
+            for v, w in self._successors[u]:
+                predecessors[v].append((u, w))
+        self._predecessors: Sequence[Sequence[tuple[int, float]]] = [tuple(row) for row in predecessors]
+
+        cells: MutableMapping[tuple[int, int], int] = {}
+        self.cluster_of: MutableSequence[int] = []
+        self.cluster_nodes: MutableSequence[MutableSequence[int]] = []
+        for i in range(n):
+            cell = (math.floor(p[3 * i] / cluster_size), math.floor(p[3 * i + 2] / cluster_size))
+            cluster = cells.get(cell)
+            if cluster is None:
+                cluster = cells[cell] = len(self.cluster_nodes)
+                self.cluster_nodes.append([])
+            self.cluster_of.append(cluster)
+            self.cluster_nodes[cluster].append(i)
+
+        # Node pairs connected across a border, by ordered pair of clusters, sorted along the border
+        self._borders: MutableMapping[tuple[int, int], Sequence[tuple[int, int]]] = {}
+        border_edges: MutableMapping[tuple[int, int], MutableSet[tuple[int, int]]] = {}
+        for u in range(n):
+            for v, _ in self._successors[u]:
+                a, b = self.cluster_of[u], self.cluster_of[v]
+                if a != b:
+                    key, pair = ((a, b), (u, v)) if a < b else ((b, a), (v, u))
+                    border_edges.setdefault(key, set()).add(pair)
+        positions = self._positions
+        for key, pairs in border_edges.items():
+            self._borders[key] = sorted(pairs, key=lambda pair: (positions[pair[0]].x, positions[pair[0]].z))
+        self._cluster_borders: MutableSequence[MutableSequence[tuple[int, int]]] = [[] for _ in self.cluster_nodes]
+        self._border_nodes: MutableMapping[int, MutableSet[tuple[int, int]]] = {}
+        for key, pairs in self._borders.items():
+            self._cluster_borders[key[0]].append(key)
+            self._cluster_borders[key[1]].append(key)
+            for u, v in pairs:
+                self._border_nodes.setdefault(u, set()).add(key)
+                self._border_nodes.setdefault(v, set()).add(key)
+
+        self.blocked: MutableSet[int] = set()
+        # Transition edges (from, to, weight) by border
+        self._transitions: MutableMapping[tuple[int, int], Sequence[tuple[int, int, float]]] = {}
+        # Transition nodes of every cluster and the costs between them
+        self._entrances: MutableSequence[MutableSet[int]] = [set() for _ in self.cluster_nodes]
+        self._intra: MutableSequence[MutableMapping[int, Sequence[tuple[int, float]]]] = [{} for _ in self.cluster_nodes]
+        self._dirty_borders: MutableSet[tuple[int, int]] = set(self._borders)
+        self._dirty_clusters: MutableSet[int] = set(range(len(self.cluster_nodes)))
+        # Number of clusters recomputed so far
+        self.cluster_updates = 0
+
+    @property
+    def cluster_count(self) -> int:
+        return len(self.cluster_nodes)
+
+    @property
+    def abstract_edge_count(self) -> int:
+        self._refresh()
+        return sum(len(edges) for intra in self._intra for edges in intra.values()) + \
+            sum(len(t) for t in self._transitions.values())
+
+    def set_blocked(self, node: int, blocked: bool) -> None:
+        """Block or free a node, only the clusters it affects are recomputed, lazily."""
+        if blocked == (node in self.blocked):
+            return
+        if blocked:
+            self.blocked.add(node)
+        else:
+            self.blocked.discard(node)
+        self._dirty_clusters.add(self.cluster_of[node])
+        borders = self._border_nodes.get(node)
+        if borders is not None:
+            self._dirty_borders.update(borders)
+
+    def _pick_transitions(self, key: tuple[int, int]) -> None:
+        blocked = self.blocked
+        successors = self._successors
+        # Runs of consecutive usable border pairs, one transition per transition_spacing pairs of a run
+        runs: list[list[tuple[int, int]]] = [[]]
+        for u, v in self._borders[key]:
+            if u in blocked or v in blocked:
+                if runs[-1]:
+                    runs.append([])
+            else:
+                runs[-1].append((u, v))
+        transitions = []
+        for run in runs:
+            if not run:
+                continue
+            count = max(1, len(run) // self.transition_spacing)
+            for k in range(count):
+                u, v = run[(2 * k + 1) * len(run) // (2 * count)]
+                for a, b in ((u, v), (v, u)):
+                    for target, weight in successors[a]:
+                        if target == b:
+                            transitions.append((a, b, weight))
+                            break
+        self._transitions[key] = transitions
+
+    def _search(self, sources: MutableMapping[int, float], cluster: int, reverse: bool = False,
+                target: Optional[int] = None) -> tuple[MutableMapping[int, float], MutableMapping[int, int]]:
+        """Dijkstra from sources (node: initial cost) staying inside cluster and avoiding blocked nodes."""
+        edges = self._predecessors if reverse else self._successors
+        cluster_of = self.cluster_of
+        blocked = self.blocked
+        costs = dict(sources)
+        parents: MutableMapping[int, int] = {}
+        opened = [(cost, node) for node, cost in sources.items()]
+        opened.sort()
+        closed = set()
+        while opened:
+            cost, node = heappop(opened)
+            if node in closed:
+                continue
+            closed.add(node)
+            if node == target:
+                break
+            for neighbor, weight in edges[node]:
+                if cluster_of[neighbor] != cluster or neighbor in blocked:
+                    continue
+                c = cost + weight
+                if c < costs.get(neighbor, math.inf):
+                    costs[neighbor] = c
+                    parents[neighbor] = node
+                    heappush(opened, (c, neighbor))
+        return costs, parents
+
+    def _refresh(self) -> None:
+        if not self._dirty_borders and not self._dirty_clusters:
+            return
+        for key in self._dirty_borders:
+            self._pick_transitions(key)
+            self._dirty_clusters.update(key)
+        self._dirty_borders.clear()
+        for cluster in self._dirty_clusters:
+            entrances = set()
+            for key in self._cluster_borders[cluster]:
+                for u, v, _ in self._transitions[key]:
+                    if self.cluster_of[u] == cluster:
+                        entrances.add(u)
+                    if self.cluster_of[v] == cluster:
+                        entrances.add(v)
+            self._entrances[cluster] = entrances
+            intra = {}
+            for entrance in entrances:
+                costs, _ = self._search({entrance: 0.0}, cluster)
+                intra[entrance] = tuple((e, costs[e]) for e in entrances if e != entrance and e in costs)
+            self._intra[cluster] = intra
+            self.cluster_updates += 1
+        self._dirty_clusters.clear()
+
+    def _segment(self, a: int, b: int) -> Optional[Sequence[int]]:
+        """Nodes from a to b, both in the same cluster or joined by a border edge."""
+        cluster = self.cluster_of[a]
+        if self.cluster_of[b] != cluster:
+            return (a, b) if b not in self.blocked else None
+        if a == b:
+            return (a,)
+        costs, parents = self._search({a: 0.0}, cluster, target=b)
+        if b not in costs:
+            return None
+        path = [b]
+        while path[-1] != a:
+            path.append(parents[path[-1]])
+        path.reverse()
+        return path
+
+    def find(self, origin: int, destination: int) -> Optional[HierarchicalRoute]:
+        """
+        Plan a route avoiding the blocked nodes (the origin itself may be blocked).
+        :return: the lazily refined route, or None if there is none
+        """
+        if destination in self.blocked:
+            return None
+        if origin == destination:
+            return HierarchicalRoute(self, (origin,), 0.0)
+        self._refresh()
+        cluster_of = self.cluster_of
+        origin_cluster = cluster_of[origin]
+        destination_cluster = cluster_of[destination]
+
+        # Costs from the origin to the transition nodes of its cluster, and from those of the destination's to it
+        from_origin, _ = self._search({origin: 0.0}, origin_cluster)
+        to_destination, _ = self._search({destination: 0.0}, destination_cluster, reverse=True)
+        best_direct = from_origin.get(destination, math.inf) if origin_cluster == destination_cluster else math.inf
+
+        positions = self._positions
+        end_pos = positions[destination]
+        transitions = self._transitions
+        intra = self._intra
+        cluster_borders = self._cluster_borders
+        destination_entrances = {
+            e: to_destination[e] for e in self._entrances[destination_cluster] if e in to_destination
+        }
+
+        # A* over the transition nodes, -1 stands for the destination
+        g_costs: MutableMapping[int, float] = {}
+        parents: MutableMapping[int, int] = {}
+        opened = []
+        pushes = 0
+        for e in self._entrances[origin_cluster]:
+            if e in from_origin:
+                g_costs[e] = from_origin[e]
+                parents[e] = origin
+                pushes += 1
+                heappush(opened, (from_origin[e] + (positions[e] | end_pos), -pushes, e))
+        if best_direct < math.inf:
+            g_costs[-1] = best_direct
+            parents[-1] = origin
+            heappush(opened, (best_direct, 0, -1))
+        closed = set()
+        while opened:
+            _, _, node = heappop(opened)
+            if node in closed:
+                continue
+            if node == -1:
+                break
+            closed.add(node)
+            g = g_costs[node]
+            cluster = cluster_of[node]
+            edges = list(intra[cluster].get(node, ()))
+            for key in cluster_borders[cluster]:
+                for u, v, w in transitions[key]:
+                    if u == node:
+                        edges.append((v, w))
+            if node in destination_entrances:
+                edges.append((-1, destination_entrances[node]))
+            for neighbor, weight in edges:
+                c = g + weight
+                if c < g_costs.get(neighbor, math.inf):
+                    g_costs[neighbor] = c
+                    parents[neighbor] = node
+                    pushes += 1
+                    h = 0.0 if neighbor == -1 else positions[neighbor] | end_pos
+                    heappush(opened, (c + h, -pushes, neighbor))
+        else:
+            return None
+
+        abstract = [destination]
+        node = parents[-1]
+        while node != origin:
+            abstract.append(node)
+            node = parents[node]
+        abstract.append(origin)
+        abstract.reverse()
+        return HierarchicalRoute(self, abstract, g_costs[-1])
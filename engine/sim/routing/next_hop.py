@@ -0,0 +1,167 @@
+import hashlib
+import math
+import mmap
+import os
+import pathlib
+import struct
+from array import array
+from heapq import heappush, heappop
+from typing import Optional, Collection, MutableSequence
+
+from sim.routing.graph import CSRGraph
+from sim.routing.astar import AStar
+
+
+_MAGIC = b"SIMNHOP1"
+# magic, node count, padding, topology hash
+_HEADER = struct.Struct("<8sii32s")
+
+
+def topology_hash(graph: CSRGraph) -> bytes:
+    """SHA-256 of the nodes, positions, edges and weights of the graph, pending edge changes are compacted first."""
+    graph.compact()
+    h = hashlib.sha256()
+    h.update(struct.pack("<i", graph.node_count))
+    for a in (graph.positions, graph.offsets, graph.targets, graph.weights):
+        h.update(a.tobytes())
+    return h.digest()
+
+
+class NextHopTable:
+    """
+    All-pairs shortest path table of a CSRGraph: the next node and the distance from every node to every destination.
+
+    The table is stored as a file that is memory-mapped read-only and read through memoryviews, so processes loading
+    the same file share its pages. Entries are stored by destination, so following a route reads one row.
+    """
+
+    def __init__(self, path: str | os.PathLike):
+        """Map a table written by write()."""
+        self.path = pathlib.Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n, _, self.topology_hash = _HEADER.unpack_from(self._mmap)
+        if magic != _MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{self.path} is not a next hop table")
+        self.node_count = n
+        view = memoryview(self._mmap)
+        start = _HEADER.size
+        self.next_hops = view[start:start + 4 * n * n].cast("i")
+        start += 4 * n * n
+        self.distances = view[start:start + 4 * n * n].cast("f")
+
+    @staticmethod
+    def compute(graph: CSRGraph) -> tuple[array, array]:
+        """
+        Run Dijkstra backwards from every node.
+        :return: next hops (-1 if unreachable) and distances (inf if unreachable), indexed by destination * n + origin
+        """
+        graph.compact()
+        n = graph.node_count
+        predecessors: list[list[tuple[int, float]]] = [[] for _ in range(n)]
+        for u in range(n):
+            for i in range(graph.offsets[u], graph.offsets[u + 1]):
+                predecessors[graph.targets[i]].append((u, graph.weights[i]))
+
+        next_hops = array("i")
+        distances = array("f")
+        inf = math.inf
+        for destination in range(n):
+            hop = [-1] * n
+            distance = [inf] * n
+            hop[destination] = destination
+            distance[destination] = 0.0
+            opened = [(0.0, destination)]
+            while opened:
+                d, node = heappop(opened)
+                if d > distance[node]:
+                    continue
+                for u, weight in predecessors[node]:
+                    du = d + weight
+                    if du < distance[u]:
+                        distance[u] = du
+                        hop[u] = node
+                        heappush(opened, (du, u))
+            next_hops.extend(hop)
+            distances.extend(distance)
+        return next_hops, distances
+
+    @staticmethod
+    def write(graph: CSRGraph, path: str | os.PathLike) -> None:
+        """Compute the table of graph and write it to path, atomically."""
+        next_hops, distances = NextHopTable.compute(graph)
+        path = pathlib.Path(path)
+        temp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(temp, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, graph.node_count, 0, topology_hash(graph)))
+            next_hops.tofile(f)
+            distances.tofile(f)
+        os.replace(temp, path)
+
+    @classmethod
+    def for_graph(cls, graph: CSRGraph, cache_dir: str | os.PathLike) -> "NextHopTable":
+        """Map the table of graph from cache_dir, computing and writing it first if there is none for its topology."""
+        cache_dir = pathlib.Path(cache_dir)
+        path = cache_dir / f"{topology_hash(graph).hex()}.nexthop"
+        if not path.exists():
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            cls.write(graph, path)
+        return cls(path)
+
+    def close(self) -> None:
+        self.next_hops.release()
+        self.distances.release()
+        self._mmap.close()
+
+    def next_hop(self, origin: int, destination: int) -> int:
+        return self.next_hops[destination * self.node_count + origin]
+
+    def distance(self, origin: int, destination: int) -> float:
+        return self.distances[destination * self.node_count + origin]
+
+    def route(self, origin: int, destination: int) -> Optional[MutableSequence[int]]:
+        """Shortest route in O(route length), None if destination can't be reached."""
+        row = destination * self.node_count
+        next_hops = self.next_hops
+        if next_hops[row + origin] == -1:
+            return None
+        route = [origin]
+        node = origin
+        while node != destination:
+            node = next_hops[row + node]
+            route.append(node)
+        return route
+
+
+class Router:
+    """
+    Answers route queries from a NextHopTable, falling back to A* when the shortest route is obstructed
+    or the graph was changed since.
+    """
+
+    def __init__(self, graph: CSRGraph, table: NextHopTable):
+        assert table.topology_hash == topology_hash(graph), "The table was computed for another topology."
+        self.graph = graph
+        self.table = table
+        self.astar = AStar(graph)
+        self._version = graph.version
+        # Queries answered from the table and by A*
+        self.table_routes = 0
+        self.searched_routes = 0
+
+    def find(self, origin: int, destination: int, blocked: Collection[int] = ()) -> Optional[MutableSequence[int]]:
+        if self.graph.version != self._version:
+            self.searched_routes += 1
+            return self.astar.find(origin, destination, blocked)
+        route = self.table.route(origin, destination)
+        if route is None:
+            self.table_routes += 1
+            return None
+        if blocked:
+            for i in range(1, len(route)):
+                if route[i] in blocked:
+                    self.searched_routes += 1
+                    return self.astar.find(origin, destination, blocked)
+        self.table_routes += 1
+        return route
@@ -0,0 +1,213 @@
+import math
+from bisect import insort
+from heapq import heappush, heappop
+from typing import Any, Callable, Collection, Hashable, MutableMapping, MutableSequence, MutableSet, Optional, Sequence
+
+from gdmath import *
+
+from sim.routing.graph import CSRGraph
+
+# duration(previous, node, next) -> seconds from leaving node to having arrived at next, previous is None at the origin
+Duration = Callable[[Optional[int], int, int], float]
+# (node, arrival time, departure time), the departure from the last node is inf
+TimedRoute = Sequence[tuple[int, float, float]]
+# (node, index of its safe interval, previous node), the previous node is None unless the durations depend on it
+_State = tuple[int, int, Optional[int]]
+
+
+class ReservationTable:
+    """
+    Space-time reservations: which owner occupies which node during which half-open time interval.
+
+    reserve() does not check for conflicts, test with is_free() or plan with a CooperativePlanner first.
+    Reservations that ended are only dropped by prune().
+    """
+
+    def __init__(self):
+        # (start, end, owner) sorted by start, by node
+        self._reservations: MutableMapping[Hashable, MutableSequence[tuple[float, float, Any]]] = {}
+        # Nodes with reservations of the owner, by owner
+        self._nodes: MutableMapping[Any, MutableSet[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(r) for r in self._reservations.values())
+
+    def reserve(self, node: Hashable, start: float, end: float, owner: Any) -> None:
+        assert start < end
+        insort(self._reservations.setdefault(node, []), (start, end, owner), key=lambda r: r[0])
+        self._nodes.setdefault(owner, set()).add(node)
+
+    def reservations(self, node: Hashable) -> Sequence[tuple[float, float, Any]]:
+        return self._reservations.get(node, ())
+
+    def is_free(self, node: Hashable, start: float, end: float, owner: Any = None) -> bool:
+        """Whether no one but owner has reserved node during any part of [start, end)."""
+        for s, e, o in self._reservations.get(node, ()):
+            if s >= end:
+                break
+            if e > start and o is not owner:
+                return False
+        return True
+
+    def safe_intervals(self, node: Hashable, owner: Any = None) -> Sequence[tuple[float, float]]:
+        """The maximal intervals during which no one but owner has reserved node, sorted."""
+        intervals = []
+        free_from = -math.inf
+        for s, e, o in self._reservations.get(node, ()):
+            if o is owner:
+                continue
+            if s > free_from:
+                intervals.append((free_from, s))
+            free_from = max(free_from, e)
+        if free_from < math.inf:
+            intervals.append((free_from, math.inf))
+        return intervals
+
+    def release(self, owner: Any) -> None:
+        """Drop all the reservations of owner."""
+        for node in self._nodes.pop(owner, ()):
+            reservations = [r for r in self._reservations[node] if r[2] is not owner]
+            if reservations:
+                self._reservations[node] = reservations
+            else:
+                del self._reservations[node]
+
+    def prune(self, time: float) -> None:
+        """Drop the reservations that ended at or before time."""
+        for node in list(self._reservations):
+            reservations = self._reservations[node]
+            kept = [r for r in reservations if r[1] > time]
+            if len(kept) == len(reservations):
+                continue
+            if kept:
+                self._reservations[node] = kept
+            else:
+                del self._reservations[node]
+            owners = {r[2] for r in kept}
+            for _, _, owner in reservations:
+                if owner not in owners and owner in self._nodes:
+                    self._nodes[owner].discard(node)
+                    if not self._nodes[owner]:
+                        del self._nodes[owner]
+
+    def clear(self) -> None:
+        self._reservations.clear()
+        self._nodes.clear()
+
+
+class CooperativePlanner:
+    """
+    Cooperative A* on a CSRGraph: agents plan one after another, each around the reservations of the ones before.
+
+    An agent occupies a node from when it starts moving towards it until it has arrived at the next one, so following
+    and swapping agents never share a node. The search runs over (node, safe interval) states (safe interval path
+    planning): waiting is only ever needed until a node becomes free, so the earliest arrival in every safe interval
+    is all that has to be kept. When the time of a move depends on the previous node (turning), the states are
+    (node, safe interval, previous node) instead, so that the earliest arrival is kept for every heading and the plans
+    stay optimal. The destination must be free forever after the arrival, agents stay where they stop.
+    """
+
+    def __init__(self, graph: CSRGraph, table: ReservationTable, speed: float = 1.0):
+        self.graph = graph
+        self.table = table
+        self.speed = speed
+        graph.compact()
+        n = graph.node_count
+        self._rows = [tuple(graph.neighbors(u)) for u in range(n)]
+        p = graph.positions
+        self._positions = [Vec3(p[3 * i], p[3 * i + 1], p[3 * i + 2]) for i in range(n)]
+        # States expanded by the last search
+        self.expanded = 0
+
+    def plan(self, origin: int, destination: int, start_time: float, owner: Any, blocked: Collection[int] = (),
+             duration: Optional[Duration] = None, max_expansions: int = 100000) -> Optional[TimedRoute]:
+        """
+        Plan the earliest arriving route around the reservations of everyone but owner, without reserving it.
+        :param blocked: nodes that may not be entered at all
+        :param duration: time of every move, the edge weight / speed by default,
+            it may not be shorter than that for the plan to be optimal
+        :return: the timed route, or None if there is none
+        """
+        table = self.table
+        rows = self._rows
+        positions = self._positions
+        speed = self.speed
+        end_pos = positions[destination]
+        intervals: MutableMapping[int, Sequence[tuple[float, float]]] = {}
+
+        def safe_intervals(node: int) -> Sequence[tuple[float, float]]:
+            result = intervals.get(node)
+            if result is None:
+                result = intervals[node] = table.safe_intervals(node, owner)
+            return result
+
+        start = None
+        for i, (s, e) in enumerate(safe_intervals(origin)):
+            if s <= start_time < e:
+                start = (origin, i, None)
+                break
+        if start is None:
+            return None
+
+        # Earliest arrival, departure from the parent and parent of every state
+        arrivals: MutableMapping[_State, float] = {start: start_time}
+        parents: MutableMapping[_State, tuple[Optional[_State], float]] = {start: (None, start_time)}
+        opened = [(start_time + (positions[origin] | end_pos) / speed, 0, start)]
+        closed = set()
+        pushes = 0
+        expanded = 0
+        goal = None
+        while opened and expanded < max_expansions:
+            _, _, state = heappop(opened)
+            if state in closed:
+                continue
+            closed.add(state)
+            node, interval, previous = state
+            if node == destination and safe_intervals(node)[interval][1] == math.inf:
+                goal = state
+                break
+            expanded += 1
+            arrival = arrivals[state]
+            leave_by = safe_intervals(node)[interval][1]
+            # The previous node only tells states apart if it changes the durations
+            heading = node if duration is not None else None
+            for neighbor, weight in rows[node]:
+                if neighbor in blocked:
+                    continue
+                d = duration(previous, node, neighbor) if duration is not None else weight / speed
+                for i, (s, e) in enumerate(safe_intervals(neighbor)):
+                    # Depart as early as possible, once the neighbor is free, staying in this node's safe interval
+                    departure = max(arrival, s)
+                    if departure + d > leave_by:
+                        break
+                    if departure + d >= e:
+                        continue
+                    next_state = (neighbor, i, heading)
+                    if next_state in closed or departure + d >= arrivals.get(next_state, math.inf):
+                        continue
+                    arrivals[next_state] = departure + d
+                    parents[next_state] = (state, departure)
+                    pushes += 1
+                    heappush(opened, (departure + d + (positions[neighbor] | end_pos) / speed, -pushes, next_state))
+        self.expanded = expanded
+        if goal is None:
+            return None
+
+        route = []
+        state = goal
+        departure = math.inf
+        while state is not None:
+            parent, parent_departure = parents[state]
+            route.append((state[0], arrivals[state], departure))
+            departure = parent_departure
+            state = parent
+        route.reverse()
+        return route
+
+    def reserve(self, route: TimedRoute, owner: Any) -> None:
+        """Reserve the nodes of a planned route, each from when owner starts moving towards it until it left."""
+        table = self.table
+        for i, (node, arrival, departure) in enumerate(route):
+            start = route[i - 1][2] if i > 0 else arrival
+            end = route[i + 1][1] if i + 1 < len(route) else math.inf
+            table.reserve(node, start, end, owner)
@@ -1,39 +1,193 @@
 import random
+import time
+from typing import Callable, Optional, Any, Generator, Coroutine, MutableMapping, MutableSequence
 
-from sim.event.event import TimedEvent, Event
-from sim.event.event_queue import EventQueue
+from sim.event.event import Event, CallbackEvent, Dependencies
+from sim.event.event_queue import EventQueue, EventHandle
+from sim.event.process import Process, Timeout, Condition, Signal
+from sim.event.timed_queue import TimedQueue, HeapTimedQueue
+from sim.utils.profiler import Profiler
 
 
 class Simulator:
-    def __init__(self):
+    def __init__(self, timed_queue_type: type[TimedQueue] = HeapTimedQueue, batch_execution: bool = False):
+        """
+        :param timed_queue_type: storage backend of the timed events, CalendarTimedQueue scales better
+            to very large numbers of pending events
+        :param batch_execution: make run_until() drain all events sharing a sim_time at once and hand the events of
+            classes overriding Event.execute_batch() over as one batch
+        """
         self._sim_time = 0.0
 
         self.random = random.Random(1)
 
-        self.event_queue = EventQueue(self)
+        self.event_queue = EventQueue(self, timed_queue=timed_queue_type())
+        self.timers = self.event_queue.timers
+
+        self.batch_execution = batch_execution
+        # Whether execute_batch() is overridden, by event class
+        self._batched_classes: MutableMapping[type, bool] = {}
+
+        self.profiler: Optional[Profiler] = None
 
     @property
     def sim_time(self) -> float:
         return self._sim_time
 
     def execute_next_event(self) -> Event:
-        event = self.event_queue.pop_next_event()
+        handle = self.event_queue.pop_next_handle()
 
-        if event is None:
+        if handle is None:
             return None
 
-        if isinstance(event, TimedEvent):
-            self._sim_time = event.sim_time
+        profiler = self.profiler
+        if profiler is None:
+            self._execute(handle)
+        else:
+            start_sim_time = self._sim_time
+            t = time.perf_counter()
+            self._execute(handle)
+            duration = time.perf_counter() - t
+            profiler.record(profiler.key(handle), duration)
+            profiler.add_run(self._sim_time - start_sim_time, duration)
+
+        if handle[5] is not None:
+            return CallbackEvent(handle[0], handle[3], handle[5])
+        return handle[3]
+
+    def _execute(self, handle: EventHandle) -> None:
+        if handle[0] is not None:
+            self._sim_time = handle[0]
+        if handle[5] is None:
+            handle[3].execute(self)
+        else:
+            handle[3](*handle[5])
+
+    def start_profiling(self, queue_sample_interval: int = 1000, reservoir_size: int = 1024) -> Profiler:
+        """
+        Start collecting per event type statistics into a new Profiler, see Profiler for the parameters.
+        Runs check whether profiling is on once per call, starting or stopping profiling from an event
+        takes effect at the next run_until() call.
+        """
+        self.profiler = Profiler(self, queue_sample_interval, reservoir_size)
+        return self.profiler
+
+    def stop_profiling(self) -> Optional[Profiler]:
+        """Stop profiling, returns the Profiler with the statistics collected so far."""
+        profiler = self.profiler
+        self.profiler = None
+        return profiler
+
+    def schedule(self, delay: float, callback: Callable, *args) -> EventHandle:
+        """Call callback(*args) after delay, without allocating an Event."""
+        return self.event_queue.schedule_at(self._sim_time + delay, callback, args)
+
+    def schedule_at(self, sim_time: float, callback: Callable, *args) -> EventHandle:
+        """Call callback(*args) at sim_time, without allocating an Event."""
+        return self.event_queue.schedule_at(sim_time, callback, args)
 
-        event.execute(self)
+    def process(self, generator: Generator[Any, Any, Any] | Coroutine[Any, Any, Any]) -> Process:
+        """Start a generator or coroutine as a process, see Process."""
+        return Process(self, generator)
 
-        return event
+    def timeout(self, delay: float, value: Any = None) -> Timeout:
+        return Timeout(delay, value)
+
+    def condition(self, check_func: Callable[[], bool], dependencies: Optional[Dependencies] = None) -> Condition:
+        return Condition(check_func, dependencies)
+
+    def signal(self) -> Signal:
+        return Signal(self)
 
     def run_until(self, until: float):
-        while (event := self.event_queue.pop_next_event(until)) is not None:
-            if isinstance(event, TimedEvent):
-                self._sim_time = event.sim_time
-            event.execute(self)
+        profiler = self.profiler
+        if profiler is not None:
+            start_sim_time = self._sim_time
+            start = time.perf_counter()
+        if self.batch_execution:
+            self._run_until_batched(until, profiler)
+        else:
+            self._run_until_sequential(until, profiler)
+        if profiler is not None:
+            profiler.add_run(until - start_sim_time, time.perf_counter() - start)
+
+    def _run_until_sequential(self, until: float, profiler: Optional[Profiler] = None):
+        pop = self.event_queue.pop_next_handle
+        perf_counter = time.perf_counter
+        while (handle := pop(until)) is not None:
+            # _execute(), inlined
+            if handle[0] is not None:
+                self._sim_time = handle[0]
+            if profiler is not None:
+                t = perf_counter()
+            if handle[5] is None:
+                handle[3].execute(self)
+            else:
+                handle[3](*handle[5])
+            if profiler is not None:
+                profiler.record(profiler.key(handle), perf_counter() - t)
+        self._sim_time = until
+
+    def _is_batched(self, cls: type) -> bool:
+        batched = self._batched_classes.get(cls)
+        if batched is None:
+            batched = self._batched_classes[cls] = cls.execute_batch.__func__ is not Event.execute_batch.__func__
+        return batched
+
+    def _run_until_batched(self, until: float, profiler: Optional[Profiler] = None):
+        """
+        Pop all events of the next sim_time, then execute them in order, except that the events of each batched class
+        are executed together with execute_batch() at the position of the first one.
+        Events scheduled meanwhile at the same sim_time form the next batch, in FIFO mode the events that aren't batched
+        therefore run in the same order as without batching. Conditional events are checked between batches.
+        """
+        pop_batch = self.event_queue.pop_next_batch
+        batch_owner = self.event_queue.batch
+        is_batched = self._is_batched
+        while batch := pop_batch(until):
+            groups: MutableMapping[type, MutableSequence[EventHandle]] = {}
+            for handle in batch:
+                if handle[0] is not None:
+                    if handle[5] is None and is_batched(cls := type(handle[3])):
+                        group = groups.get(cls)
+                        if group is None:
+                            groups[cls] = [handle]
+                        else:
+                            group.append(handle)
+
+            for handle in batch:
+                if profiler is not None:
+                    t = time.perf_counter()
+                if handle[0] is None:
+                    handle[3].execute(self)
+                    if profiler is not None:
+                        profiler.record(profiler.key(handle), time.perf_counter() - t)
+                    continue
+                if handle[4] is not batch_owner:
+                    # Cancelled, or already executed with its group
+                    continue
+                handle[4] = None
+                self._sim_time = handle[0]
+                if handle[5] is not None:
+                    handle[3](*handle[5])
+                    if profiler is not None:
+                        profiler.record(profiler.key(handle), time.perf_counter() - t)
+                    continue
+                event = handle[3]
+                group = groups.get(type(event))
+                if group is None:
+                    event.execute(self)
+                    if profiler is not None:
+                        profiler.record(profiler.key(handle), time.perf_counter() - t)
+                    continue
+                events = [event]
+                for other in group:
+                    if other[4] is batch_owner:
+                        other[4] = None
+                        events.append(other[3])
+                type(event).execute_batch(events, self)
+                if profiler is not None:
+                    profiler.record(profiler.key(handle), time.perf_counter() - t, len(events))
         self._sim_time = until
 
     def advance(self, time: float):
@@ -0,0 +1,156 @@
+import json
+import random
+import time
+from typing import Any, Hashable, MutableMapping, MutableSequence, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from sim.simulator import Simulator
+    from sim.event.event_queue import EventHandle
+
+
+class EventStats:
+    """Wall time spent executing one kind of event, with a bounded reservoir of samples for percentiles."""
+
+    __slots__ = "count", "total", "max", "samples", "_seen"
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: MutableSequence[float] = []
+        # Number of record() calls the reservoir was drawn from
+        self._seen = 0
+
+    def percentile(self, p: float) -> float:
+        """Approximate p-th percentile (0-100) of the wall time of one record() call, 0 if there was none."""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+        }
+
+
+class Profiler:
+    """
+    Collects statistics about the events executed by a Simulator, see Simulator.start_profiling().
+
+    Events are grouped by class, callbacks scheduled with Simulator.schedule() by their qualified name.
+    Times are wall clock seconds measured with time.perf_counter().
+    """
+
+    def __init__(self, simulator: "Simulator", queue_sample_interval: int = 1000, reservoir_size: int = 1024):
+        """
+        :param queue_sample_interval: record the length of the event queue every this many events
+        :param reservoir_size: number of durations kept per kind of event for the percentiles
+        """
+        self.sim = simulator
+        self.queue_sample_interval = queue_sample_interval
+        self.reservoir_size = reservoir_size
+
+        self.stats: MutableMapping[Hashable, EventStats] = {}
+        # (sim_time, wall time since start, queue length)
+        self.queue_length_samples: MutableSequence[tuple[float, float, int]] = []
+        self.events = 0
+        self.wall_time = 0.0
+        self.sim_time = 0.0
+
+        self._random = random.Random(0)
+        self._start_wall = time.perf_counter()
+        self._start_checks = simulator.event_queue.condition_checks
+        self._until_sample = 0
+
+    @staticmethod
+    def key(handle: "EventHandle") -> Hashable:
+        target = handle[3]
+        if handle[5] is None:
+            return type(target)
+        return getattr(target, "__qualname__", None) or type(target)
+
+    def record(self, key: Hashable, duration: float, count: int = 1) -> None:
+        """Record that count events of a kind took duration seconds to execute together."""
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = EventStats()
+        stats.count += count
+        stats.total += duration
+        if duration > stats.max:
+            stats.max = duration
+        stats._seen += 1
+        if len(stats.samples) < self.reservoir_size:
+            stats.samples.append(duration)
+        else:
+            i = self._random.randrange(stats._seen)
+            if i < self.reservoir_size:
+                stats.samples[i] = duration
+
+        self.events += count
+        self._until_sample -= count
+        if self._until_sample <= 0:
+            self._until_sample = self.queue_sample_interval
+            self.queue_length_samples.append(
+                (self.sim.sim_time, time.perf_counter() - self._start_wall, len(self.sim.event_queue))
+            )
+
+    def add_run(self, sim_time: float, wall_time: float) -> None:
+        """Account for a run_until() call that advanced sim_time seconds in wall_time seconds."""
+        self.sim_time += sim_time
+        self.wall_time += wall_time
+
+    @property
+    def condition_checks(self) -> int:
+        return self.sim.event_queue.condition_checks - self._start_checks
+
+    @staticmethod
+    def _name(key: Hashable) -> str:
+        if isinstance(key, type):
+            return f"{key.__module__}.{key.__qualname__}"
+        return str(key)
+
+    def report(self) -> dict[str, Any]:
+        """Structured report, kinds of events are sorted by total wall time."""
+        ordered = sorted(self.stats.items(), key=lambda item: item[1].total, reverse=True)
+        return {
+            "events": self.events,
+            "condition_checks": self.condition_checks,
+            "sim_time": self.sim_time,
+            "wall_time": self.wall_time,
+            "sim_wall_ratio": self.sim_time / self.wall_time if self.wall_time else 0.0,
+            "events_per_second": self.events / self.wall_time if self.wall_time else 0.0,
+            "event_types": {self._name(key): stats.to_dict() for key, stats in ordered},
+            "queue_length": [
+                {"sim_time": sim_time, "wall_time": wall_time, "length": length}
+                for sim_time, wall_time, length in self.queue_length_samples
+            ],
+        }
+
+    def to_json(self, path: str | None = None, indent: int = 2) -> str:
+        """Report as JSON, also written to path if given."""
+        text = json.dumps(self.report(), indent=indent)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(text)
+        return text
+
+    def __str__(self) -> str:
+        report = self.report()
+        lines = [
+            f"{report['events']} events, {report['condition_checks']} condition checks, "
+            f"{report['wall_time']:.3f}s wall, sim/wall {report['sim_wall_ratio']:.2f}",
+            f"{'event type':<50} {'count':>9} {'total (s)':>10} {'mean (us)':>10} {'p99 (us)':>10}",
+        ]
+        for name, stats in report["event_types"].items():
+            lines.append(
+                f"{name[-50:]:<50} {stats['count']:>9} {stats['total']:>10.3f} {stats['mean'] * 1e6:>10.1f} "
+                f"{stats['p99'] * 1e6:>10.1f}"
+            )
+        return "\n".join(lines)
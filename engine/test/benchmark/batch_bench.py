@@ -0,0 +1,86 @@
+import math
+import time
+from typing import Sequence
+
+import numpy as np
+
+from sim.simulator import Simulator
+from sim.event.event import TimedEvent
+
+
+class _Fleet:
+    """Positions of movers in one array, like an AGV fleet moving on a grid of equal length paths."""
+
+    def __init__(self, count: int):
+        self.position = np.zeros((count, 2))
+        self.heading = np.zeros(count)
+        self.moves = 0
+
+
+class _MoveEvent(TimedEvent):
+    __slots__ = "fleet", "index", "target"
+
+    def __init__(self, sim_time: float, fleet: _Fleet, index: int, target: tuple[float, float]):
+        super().__init__(sim_time)
+        self.fleet = fleet
+        self.index = index
+        self.target = target
+
+    def execute(self, simulator: Simulator) -> None:
+        fleet = self.fleet
+        x, y = fleet.position[self.index]
+        tx, ty = self.target
+        fleet.heading[self.index] = math.atan2(ty - y, tx - x)
+        fleet.position[self.index] = self.target
+        fleet.moves += 1
+        _MoveEvent._next(simulator, self)
+
+    @staticmethod
+    def _next(simulator: Simulator, event: "_MoveEvent") -> None:
+        tx, ty = event.target
+        event.target = (ty + 1.0, tx)
+        event.sim_time = simulator.sim_time + 1.0
+        simulator.event_queue.add(event)
+
+
+class _BatchedMoveEvent(_MoveEvent):
+    __slots__ = ()
+
+    @classmethod
+    def execute_batch(cls, events: Sequence["_BatchedMoveEvent"], simulator: Simulator) -> None:
+        fleet = events[0].fleet
+        index = np.fromiter((e.index for e in events), np.intp, len(events))
+        target = np.array([e.target for e in events])
+        delta = target - fleet.position[index]
+        fleet.heading[index] = np.arctan2(delta[:, 1], delta[:, 0])
+        fleet.position[index] = target
+        fleet.moves += len(events)
+        for event in events:
+            _MoveEvent._next(simulator, event)
+
+
+def _run(event_type: type[_MoveEvent], batch_execution: bool, movers: int, steps: int) -> tuple[float, _Fleet]:
+    simulator = Simulator(batch_execution=batch_execution)
+    fleet = _Fleet(movers)
+    for i in range(movers):
+        simulator.event_queue.add(event_type(1.0, fleet, i, (float(i), 0.0)))
+    t = time.perf_counter()
+    simulator.run_until(steps + 0.5)
+    return (time.perf_counter() - t) / (movers * steps), fleet
+
+
+def main():
+    steps = 20
+    print(f"{'movers':>8} {'run_until (us/ev)':>18} {'batched, no hook':>17} {'execute_batch':>14} {'speedup':>8}")
+    for movers in (10, 100, 1000, 10000):
+        plain_time, plain = _run(_MoveEvent, False, movers, steps)
+        unhooked_time, _ = _run(_MoveEvent, True, movers, steps)
+        batch_time, batched = _run(_BatchedMoveEvent, True, movers, steps)
+        assert plain.moves == batched.moves
+        assert np.allclose(plain.position, batched.position) and np.allclose(plain.heading, batched.heading)
+        print(f"{movers:>8} {plain_time * 1e6:>18.2f} {unhooked_time * 1e6:>17.2f} {batch_time * 1e6:>14.2f} "
+              f"{plain_time / batch_time:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import os
+import pathlib
+import random
+import sys
+import time
+
+from gdmath import *
+
+from sim.simulator import Simulator
+from sim.routing.graph import CSRGraph
+from sim.routing.batch import BatchPlanner
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "logistics_example"))
+import config_generator
+
+
+def _grid_graph(size: tuple[int, int]) -> CSRGraph:
+    network = config_generator.generate(size)["network"]
+    return CSRGraph([Vec3(*pos) for _, pos in network["points"]], [(begin, end) for _, begin, end in network["paths"]])
+
+
+def _wave(graph: CSRGraph, workers: int, requests: list) -> tuple[float, list]:
+    """Issue all requests from events at one sim_time, like a wave of timeouts, and time the simulation."""
+    simulator = Simulator()
+    routes = []
+    with BatchPlanner(simulator, graph, workers) as planner:
+        def issue(origin: int, destination: int, blocked: list[int]):
+            planner.request(origin, destination, blocked).then(routes.append)
+
+        for origin, destination, blocked in requests:
+            simulator.schedule(1, issue, origin, destination, blocked)
+        if workers:
+            # Start the pool outside of the timed part
+            planner.update()
+        t = time.perf_counter()
+        simulator.run_until(2)
+        return time.perf_counter() - t, routes
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    print(f"{cpus} CPUs")
+    print(f"{'grid':>9} {'requests':>9} {'workers':>8} {'wave (ms)':>10} {'speedup':>8}")
+    for size, count in (((50, 50), 64), ((150, 150), 64), ((250, 250), 32)):
+        graph = _grid_graph(size)
+        rnd = random.Random(0)
+        n = graph.node_count
+        requests = [(rnd.randrange(n), rnd.randrange(n), rnd.sample(range(n), n // 50)) for _ in range(count)]
+        base_time, expected = _wave(graph, 0, requests)
+        print(f"{size[0]:>4}x{size[1]:<4} {count:>9} {0:>8} {base_time * 1e3:>10.1f} {1:>7.2f}x")
+        for workers in sorted({1, 2, 4, cpus}):
+            wave_time, routes = _wave(graph, workers, requests)
+            assert routes == expected, "The routes depend on the number of workers."
+            print(f"{size[0]:>4}x{size[1]:<4} {count:>9} {workers:>8} {wave_time * 1e3:>10.1f} "
+                  f"{base_time / wave_time:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
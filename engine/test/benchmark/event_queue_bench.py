@@ -0,0 +1,148 @@
+import bisect
+import math
+import random
+import time
+from collections import deque
+from typing import Callable
+
+from sim.simulator import Simulator
+from sim.contents.sim_obj import SimObj
+from sim.data.property import SimInstanceProperty
+from sim.event.event import TimedEvent, TimedEventImpl, ConditionalEventImpl
+from sim.event.event_queue import EventQueue, OrderingMode, ConditionCheckMode
+
+from workloads import NopEvent, hold
+
+
+class _ListEventQueue(EventQueue):
+    """The old bisect.insort + list.pop(0) timed queue, kept as the baseline."""
+
+    def __init__(self, simulator: Simulator):
+        super().__init__(simulator)
+        self._events = []
+
+    def _add_timed_event(self, event: TimedEvent):
+        bisect.insort_right(self._events, event, key=lambda e: e.sim_time)
+
+    def pop_next_event(self, max_time: float = math.inf):
+        if not self._events or self._events[0].sim_time > max_time:
+            return None
+        event = self._events.pop(0)
+        self._to_check = deque(self._condition_events)
+        return event
+
+    def remove(self, event: TimedEvent) -> None:
+        self._events.remove(event)
+
+
+def _cancel_churn(queue, pending: int, operations: int, seed: int = 0) -> float:
+    """
+    Timeout churn: keep `pending` events queued, then repeatedly cancel a random one of them and schedule a
+    replacement, like AGV.navigate() does with its unblock events.
+    :return: seconds per cancel + schedule
+    """
+    rnd = random.Random(seed)
+    events = [NopEvent(rnd.random() * 10) for _ in range(pending)]
+    for e in events:
+        queue.add(e)
+    t = time.perf_counter()
+    for _ in range(operations):
+        i = rnd.randrange(pending)
+        queue.remove(events[i])
+        events[i] = NopEvent(rnd.random() * 10)
+        queue.add(events[i])
+    return (time.perf_counter() - t) / operations
+
+
+class _Lock(SimObj):
+    locked = SimInstanceProperty()
+
+    def __init__(self):
+        super().__init__()
+        self.locked = True
+
+
+def _blocked_conditions(mode: ConditionCheckMode, waiting: int, events: int) -> tuple[float, int]:
+    """
+    `waiting` conditional events wait on their own lock while `events` timed events keep releasing a single one of
+    them, the released waiter locks it again and waits once more.
+    :return: seconds per timed event and the number of condition checks
+    """
+    simulator = Simulator()
+    simulator.event_queue.condition_check_mode = mode
+    locks = [_Lock() for _ in range(waiting)]
+    checks = 0
+
+    def waiter(lock: _Lock):
+        def check():
+            nonlocal checks
+            checks += 1
+            return not lock.locked
+        def execute(_):
+            lock.locked = True
+            waiter(lock)
+        simulator.event_queue << ConditionalEventImpl(check, execute, ((lock, "locked"),))
+
+    for lock in locks:
+        waiter(lock)
+    for i in range(events):
+        simulator.event_queue << TimedEventImpl(float(i), lambda e, _: setattr(locks[0], "locked", False))
+    t = time.perf_counter()
+    simulator.run_until(events)
+    return (time.perf_counter() - t) / events, checks
+
+
+def check_ordering(make_queue: Callable[[Simulator], object], count: int = 2000) -> None:
+    """Verify that equal timestamps are popped in FIFO/LIFO order and that RANDOM is deterministic."""
+    for mode in OrderingMode:
+        orders = []
+        for _ in range(2):
+            simulator = Simulator()
+            queue = make_queue(simulator)
+            queue.ordering_mode = mode
+            events = [NopEvent(float(i % 7)) for i in range(count)]
+            for e in events:
+                queue.add(e)
+            popped = []
+            while (e := queue.pop_next_event()) is not None:
+                popped.append(events.index(e))
+            assert [events[i].sim_time for i in popped] == sorted(e.sim_time for e in events)
+            orders.append(popped)
+        match mode:
+            case OrderingMode.FIFO:
+                assert orders[0] == sorted(range(count), key=lambda i: (i % 7, i))
+            case OrderingMode.LIFO:
+                assert orders[0] == sorted(range(count), key=lambda i: (i % 7, -i))
+            case OrderingMode.RANDOM:
+                assert orders[0] == orders[1]
+
+
+def main():
+    check_ordering(lambda s: s.event_queue)
+
+    operations = 20000
+    print(f"{'pending':>10} {'list (us/op)':>14} {'heap (us/op)':>14} {'speedup':>9}")
+    for pending in (100, 1000, 10000, 100000):
+        list_time = hold(_ListEventQueue(Simulator()), pending, operations)
+        heap_time = hold(Simulator().event_queue, pending, operations)
+        print(f"{pending:>10} {list_time * 1e6:>14.2f} {heap_time * 1e6:>14.2f} {list_time / heap_time:>8.1f}x")
+
+    operations = 5000
+    print()
+    print(f"{'pending':>10} {'list cancel (us/op)':>20} {'handle cancel (us/op)':>22} {'speedup':>9}")
+    for pending in (100, 1000, 10000, 100000):
+        list_time = _cancel_churn(_ListEventQueue(Simulator()), pending, operations)
+        heap_time = _cancel_churn(Simulator().event_queue, pending, operations)
+        print(f"{pending:>10} {list_time * 1e6:>20.2f} {heap_time * 1e6:>22.2f} {list_time / heap_time:>8.1f}x")
+
+    events = 2000
+    print()
+    print(f"{'waiting':>10} {'poll (us/event)':>16} {'checks':>9} {'deps (us/event)':>16} {'checks':>9}")
+    for waiting in (10, 100, 1000):
+        poll_time, poll_checks = _blocked_conditions(ConditionCheckMode.POLL, waiting, events)
+        deps_time, deps_checks = _blocked_conditions(ConditionCheckMode.DEPENDENCIES, waiting, events)
+        print(f"{waiting:>10} {poll_time * 1e6:>16.2f} {poll_checks:>9} {deps_time * 1e6:>16.2f} {deps_checks:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import pathlib
+import random
+import sys
+import time
+
+from gdmath import *
+
+from sim.routing.graph import CSRGraph
+from sim.routing.astar import AStar
+from sim.routing.hpa import HierarchicalRouter
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "logistics_example"))
+import config_generator
+
+
+def _grid_graph(size: tuple[int, int]) -> CSRGraph:
+    network = config_generator.generate(size)["network"]
+    return CSRGraph([Vec3(*pos) for _, pos in network["points"]], [(begin, end) for _, begin, end in network["paths"]])
+
+
+def main():
+    print(f"{'grid':>9} {'build (s)':>10} {'clusters':>9} {'plan (ms)':>10} {'route (ms)':>11} {'A* (ms)':>9} "
+          f"{'worst':>6} {'lock (ms)':>10}")
+    for size in ((50, 50), (100, 100), (200, 200), (320, 320)):
+        graph = _grid_graph(size)
+        n = graph.node_count
+        rnd = random.Random(0)
+        blocked = set(rnd.sample(range(n), n // 20))
+
+        t = time.perf_counter()
+        router = HierarchicalRouter(graph)
+        for node in blocked:
+            router.set_blocked(node, True)
+        router.find(0, 0)
+        router.find(0, n - 1)
+        build_time = time.perf_counter() - t
+
+        queries = []
+        while len(queries) < 20:
+            origin, destination = rnd.randrange(n), rnd.randrange(n)
+            if destination not in blocked:
+                queries.append((origin, destination))
+
+        # Planning plus the few hops update_locked_points looks ahead
+        t = time.perf_counter()
+        for origin, destination in queries:
+            router.find(origin, destination).prefix(3)
+        plan_time = (time.perf_counter() - t) / len(queries)
+        t = time.perf_counter()
+        routes = [list(router.find(origin, destination)) for origin, destination in queries]
+        route_time = (time.perf_counter() - t) / len(queries)
+
+        astar = AStar(graph)
+        t = time.perf_counter()
+        expected = [astar.find(origin, destination, blocked) for origin, destination in queries]
+        astar_time = (time.perf_counter() - t) / len(queries)
+        ratio = 0.0
+        for route, (origin, destination), optimal in zip(routes, queries, expected):
+            assert route[0] == origin and route[-1] == destination
+            assert all(graph.has_edge(u, v) and v not in blocked for u, v in zip(route, route[1:]))
+            ratio = max(ratio, astar.cost(route) / astar.cost(optimal))
+
+        # Lock and free a node, then plan again
+        t = time.perf_counter()
+        for origin, destination in queries:
+            node = destination
+            while node in (origin, destination):
+                node = rnd.randrange(n)
+            router.set_blocked(node, True)
+            router.find(origin, destination).prefix(3)
+            router.set_blocked(node, False)
+        lock_time = (time.perf_counter() - t) / len(queries) - plan_time
+
+        print(f"{size[0]:>4}x{size[1]:<4} {build_time:>10.2f} {router.cluster_count:>9} {plan_time * 1e3:>10.2f} "
+              f"{route_time * 1e3:>11.2f} {astar_time * 1e3:>9.2f} {ratio:>6.3f} {lock_time * 1e3:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
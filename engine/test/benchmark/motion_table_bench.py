@@ -0,0 +1,98 @@
+import math
+import random
+import time
+
+import numpy as np
+from gdmath import *
+
+from sim.contents.agent import Agent
+from sim.contents.motion_table import MotionTable
+from sim.contents.transform_store import TransformStore
+
+motions = MotionTable()
+sim_time = 0.0
+
+
+class LerpAgent(Agent):
+    """Evaluates its pose per access, like AGV did before the MotionTable."""
+
+    def __init__(self, name: str, start: Vec3, end: Vec3, rotation: float, end_time: float):
+        super().__init__(name)
+        self.start = start
+        self.end = end
+        self.rotation = rotation
+        self.end_rotation = rotation + 1.0
+        self.begin_time = 0.0
+        self.end_time = end_time
+
+    def _lerp(self):
+        return (sim_time - self.begin_time) / (self.end_time - self.begin_time)
+
+    @property
+    def transform(self) -> Transform3D:
+        rotation = self.rotation + (self.end_rotation - self.rotation) * self._lerp()
+        return Transform3D.rotating(Vec3(0, 1, 0), rotation % (math.pi * 2), origin=self.position)
+
+    @property
+    def position(self) -> Vec3:
+        return self.start + (self.end - self.start) * self._lerp()
+
+
+class TableAgent(Agent):
+    @property
+    def transform(self) -> Transform3D:
+        return motions.transform(self, sim_time)
+
+
+def main():
+    global sim_time
+    print(f"{'agents':>7} {'lerp (ms)':>10} {'table (ms)':>11} {'speedup':>8} {'store (ms)':>11} "
+          f"{'+table (ms)':>12} {'speedup':>8}")
+    for count in (100, 1000, 10000):
+        rnd = random.Random(0)
+        motions.clear()
+        lerp_agents = Agent("Lerp")
+        table_agents = Agent("Table")
+        for i in range(count):
+            start = Vec3(rnd.uniform(0, 100), 0, rnd.uniform(0, 100))
+            end = start + Vec3(rnd.uniform(-2, 2), 0, rnd.uniform(-2, 2))
+            rotation = rnd.uniform(0, math.pi * 2)
+            end_time = rnd.uniform(1, 3)
+            lerp_agents.add_child(LerpAgent(f"Lerp{i}", start, end, rotation, end_time))
+            agent = TableAgent(f"Table{i}")
+            table_agents.add_child(agent)
+            motions.add(agent, start)
+            motions.move(agent, start, rotation, 0.0, end, rotation + 1.0, end_time)
+        rows = motions.rows(table_agents.children)
+        plain_store = TransformStore()
+        plain_store.add_subtree(lerp_agents)
+        table_store = TransformStore(motions=motions, clock=lambda: sim_time)
+        table_store.add_subtree(table_agents)
+
+        frames = 20
+        lerp_time = table_time = plain_store_time = table_store_time = 0.0
+        for frame in range(frames):
+            sim_time = frame / 60
+            # A snapshot of the poses of every agent
+            t = time.perf_counter()
+            expected = [(*t.x, *t.y, *t.z, *t.origin) for t in (a.transform for a in lerp_agents.children)]
+            lerp_time += time.perf_counter() - t
+            t = time.perf_counter()
+            found = motions.transforms(sim_time, rows)
+            table_time += time.perf_counter() - t
+            assert np.allclose(np.array(expected).reshape(-1, 4, 3), found)
+
+            t = time.perf_counter()
+            expected = plain_store.global_transforms()
+            plain_store_time += time.perf_counter() - t
+            t = time.perf_counter()
+            found = table_store.global_transforms()
+            table_store_time += time.perf_counter() - t
+            assert np.allclose(expected, found)
+        print(f"{count:>7} {lerp_time / frames * 1e3:>10.2f} {table_time / frames * 1e3:>11.3f} "
+              f"{lerp_time / table_time:>7.1f}x {plain_store_time / frames * 1e3:>11.2f} "
+              f"{table_store_time / frames * 1e3:>12.3f} {plain_store_time / table_store_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
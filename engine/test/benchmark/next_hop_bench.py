@@ -0,0 +1,58 @@
+import pathlib
+import random
+import sys
+import tempfile
+import time
+
+from sim.routing.graph import CSRGraph
+from sim.routing.astar import AStar
+from sim.routing.next_hop import NextHopTable, Router
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "logistics_example"))
+import config_generator
+from model import LogisticsModel, reset_simulator
+
+
+def main():
+    print(f"{'grid':>9} {'compute (s)':>12} {'file (MiB)':>11} {'load (ms)':>10} {'table (us)':>11} {'A* (us)':>9} "
+          f"{'speedup':>8}")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for size in ((13, 13), (25, 25), (40, 40)):
+            reset_simulator()
+            graph = CSRGraph.from_network(LogisticsModel(config_generator.generate(size)).network)
+
+            t = time.perf_counter()
+            NextHopTable.for_graph(graph, cache_dir).close()
+            compute_time = time.perf_counter() - t
+            t = time.perf_counter()
+            table = NextHopTable.for_graph(graph, cache_dir)
+            load_time = time.perf_counter() - t
+
+            rnd = random.Random(0)
+            queries = [(rnd.randrange(graph.node_count), rnd.randrange(graph.node_count)) for _ in range(500)]
+            astar = AStar(graph)
+            router = Router(graph, table)
+            for origin, destination in queries[:100]:
+                expected = astar.find(origin, destination)
+                route = router.find(origin, destination)
+                assert route[0] == origin and route[-1] == destination
+                assert abs(astar.cost(route) - astar.cost(expected)) < 1e-6
+                assert abs(table.distance(origin, destination) - astar.cost(expected)) < 1e-3
+
+            t = time.perf_counter()
+            for origin, destination in queries:
+                router.find(origin, destination)
+            table_time = (time.perf_counter() - t) / len(queries)
+            t = time.perf_counter()
+            for origin, destination in queries:
+                astar.find(origin, destination)
+            astar_time = (time.perf_counter() - t) / len(queries)
+            print(f"{size[0]:>4}x{size[1]:<4} {compute_time:>12.2f} {table.path.stat().st_size / 2 ** 20:>11.2f} "
+                  f"{load_time * 1e3:>10.3f} {table_time * 1e6:>11.1f} {astar_time * 1e6:>9.1f} "
+                  f"{astar_time / table_time:>7.1f}x")
+            del router
+            table.close()
+
+
+if __name__ == '__main__':
+    main()
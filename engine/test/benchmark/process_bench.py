@@ -0,0 +1,69 @@
+import time
+
+from sim.simulator import Simulator
+from sim.event.event import TimedEventImpl
+
+# Delays of the steps of AGV.assign_task() in the logistics example, travelling is replaced by fixed delays
+_STEPS = (4.0, 3.0, 6.0, 3.0, 10.0, 3.0, 6.0, 3.0)
+
+
+def _callbacks(simulator: Simulator, tasks: int, log: list) -> None:
+    """Nested callbacks, each step allocating a TimedEventImpl and a closure, like AGV.assign_task()."""
+    def task(remaining: int):
+        def step(i: int):
+            def done(*_):
+                log.append(simulator.sim_time)
+                if i + 1 < len(_STEPS):
+                    step(i + 1)
+                elif remaining > 1:
+                    task(remaining - 1)
+            simulator.event_queue << TimedEventImpl(simulator.sim_time + _STEPS[i], done)
+        step(0)
+    task(tasks)
+
+
+def _process_timeouts(simulator: Simulator, tasks: int, log: list):
+    for _ in range(tasks):
+        for delay in _STEPS:
+            yield simulator.timeout(delay)
+            log.append(simulator.sim_time)
+
+
+def _process_numbers(simulator: Simulator, tasks: int, log: list):
+    for _ in range(tasks):
+        for delay in _STEPS:
+            yield delay
+            log.append(simulator.sim_time)
+
+
+def _run(style: str, agents: int, tasks: int) -> tuple[float, list]:
+    simulator = Simulator()
+    log = []
+    for _ in range(agents):
+        match style:
+            case "callbacks":
+                _callbacks(simulator, tasks, log)
+            case "timeouts":
+                simulator.process(_process_timeouts(simulator, tasks, log))
+            case "numbers":
+                simulator.process(_process_numbers(simulator, tasks, log))
+    t = time.perf_counter()
+    simulator.run_until(1e9)
+    return (time.perf_counter() - t) / len(log), log
+
+
+def main():
+    agents = 1000
+    tasks = 20
+    reference = None
+    print(f"{'style':>18} {'us/step':>9}")
+    for style, name in (("callbacks", "nested callbacks"), ("timeouts", "yield timeout()"), ("numbers", "yield delay")):
+        seconds, log = _run(style, agents, tasks)
+        # All styles must produce the same step times in the same order
+        assert reference is None or log == reference
+        reference = log
+        print(f"{name:>18} {seconds * 1e6:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
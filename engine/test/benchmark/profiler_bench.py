@@ -0,0 +1,36 @@
+import time
+
+from sim.simulator import Simulator
+
+
+class _Agent:
+    def __init__(self, simulator: Simulator):
+        self.sim = simulator
+
+    def step(self) -> None:
+        self.sim.schedule(1.0, self.step)
+
+
+def _run(profiling: bool, agents: int, steps: int) -> tuple[float, Simulator]:
+    simulator = Simulator()
+    for _ in range(agents):
+        simulator.schedule(0, _Agent(simulator).step)
+    if profiling:
+        simulator.start_profiling()
+    t = time.perf_counter()
+    simulator.run_until(steps - 0.5)
+    return (time.perf_counter() - t) / (agents * steps), simulator
+
+
+def main():
+    agents, steps = 1000, 200
+    off_time, _ = _run(False, agents, steps)
+    on_time, simulator = _run(True, agents, steps)
+    print(f"profiling off: {off_time * 1e6:.2f} us/event")
+    print(f"profiling on:  {on_time * 1e6:.2f} us/event ({on_time / off_time:.2f}x)")
+    print()
+    print(simulator.profiler)
+
+
+if __name__ == '__main__':
+    main()
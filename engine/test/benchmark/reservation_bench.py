@@ -0,0 +1,31 @@
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "logistics_example"))
+import config_generator
+import model
+
+
+def main():
+    print(f"{'grid':>9} {'agvs':>5} {'mode':>12} {'tasks':>6} {'events':>8} {'AGV events':>11} {'per task':>9} "
+          f"{'wall (s)':>9}")
+    for size, agv_count, duration in (((13, 13), 13, 2000.0), ((25, 25), 25, 1000.0), ((25, 25), 50, 1000.0)):
+        for cooperative in (False, True):
+            simulator = model.reset_simulator()
+            logistics_model = model.LogisticsModel(config_generator.generate(size, agv_count), cooperative)
+            profiler = simulator.start_profiling()
+            t = time.perf_counter()
+            simulator.run_until(duration)
+            wall_time = time.perf_counter() - t
+            report = profiler.report()
+            tasks = logistics_model.source_event.completed_tasks
+            # Everything but the task source, which runs at a fixed rate
+            agv_events = report["events"] - report["event_types"]["model.SourceEvent"]["count"]
+            print(f"{size[0]:>4}x{size[1]:<4} {agv_count:>5} {'cooperative' if cooperative else 'reactive':>12} "
+                  f"{tasks:>6} {report['events']:>8} {agv_events:>11} {agv_events / max(tasks, 1):>9.1f} "
+                  f"{wall_time:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
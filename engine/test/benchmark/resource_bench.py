@@ -0,0 +1,123 @@
+import random
+import time
+
+from sim.simulator import Simulator
+from sim.contents.sim_obj import SimObj
+from sim.data.property import SimInstanceProperty
+from sim.event.event import ConditionalEventImpl
+from sim.event.event_queue import ConditionCheckMode
+from sim.event.resource import Lock, Store
+
+
+class _Point(SimObj):
+    locked_by = SimInstanceProperty()
+
+    def __init__(self):
+        super().__init__()
+        self.locked_by = None
+
+
+def _polling(mode: ConditionCheckMode, agents: int, points: int, visits: int, seed: int = 0) -> tuple[float, int]:
+    """Point.locked_by + a ConditionalEventImpl per waiting agent, like the logistics example."""
+    rnd = random.Random(seed)
+    simulator = Simulator()
+    simulator.event_queue.condition_check_mode = mode
+    pts = [_Point() for _ in range(points)]
+    checks = 0
+
+    def visit(agent: int, remaining: int):
+        point = pts[rnd.randrange(points)]
+
+        def free() -> bool:
+            nonlocal checks
+            checks += 1
+            return point.locked_by is None
+
+        def acquire(*_):
+            point.locked_by = agent
+            simulator.schedule(rnd.random(), leave, point, agent, remaining)
+
+        if free():
+            acquire()
+        else:
+            simulator.event_queue << ConditionalEventImpl(free, acquire, ((point, "locked_by"),))
+
+    def leave(point: _Point, agent: int, remaining: int):
+        point.locked_by = None
+        if remaining > 1:
+            visit(agent, remaining - 1)
+
+    for a in range(agents):
+        visit(a, visits)
+    t = time.perf_counter()
+    simulator.run_until(1e9)
+    return (time.perf_counter() - t) / (agents * visits), checks
+
+
+def _locks(agents: int, points: int, visits: int, seed: int = 0) -> tuple[float, int]:
+    rnd = random.Random(seed)
+    simulator = Simulator()
+    locks = [Lock(simulator) for _ in range(points)]
+
+    def agent(a: int):
+        for _ in range(visits):
+            request = locks[rnd.randrange(points)].request(a)
+            yield request
+            yield rnd.random()
+            request.release()
+
+    for a in range(agents):
+        simulator.process(agent(a))
+    t = time.perf_counter()
+    simulator.run_until(1e9)
+    return (time.perf_counter() - t) / (agents * visits), 0
+
+
+def _store_timeline(capacity: int, put_delay: float, get_delay: float, items: int = 3):
+    """(item, time) of every get() and of every put() that completed, for a producer and a consumer sharing a Store."""
+    simulator = Simulator()
+    store = Store(simulator, capacity)
+    got = []
+    put = []
+
+    def producer():
+        for i in range(items):
+            yield put_delay
+            yield store.put(i)
+            put.append((i, simulator.sim_time))
+
+    def consumer():
+        for _ in range(items):
+            yield get_delay
+            got.append(((yield store.get()), simulator.sim_time))
+
+    simulator.process(producer())
+    simulator.process(consumer())
+    simulator.run_until(100)
+    return got, put
+
+
+def check_store() -> None:
+    """Hand-offs through a Store without capacity, and a put() into a full Store waiting for a get()."""
+    hand_offs = [(0, 2.0), (1, 4.0), (2, 6.0)]
+    # The putter waiting for the getter, then the other way around
+    assert _store_timeline(0, 1, 2) == (hand_offs, hand_offs)
+    assert _store_timeline(0, 2, 1) == (hand_offs, hand_offs)
+    assert _store_timeline(1, 0, 5) == ([(0, 5.0), (1, 10.0), (2, 15.0)], [(0, 0.0), (1, 5.0), (2, 10.0)])
+
+
+def main():
+    check_store()
+    visits = 20
+    print(f"{'agents':>7} {'points':>7} {'poll (us/visit)':>16} {'checks':>9} {'deps (us/visit)':>16} {'checks':>9} "
+          f"{'lock (us/visit)':>16}")
+    for agents, points in ((100, 50), (1000, 500), (1000, 50)):
+        poll_time, poll_checks = _polling(ConditionCheckMode.POLL, agents, points, visits)
+        deps_time, deps_checks = _polling(ConditionCheckMode.DEPENDENCIES, agents, points, visits)
+        lock_time, _ = _locks(agents, points, visits)
+        print(f"{agents:>7} {points:>7} {poll_time * 1e6:>16.2f} {poll_checks:>9} {deps_time * 1e6:>16.2f} "
+              f"{deps_checks:>9} {lock_time * 1e6:>16.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+import pathlib
+import random
+import sys
+import time
+
+from gdmath import *
+
+from sim.contents.agent import Agent
+from sim.routing.graph import CSRGraph
+from sim.routing.astar import AStar
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "logistics_example"))
+import config_generator
+import path_find
+from model import LogisticsModel, reset_simulator
+
+
+def _network(size: tuple[int, int]) -> Agent:
+    reset_simulator()
+    return LogisticsModel(config_generator.generate(size)).network
+
+
+def _queries(count: int, nodes: int, seed: int = 0) -> list[tuple[int, int, list[int]]]:
+    rnd = random.Random(seed)
+    return [
+        (rnd.randrange(nodes), rnd.randrange(nodes), rnd.sample(range(nodes), rnd.choice((0, nodes // 20, nodes // 5))))
+        for _ in range(count)
+    ]
+
+
+def check_paths(network: Agent, graph: CSRGraph, queries) -> None:
+    """AStar on the graph finds routes as short as path_find on the Point nodes."""
+    points = graph.objects
+    astar = AStar(graph)
+    for begin, end, blocked in queries:
+        blocked = set(blocked) - {begin, end}
+        expected = path_find.path_find(points[begin].node, points[end].node, {points[i].node for i in blocked})
+        found = astar.find(begin, end, blocked)
+        assert (expected is None) == (found is None)
+        if found is not None:
+            expected = [n.point for n in expected]
+            assert found[0] == begin and found[-1] == end
+            assert all(graph.has_edge(found[i], found[i + 1]) for i in range(len(found) - 1))
+            expected_cost = sum(a.position | b.position for a, b in zip(expected, expected[1:]))
+            assert abs(astar.cost(found) - expected_cost) < 1e-6
+
+
+def check_overlay(graph: CSRGraph, changes: int, seed: int = 0) -> None:
+    """
+    Adding and removing edges through the overlay gives the same graph as building it from scratch, and an AStar
+    patching its rows along the way finds the same routes.
+    """
+    rnd = random.Random(seed)
+    patched = AStar(graph)
+    for i in range(changes):
+        if i % 50 == 0:
+            patched.find(0, graph.node_count - 1)
+        u = rnd.randrange(graph.node_count)
+        if rnd.random() < 0.5:
+            neighbors = [v for v, _ in graph.neighbors(u)]
+            if neighbors:
+                assert graph.remove_edge(u, rnd.choice(neighbors))
+        else:
+            graph.add_edge(u, rnd.randrange(graph.node_count))
+    positions = [Vec3(*graph.positions[3 * i:3 * i + 3]) for i in range(graph.node_count)]
+    rebuilt = CSRGraph(positions, graph.edges())
+    assert sorted(graph.edges()) == sorted(rebuilt.edges())
+    queries = _queries(200, graph.node_count, seed)
+    a, b = AStar(graph), AStar(rebuilt)
+    for begin, end, blocked in queries:
+        pa, pb, pp = a.find(begin, end, blocked), b.find(begin, end, blocked), patched.find(begin, end, blocked)
+        assert (pa is None) == (pb is None) == (pp is None)
+        assert pa is None or abs(a.cost(pa) - b.cost(pb)) < 1e-6 and abs(a.cost(pp) - b.cost(pb)) < 1e-6
+
+
+def main():
+    print(f"{'grid':>9} {'build (ms)':>11} {'CSR (KiB)':>10} {'path_find (us)':>15} {'CSR A* (us)':>12} {'speedup':>8}")
+    for size in ((13, 13), (50, 50), (100, 100)):
+        network = _network(size)
+        t = time.perf_counter()
+        graph = CSRGraph.from_network(network)
+        build_time = time.perf_counter() - t
+        queries = _queries(100, graph.node_count)
+        check_paths(network, graph, queries[:30])
+
+        points = graph.objects
+        node_queries = [(points[b].node, points[e].node, {points[i].node for i in bl} - {points[b].node, points[e].node})
+                        for b, e, bl in queries]
+        t = time.perf_counter()
+        for begin, end, blocked in node_queries:
+            path = path_find.path_find(begin, end, blocked)
+            if path is not None:
+                list(path)
+        node_time = (time.perf_counter() - t) / len(queries)
+
+        astar = AStar(graph)
+        index_queries = [(b, e, set(bl) - {b, e}) for b, e, bl in queries]
+        t = time.perf_counter()
+        for begin, end, blocked in index_queries:
+            astar.find(begin, end, blocked)
+        csr_time = (time.perf_counter() - t) / len(queries)
+        csr_bytes = sum(a.itemsize * len(a) for a in (graph.positions, graph.offsets, graph.targets, graph.weights))
+        print(f"{size[0]:>4}x{size[1]:<4} {build_time * 1e3:>11.2f} {csr_bytes / 1024:>10.1f} {node_time * 1e6:>15.1f} "
+              f"{csr_time * 1e6:>12.1f} "
+              f"{node_time / csr_time:>7.2f}x")
+
+        check_overlay(graph, 500)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import time
+import tracemalloc
+
+from sim.simulator import Simulator
+from sim.event.event import TimedEventImpl
+
+
+class _Agent:
+    def __init__(self):
+        self.steps = 0
+
+    def step(self, value: int) -> None:
+        self.steps += value
+
+
+def _schedule_events(simulator: Simulator, agents: list[_Agent], delay: float) -> None:
+    """The closure + TimedEventImpl style of the logistics example."""
+    for agent in agents:
+        def callback(*_, agent=agent):
+            agent.step(1)
+        simulator.event_queue << TimedEventImpl(simulator.sim_time + delay, callback)
+
+
+def _schedule_calls(simulator: Simulator, agents: list[_Agent], delay: float) -> None:
+    for agent in agents:
+        simulator.schedule(delay, agent.step, 1)
+
+
+def _bytes_per_event(schedule, count: int) -> float:
+    simulator = Simulator()
+    agents = [_Agent() for _ in range(count)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    schedule(simulator, agents, 1.0)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / count
+
+
+def _events_per_second(schedule, count: int, rounds: int) -> float:
+    simulator = Simulator()
+    agents = [_Agent() for _ in range(count)]
+    t = time.perf_counter()
+    for _ in range(rounds):
+        schedule(simulator, agents, 1.0)
+        simulator.advance(1.0)
+    return count * rounds / (time.perf_counter() - t)
+
+
+def main():
+    count = 100000
+    print(f"{'':>10} {'bytes/pending event':>20} {'events/s (schedule + execute)':>30}")
+    for name, schedule in (("events", _schedule_events), ("schedule", _schedule_calls)):
+        print(f"{name:>10} {_bytes_per_event(schedule, count):>20.1f} "
+              f"{_events_per_second(schedule, count, 10):>30.0f}")
+
+
+if __name__ == '__main__':
+    main()
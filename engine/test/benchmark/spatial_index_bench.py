@@ -0,0 +1,49 @@
+import random
+import time
+
+from gdmath import *
+
+from sim.contents.agent import PositionalAgent
+from sim.contents.spatial_index import SpatialIndex
+
+
+def main():
+    print(f"{'agents':>7} {'busy':>5} {'sort (us)':>10} {'index (us)':>11} {'speedup':>8} {'move (us)':>10}")
+    for count in (13, 100, 1000, 10000):
+        for busy in (0.5, 0.95):
+            rnd = random.Random(0)
+            side = 1.5 * count ** 0.5 * 2
+            agents = [PositionalAgent(f"Agent{i}", Vec3(rnd.uniform(0, side), 0, rnd.uniform(0, side)))
+                      for i in range(count)]
+            idle = {agent for agent in agents if rnd.random() >= busy}
+            index = SpatialIndex()
+            for agent in agents:
+                index.watch(agent, "position")
+            targets = [Vec3(rnd.uniform(0, side), 0, rnd.uniform(0, side)) for _ in range(200)]
+
+            # Like the dispatch in SourceEvent: the nearest agent that can take the task
+            t = time.perf_counter()
+            expected = []
+            for target in targets:
+                expected.append(next(
+                    (a for a in sorted(agents, key=lambda a: a.global_position | target) if a in idle), None
+                ))
+            sort_time = (time.perf_counter() - t) / len(targets)
+            t = time.perf_counter()
+            found = []
+            for target in targets:
+                nearest = index.nearest(target, 1, idle.__contains__)
+                found.append(nearest[0] if nearest else None)
+            index_time = (time.perf_counter() - t) / len(targets)
+            assert found == expected
+
+            t = time.perf_counter()
+            for agent in agents[:1000]:
+                agent.position = agent.position + Vec3(1, 0, 1)
+            move_time = (time.perf_counter() - t) / min(count, 1000)
+            print(f"{count:>7} {busy:>5.2f} {sort_time * 1e6:>10.1f} {index_time * 1e6:>11.1f} "
+                  f"{sort_time / index_time:>7.1f}x {move_time * 1e6:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""
+Headless benchmark suite: the logistics model at several scales plus microbenchmarks, results written as JSON.
+
+    PYTHONPATH=. python test/benchmark/suite.py [--quick] [--output results.json]
+"""
+import argparse
+import json
+import pathlib
+import platform
+import random
+import sys
+import time
+from typing import Any, Callable
+
+import numpy as np
+from gdmath import *
+
+from sim.simulator import Simulator
+from sim.contents.agent import SpatialAgent
+from sim.data.serialization import gd_serialize
+
+from workloads import hold
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "logistics_example"))
+import config_generator
+import model
+import path_find
+
+
+def _best_of(repeat: int, func: Callable[[], float]) -> float:
+    return min(func() for _ in range(repeat))
+
+
+def logistics(size: tuple[int, int], agv_count: int, duration: float) -> dict[str, Any]:
+    """Run the logistics model headless for duration sim seconds."""
+    simulator = model.reset_simulator()
+    t = time.perf_counter()
+    logistics_model = model.LogisticsModel(config_generator.generate(size, agv_count))
+    build_time = time.perf_counter() - t
+    profiler = simulator.start_profiling()
+    simulator.run_until(duration)
+    report = profiler.report()
+    return {
+        "size": list(size),
+        "agvs": agv_count,
+        "points": len(logistics_model.points),
+        "duration": duration,
+        "build_time": build_time,
+        "wall_time": report["wall_time"],
+        "events": report["events"],
+        "condition_checks": report["condition_checks"],
+        "events_per_second": report["events_per_second"],
+        "sim_wall_ratio": report["sim_wall_ratio"],
+        "route_cache": model.route_cache.stats(),
+        "event_types": {name: {"count": s["count"], "total": s["total"]} for name, s in report["event_types"].items()},
+    }
+
+
+def event_queue_hold(pending: int, operations: int) -> dict[str, Any]:
+    return {
+        "pending": pending,
+        "us_per_op": _best_of(3, lambda: hold(Simulator().event_queue, pending, operations)) * 1e6,
+    }
+
+
+def _grid_nodes(size: int) -> list[list[path_find.Node]]:
+    nodes = [[path_find.Node(Vec3(x * 1.5, 0, z * 1.5)) for z in range(size)] for x in range(size)]
+    for x in range(size):
+        for z in range(size):
+            for dx, dz in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+                if 0 <= x + dx < size and 0 <= z + dz < size:
+                    nodes[x][z].neighbors.append(nodes[x + dx][z + dz])
+    return nodes
+
+
+def path_find_grid(size: int, queries: int, blocked: float = 0.1, seed: int = 0) -> dict[str, Any]:
+    """Random queries on a 4-connected grid with a fraction of the nodes ignored, like locked points."""
+    rnd = random.Random(seed)
+    nodes = _grid_nodes(size)
+    flat = [n for column in nodes for n in column]
+    pairs = [(rnd.choice(flat), rnd.choice(flat), set(rnd.sample(flat, int(len(flat) * blocked))))
+             for _ in range(queries)]
+
+    def run() -> float:
+        t = time.perf_counter()
+        for begin, end, ignore in pairs:
+            ignore = ignore - {begin, end}
+            path = path_find.path_find(begin, end, ignore)
+            if path is not None:
+                list(path)
+        return (time.perf_counter() - t) / queries
+
+    return {"size": size, "queries": queries, "us_per_query": _best_of(3, run) * 1e6}
+
+
+def global_transform(depth: int, agents: int) -> dict[str, Any]:
+    """Agent.global_transform of the leaves of chains of SpatialAgents."""
+    leaves = []
+    for i in range(agents):
+        agent = SpatialAgent(f"Root{i}", Transform3D.translating(Vec3(i, 0, 0)))
+        for d in range(depth - 1):
+            child = SpatialAgent(f"Agent{i}.{d}", Transform3D.rotating(Vec3(0, 1, 0), 0.1).translated(Vec3(0, 0, 1)))
+            child.parent = agent
+            agent = child
+        leaves.append(agent)
+
+    def run() -> float:
+        t = time.perf_counter()
+        for agent in leaves:
+            agent.global_transform
+        return (time.perf_counter() - t) / agents
+
+    return {"depth": depth, "agents": agents, "us_per_agent": _best_of(3, run) * 1e6}
+
+
+def serialize(agvs: int, shelves: int) -> dict[str, Any]:
+    """gd_serialize of the frame message the logistics example sends to its clients."""
+    rnd = random.Random(0)
+
+    def transform() -> Transform3D:
+        return Transform3D.rotating(Vec3(0, 1, 0), rnd.random() * 6).translated(Vec3(rnd.random(), 0, rnd.random()))
+
+    msg = {
+        "agv_transforms": [transform() for _ in range(agvs)],
+        "shelf_transforms": [transform() for _ in range(shelves)],
+    }
+
+    def run() -> float:
+        t = time.perf_counter()
+        for _ in range(20):
+            gd_serialize(msg)
+        return (time.perf_counter() - t) / 20
+
+    return {"agvs": agvs, "shelves": shelves, "bytes": len(gd_serialize(msg)), "us_per_message": _best_of(3, run) * 1e6}
+
+
+def serialize_packed(agvs: int, shelves: int) -> dict[str, Any]:
+    """The frame message of serialize() with the transforms in PackedFloat32Arrays, like from a TransformStore."""
+    rnd = random.Random(0)
+
+    def transforms(count: int) -> np.ndarray:
+        result = np.zeros((count, 4, 3), dtype=np.float32)
+        for i in range(count):
+            t = Transform3D.rotating(Vec3(0, 1, 0), rnd.random() * 6).translated(Vec3(rnd.random(), 0, rnd.random()))
+            result[i] = (t.x, t.y, t.z, t.origin)
+        return result
+
+    msg = {
+        "agv_transforms": transforms(agvs),
+        "shelf_transforms": transforms(shelves),
+    }
+
+    def run() -> float:
+        t = time.perf_counter()
+        for _ in range(20):
+            gd_serialize(msg)
+        return (time.perf_counter() - t) / 20
+
+    return {"agvs": agvs, "shelves": shelves, "bytes": len(gd_serialize(msg)), "us_per_message": _best_of(3, run) * 1e6}
+
+
+def run_suite(quick: bool = False) -> dict[str, Any]:
+    if quick:
+        scales = (((13, 13), 13, 300.0),)
+    else:
+        scales = (((13, 13), 13, 1000.0), ((25, 25), 25, 1000.0), ((50, 50), 50, 500.0))
+    results: dict[str, Any] = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.time(),
+        "quick": quick,
+    }
+    results["logistics"] = [logistics(size, agv_count, duration) for size, agv_count, duration in scales]
+    results["event_queue_hold"] = [event_queue_hold(pending, 20000) for pending in (1000, 100000)]
+    results["path_find"] = [path_find_grid(size, 20 if quick else 100) for size in ((13, 50) if quick else (13, 50, 100))]
+    results["global_transform"] = [global_transform(depth, 1000) for depth in (1, 3, 6)]
+    results["gd_serialize"] = [serialize(agvs, agvs * 4) for agvs in (13, 100, 1000)]
+    results["gd_serialize_packed"] = [serialize_packed(agvs, agvs * 4) for agvs in (13, 100, 1000)]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="smaller scales, for a quick check")
+    parser.add_argument("--output", help="write the results to this JSON file instead of stdout")
+    args = parser.parse_args()
+
+    results = run_suite(args.quick)
+    text = json.dumps(results, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+import math
+import random
+import time
+from typing import Callable
+
+from sim.simulator import Simulator
+from sim.event.event import TimedEvent
+from sim.event.event_queue import EventQueue
+from sim.event.timed_queue import TimedQueue, HeapTimedQueue, CalendarTimedQueue
+
+from event_queue_bench import check_ordering
+
+
+class _HoldEvent(TimedEvent):
+    def execute(self, simulator: Simulator) -> None:
+        pass
+
+
+def _uniform(rnd: random.Random, now: float) -> float:
+    return now + rnd.random() * 10
+
+
+def _bursty(rnd: random.Random, now: float) -> float:
+    # Most events land on a handful of shared timestamps, the rest are spread out
+    if rnd.random() < 0.9:
+        return now + rnd.randint(1, 4) * 2.5
+    return now + rnd.random() * 100
+
+
+def _periodic(rnd: random.Random, now: float) -> float:
+    # SourceEvent style fixed re-arm
+    return now + 0.05
+
+
+def _never(rnd: random.Random, now: float) -> float:
+    # Parked until the end of the run, like a timeout that is always cancelled
+    return math.inf
+
+
+_WORKLOADS: dict[str, Callable[[random.Random, float], float]] = {
+    "uniform": _uniform,
+    "bursty": _bursty,
+    "periodic": _periodic,
+}
+
+
+def _hold(timed_queue_type: type[TimedQueue], delay: Callable[[random.Random, float], float], pending: int,
+          operations: int, seed: int = 0) -> float:
+    """
+    Keep `pending` events queued, then repeatedly pop the next one and schedule a new one after it.
+    :return: seconds per hold operation
+    """
+    rnd = random.Random(seed)
+    simulator = Simulator(timed_queue_type)
+    queue = simulator.event_queue
+    for _ in range(pending):
+        queue.add(_HoldEvent(delay(rnd, rnd.random())))
+    t = time.perf_counter()
+    for _ in range(operations):
+        event = queue.pop_next_event()
+        queue.add(_HoldEvent(delay(rnd, event.sim_time)))
+    return (time.perf_counter() - t) / operations
+
+
+def check_backends_agree(operations: int = 50000, seed: int = 0) -> None:
+    """Run the same random mix of scheduling, cancelling and rescheduling on every backend and compare the pops."""
+    results = []
+    for timed_queue_type in (HeapTimedQueue, CalendarTimedQueue):
+        rnd = random.Random(seed)
+        simulator = Simulator(timed_queue_type)
+        queue = simulator.event_queue
+        handles = []
+        popped = []
+        now = 0.0
+        for _ in range(operations):
+            r = rnd.random()
+            if r < 0.45:
+                delay = rnd.choice((*_WORKLOADS.values(), _never))
+                handles.append(queue.add(_HoldEvent(delay(rnd, now))))
+            elif r < 0.6 and handles:
+                handles[rnd.randrange(len(handles))].cancel()
+            elif r < 0.7 and handles:
+                i = rnd.randrange(len(handles))
+                if handles[i].pending:
+                    handles[i] = handles[i].reschedule(now + rnd.random() * 20)
+            else:
+                event = queue.pop_next_event(now + rnd.random() * 5)
+                if event is not None:
+                    now = event.sim_time
+                    popped.append(event)
+        while (event := queue.pop_next_event()) is not None:
+            popped.append(event)
+        results.append([(e.sim_time, e._handle[2]) for e in popped])
+    assert all(r == results[0] for r in results)
+
+
+def main():
+    for timed_queue_type in (HeapTimedQueue, CalendarTimedQueue):
+        check_ordering(lambda s: EventQueue(s, timed_queue=timed_queue_type()))
+    check_backends_agree()
+
+    operations = 20000
+    print(f"{'workload':>10} {'pending':>10} {'heap (us/op)':>14} {'calendar (us/op)':>18} {'speedup':>9}")
+    for name, delay in _WORKLOADS.items():
+        for pending in (1000, 10000, 100000, 1000000):
+            heap_time = _hold(HeapTimedQueue, delay, pending, operations)
+            calendar_time = _hold(CalendarTimedQueue, delay, pending, operations)
+            print(f"{name:>10} {pending:>10} {heap_time * 1e6:>14.2f} {calendar_time * 1e6:>18.2f} "
+                  f"{heap_time / calendar_time:>8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import random
+import time
+
+from sim.simulator import Simulator
+
+from workloads import NopEvent
+
+
+def _timeouts(use_wheel: bool, agents: int, duration: float, seed: int = 0) -> tuple[float, int]:
+    """
+    AGV.navigate() style churn: every agent keeps stepping every 0.1-1 s, arming a 1 s or 5 s timeout
+    which the next step cancels again 95% of the time.
+    :return: seconds per step and the largest number of entries held by the timed events queue
+    """
+    rnd = random.Random(seed)
+    simulator = Simulator()
+    queue = simulator.event_queue
+    timeouts = [None] * agents
+    steps = 0
+    largest = 0
+
+    def step(i: int):
+        nonlocal steps, largest
+        steps += 1
+        if timeouts[i] is not None and rnd.random() < 0.95:
+            timeouts[i].cancel()
+        timeout = NopEvent(simulator.sim_time + rnd.choice((1, 5)))
+        timeouts[i] = simulator.timers.arm(timeout) if use_wheel else queue.add(timeout)
+        simulator.schedule(0.1 + rnd.random() * 0.9, step, i)
+        largest = max(largest, queue._timed_events_queue._size())
+
+    for i in range(agents):
+        simulator.schedule_at(rnd.random(), step, i)
+    t = time.perf_counter()
+    simulator.run_until(duration)
+    return (time.perf_counter() - t) / steps, largest
+
+
+def main():
+    print(f"{'agents':>8} {'queue (us/step)':>16} {'queue size':>11} {'wheel (us/step)':>16} {'queue size':>11}")
+    for agents in (100, 1000, 10000):
+        queue_time, queue_size = _timeouts(False, agents, 100000 / agents)
+        wheel_time, wheel_size = _timeouts(True, agents, 100000 / agents)
+        print(f"{agents:>8} {queue_time * 1e6:>16.2f} {queue_size:>11} {wheel_time * 1e6:>16.2f} {wheel_size:>11}")
+
+
+if __name__ == '__main__':
+    main()
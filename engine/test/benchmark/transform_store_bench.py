@@ -0,0 +1,63 @@
+import random
+import time
+from itertools import product
+
+import numpy as np
+from gdmath import *
+
+from sim.contents.agent import Agent, PositionalAgent, SpatialAgent
+from sim.contents.transform_store import TransformStore
+
+
+def main():
+    print(f"{'agvs':>6} {'shelves':>8} {'moving':>7} {'objects (ms)':>13} {'store (ms)':>11} {'speedup':>8}")
+    for count, moving in product((100, 1000, 5000), (1.0, 0.1)):
+        rnd = random.Random(0)
+        # Like the logistics model: AGVs moving every frame, shelves on points or carried by AGVs
+        network = Agent("Network")
+        agvs = Agent("AGVs")
+        points = [PositionalAgent(f"Point{i}", Vec3(rnd.uniform(0, 100), 0, rnd.uniform(0, 100))) for i in range(count)]
+        for point in points:
+            network.add_child(point)
+        for i in range(count):
+            agvs.add_child(SpatialAgent(f"AGV{i}", Transform3D.translating(points[i].position)))
+        shelves = []
+        for i in range(count * 2):
+            shelf = PositionalAgent(f"Shelf{i}", Vec3(0, 0.5, 0))
+            (agvs.children[i] if i < count // 2 else points[i % count]).add_child(shelf)
+            shelves.append(shelf)
+        store = TransformStore()
+        store.add_subtree(agvs)
+        for shelf in shelves:
+            if shelf not in store:
+                store.add(shelf)
+        slots = store.slots([*agvs.children, *shelves])
+
+        def move():
+            for agv in agvs.children[:int(count * moving)]:
+                agv.transform = Transform3D.rotating(Vec3(0, 1, 0), rnd.random()).translated(agv.transform.origin)
+
+        frames = 20
+        objects_time = 0.0
+        store_time = 0.0
+        for _ in range(frames):
+            move()
+            # What a frame sent to clients needs: the floats of every global transform
+            t = time.perf_counter()
+            expected = [
+                [(*t.x, *t.y, *t.z, *t.origin) for t in (agv.global_transform for agv in agvs.children)],
+                [(*t.x, *t.y, *t.z, *t.origin) for t in (shelf.global_transform for shelf in shelves)],
+            ]
+            objects_time += time.perf_counter() - t
+            t = time.perf_counter()
+            transforms = store.global_transforms(slots)
+            found = [transforms[:count], transforms[count:]]
+            store_time += time.perf_counter() - t
+            for e, f in zip(expected, found):
+                assert np.allclose(np.array(e).reshape(-1, 4, 3), f)
+        print(f"{count:>6} {count * 2:>8} {moving:>7.0%} {objects_time / frames * 1e3:>13.2f} "
+              f"{store_time / frames * 1e3:>11.2f} {objects_time / store_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
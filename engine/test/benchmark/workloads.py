@@ -0,0 +1,27 @@
+"""Workloads shared by several benchmarks."""
+import random
+import time
+
+from sim.simulator import Simulator
+from sim.event.event import TimedEvent
+
+
+class NopEvent(TimedEvent):
+    def execute(self, simulator: Simulator) -> None:
+        pass
+
+
+def hold(queue, pending: int, operations: int, seed: int = 0) -> float:
+    """
+    Classic "hold" benchmark: keep `pending` events queued, then repeatedly pop the next event
+    and schedule a new one a random delay after it.
+    :return: seconds per hold operation
+    """
+    rnd = random.Random(seed)
+    for _ in range(pending):
+        queue.add(NopEvent(rnd.random() * 10))
+    t = time.perf_counter()
+    for _ in range(operations):
+        event = queue.pop_next_event()
+        queue.add(NopEvent(event.sim_time + rnd.random() * 10))
+    return (time.perf_counter() - t) / operations
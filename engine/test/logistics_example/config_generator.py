@@ -3,8 +3,15 @@ from itertools import product
 from random import randint
 
 
-def generate() -> dict:
-    size = (13, 13)
+def generate(size: tuple[int, int] = (13, 13), agv_count: int | None = None) -> dict:
+    """
+    :param size: number of points along x and z, shelves are placed from x=2 to x=size[0]-5,
+        destinations at the last x
+    :param agv_count: number of AGVs, placed column by column from x=0, one per point of the first column by default
+    """
+    if agv_count is None:
+        agv_count = size[1]
+    assert agv_count <= size[1] * 2, "AGVs may only be placed in the first two columns"
 
     _ppos = {}
     points = []
@@ -12,16 +19,15 @@ def generate() -> dict:
     for x in range(size[0]):
         for z in range(size[1]):
             points.append((f"Point{cnt}", [x, 0, z]))
+            _ppos[(x, 0, z)] = cnt
             cnt += 1
 
     def point_pos(p):
         return p[1]
 
     def find_point(p):
-        for index, pt in enumerate(points):
-            if tuple(point_pos(pt)) == p:
-                return index
-        assert False, f"Can't find point with pos {p}"
+        assert p in _ppos, f"Can't find point with pos {p}"
+        return _ppos[p]
 
     paths = []
     cnt = 0
@@ -45,20 +51,19 @@ def generate() -> dict:
 
     dest_points = []
     for i, point in enumerate(points):
-        if point_pos(point)[0] >= 12:
+        if point_pos(point)[0] >= size[0] - 1:
             dest_points.append(i)
 
     agvs = []
     cnt = 0
-    for i, point in enumerate(points):
-        if point_pos(point)[0] < 0.5:
-            agvs.append((f"AGV{cnt}", i))
-            cnt += 1
+    for i, point in enumerate(points[:agv_count]):
+        agvs.append((f"AGV{cnt}", i))
+        cnt += 1
 
     shelves = []
     cnt = 0
     for i, point in enumerate(points):
-        if not 2 <= point_pos(point)[0] <= 8:
+        if not 2 <= point_pos(point)[0] <= size[0] - 5:
             continue
         if not int(point_pos(point)[2] % 3) in (1, 2):
             continue
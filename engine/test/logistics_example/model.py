@@ -0,0 +1,683 @@
+import math
+import os
+from enum import Enum
+from typing import Sequence, Optional, Callable, MutableSequence, Any, Collection, Iterator
+
+from sim.simulator import Simulator
+from sim.contents.agent import Agent, PositionalAgent
+from sim.contents.motion_table import MotionTable
+from sim.contents.spatial_index import SpatialIndex
+from sim.data.property import SimInstanceProperty
+from sim.event.event import TimedEvent, ConditionalEventImpl, TimedEventImpl
+from sim.event.wait_for import WaitForGraph
+from sim.routing.cache import RouteCache, Search
+from sim.routing.graph import CSRGraph
+from sim.routing.next_hop import NextHopTable, Router
+from sim.routing.reservation import ReservationTable, CooperativePlanner
+from gdmath import *
+
+import path_find
+
+
+simulator: Simulator = Simulator()
+route_cache = RouteCache()
+reservations = ReservationTable()
+motions = MotionTable()
+wait_for = WaitForGraph(lambda cycle: _resolve_deadlock(cycle))
+# AGVs of the cycles being resolved
+_resolving_deadlocks: set[frozenset["AGV"]] = set()
+# Rotation of the AGVs on every edge of the planner graph, by (from, to) node ids
+_edge_rotations: dict[tuple[int, int], float] = {}
+
+
+def reset_simulator(new_simulator: Optional[Simulator] = None) -> Simulator:
+    """Start over with a new simulator, for running several models one after another in the same process."""
+    global simulator, route_cache, reservations, motions
+    simulator = Simulator() if new_simulator is None else new_simulator
+    route_cache = RouteCache()
+    reservations = ReservationTable()
+    motions = MotionTable()
+    wait_for.clear()
+    wait_for.deadlocks = 0
+    _resolving_deadlocks.clear()
+    _edge_rotations.clear()
+    Point.locked_nodes.clear()
+    return simulator
+
+
+class Point(PositionalAgent):
+    locked_nodes: set[path_find.Node] = set()
+    _locked_by = SimInstanceProperty()
+
+    def __init__(self, name: str, position: Vec3):
+        super().__init__(name, position)
+
+        self.is_dest = False
+
+        self._locked_by: Optional["AGV"] = None
+
+        self.node = path_find.Node(self.position)
+        self.outgoing_paths = []
+
+    @property
+    def locked_by(self) -> Optional["AGV"]:
+        return self._locked_by
+
+    @locked_by.setter
+    def locked_by(self, value: Optional["AGV"]):
+        self._locked_by = value
+        if value is not None:
+            Point.locked_nodes.add(self.node)
+        else:
+            if self.node in Point.locked_nodes:
+                Point.locked_nodes.remove(self.node)
+
+    def find_path(self, connected_to: "Point") -> Optional["Path"]:
+        for path in self.outgoing_paths:
+            if path.end == connected_to:
+                return path
+        return None
+
+class Path(Agent):
+    begin = SimInstanceProperty()
+    end = SimInstanceProperty()
+
+    def __init__(self, name: str, begin: Point, end: Point):
+        super().__init__(name)
+        self.begin = begin
+        self.end = end
+
+        self.begin.node.neighbors.append(self.end.node)
+        self.begin.outgoing_paths.append(self)
+
+
+def update_network(network: Agent):
+    for obj in network.children:
+        if isinstance(obj, Point):
+            obj.node = path_find.Node(obj.position)
+            obj.node.point = obj  # Hacky stuff!
+
+    for obj in network.children:
+        if isinstance(obj, Path):
+            obj.begin.node.neighbors.append(obj.end.node)
+
+
+def normalize_rotation(rot: float) -> float:
+    return rot % (math.pi * 2)
+
+def rotation_diff(a: float, b: float) -> float:
+    d = abs(a - b) % (math.pi * 2)
+    return min(d, math.pi * 2 - d)
+
+
+class AGVState(Enum):
+    IDLE = 0
+    TO_HOME = 1
+    GRAB_SHELF = 2
+    TO_DEST = 3
+    WAITING = 4
+    RETURN_SHELF = 5
+
+class AGV(Agent):
+    state = SimInstanceProperty()
+    home = SimInstanceProperty()
+    point = SimInstanceProperty()
+    destination = SimInstanceProperty()
+    move_event = SimInstanceProperty()
+
+    def __init__(self, name: str, point: Point, rotation: float, color: Any, shelves: Sequence["Shelf"],
+                 planner: Optional[CooperativePlanner] = None, search: Search = path_find.path_find):
+        """
+        :param planner: plan conflict-free timed routes with it instead of locking the next points while driving
+        :param search: finds routes between the nodes of Points, like path_find.path_find
+        """
+        super().__init__(name)
+
+        self.state = AGVState.IDLE
+        self.home = point
+        self.point: Point = point
+        self.point.locked_by = self
+        self.rotation = rotation
+        self.color = color
+        self.destination: Point = point
+        self.path: Optional[MutableSequence[Point]] = None
+        self.move_event: AGVMoveEvent = None
+        self.unblock_wait_event = None
+        self.unblock_timeout_event = None
+        self.arrive_callback = None
+        self.locked_points = [self.point]
+        # First point of the path locked by another AGV, set by update_locked_points()
+        self.blocking_point: Optional[Point] = None
+
+        self.shelves = shelves
+
+        self.planner = planner
+        self.search = search
+        # Planned departure time from every point of the path, with a planner
+        self.departures: Optional[MutableSequence[float]] = None
+        if planner is not None:
+            reservations.reserve(self._node_id(point), simulator.sim_time, math.inf, self)
+
+        # The pose is evaluated from the motion segment in the table, kept up to date with move_event
+        motions.add(self, point.position, rotation, simulator.sim_time)
+        AGV.move_event.watch(self, self._update_motion)
+
+    def _update_motion(self):
+        now = simulator.sim_time
+        event = self.move_event
+        if event is None:
+            motions.stop(self, self.point.position, self.rotation, now)
+        else:
+            motions.move(
+                self, self.point.position, self.rotation, now, event.point.position, event.rotation, event.sim_time
+            )
+
+    @property
+    def transform(self) -> Transform3D:
+        return motions.transform(self, simulator.sim_time)
+
+    @property
+    def position(self) -> Vec3:
+        return motions.position(self, simulator.sim_time)
+
+    @property
+    def shelf(self):
+        children = self.children
+        return children[0] if len(children) > 0 else None
+
+    @shelf.setter
+    def shelf(self, value: "Shelf"):
+        self.clear_child()
+        value.parent = self
+
+    def _clear_unblock_wait_events(self):
+        eq = simulator.event_queue
+        eq.try_remove(self.unblock_wait_event)
+        eq.try_remove(self.unblock_timeout_event)
+        self.unblock_wait_event = None
+        self.unblock_timeout_event = None
+        wait_for.stop_waiting(self)
+
+    def _arm_reroute(self, timeout: float):
+        def timeout_callback(*_):
+            self._clear_unblock_wait_events()
+            # print("Conflict timeout, Rerouting...")
+            self.path = None
+            self.navigate()
+        self.unblock_timeout_event = TimedEventImpl(simulator.sim_time + timeout, timeout_callback)
+        simulator.timers.arm(self.unblock_timeout_event)
+
+    def _set_destination(self, dest: Point, callback: Callable[[], None]):
+        self.destination = dest
+        self.path = None
+        self.arrive_callback = callback
+
+        if self.move_event is None:
+            self._clear_unblock_wait_events()
+            self.navigate()
+
+    def can_do_next_task(self) -> bool:
+        return self.state == AGVState.IDLE or self.state == AGVState.TO_HOME
+
+    def assign_task(self, shelf: "Shelf", dest: Point, finish_callback = lambda a,b: None):
+        assert self.can_do_next_task()
+        self.state = AGVState.GRAB_SHELF
+        def grab_arrived_callback():
+            simulator.schedule(3, grab_done_callback)
+        def grab_done_callback(*_):
+            shelf.parent = self
+            self.state = AGVState.TO_DEST
+            self._set_destination(dest, dest_callback)
+        def dest_callback():
+            wait_time = 16
+            self.state = AGVState.WAITING
+            def put_shelf(*_):
+                shelf.parent = dest
+            def pick_shelf(*_):
+                shelf.parent = self
+            simulator.schedule(3, put_shelf)
+            simulator.schedule(wait_time - 3, pick_shelf)
+            simulator.schedule(wait_time, waiting_complete_callback)
+        def waiting_complete_callback(*_):
+            self.state = AGVState.RETURN_SHELF
+            self._set_destination(shelf.point, return_arrived_callback)
+            shelf.destination = shelf.point
+        def return_arrived_callback():
+            simulator.schedule(3, return_done_callback)
+        def return_done_callback(*_):
+            shelf.parent = shelf.point
+            self.state = AGVState.TO_HOME
+            self._set_destination(self.home, arrived_at_home_callback)
+            finish_callback(shelf, dest)
+        def arrived_at_home_callback():
+            self.state = AGVState.IDLE
+
+        self.state = AGVState.GRAB_SHELF
+        self._set_destination(shelf.parent, grab_arrived_callback)
+
+    def update_locked_points(self, lookahead: int = 2) -> bool:
+        # Points that stay locked are not released in between, so waiters and cached routes only see real changes
+        locked_points = [self.point]
+        success = True
+        self.blocking_point = None
+        if self.path is not None:
+            for i in range(1, lookahead + 1):
+                if len(self.path) > i:
+                    point = self.path[i].point
+                    if point.locked_by is None or point.locked_by is self:
+                        locked_points.append(point)
+                    else:
+                        success = False
+                        if self.blocking_point is None:
+                            self.blocking_point = point
+        for lp in self.locked_points:
+            if lp not in locked_points:
+                lp.locked_by = None
+        for lp in locked_points:
+            if lp.locked_by is not self:
+                lp.locked_by = self
+        self.locked_points[:] = locked_points
+        return success
+
+    def _arrive(self):
+        self.path = None
+        self.move_event = None
+        self.update_locked_points()
+        # Stopping here, the AGVs waiting for this one look for a way around it right away, now that it released the
+        # points ahead of it
+        for waiter in wait_for.waiters_of(self):
+            if waiter.unblock_timeout_event is None:
+                waiter._arm_reroute(0)
+        callback = self.arrive_callback
+        self.arrive_callback = None
+        callback()
+
+    def _move_towards(self, next_point: Point):
+        """Turn towards next_point, or drive to it if already facing it."""
+        direction = (next_point.position - self.point.position).xz
+        next_rotation = normalize_rotation(math.atan2(-direction.y, direction.x))
+        if rotation_diff(next_rotation, self.rotation) < 1e-7:
+            self.move_event = AGVMoveEvent(self, next_point, self.rotation)
+            # print(f"{self.name} moving to {next_point} at {next_point.position}")
+            simulator.event_queue << self.move_event
+            del self.path[0]
+            if self.departures is not None:
+                del self.departures[0]
+        else:
+            if abs(self.rotation - next_rotation) <= math.pi:
+                rot = next_rotation
+            else:
+                if next_rotation < self.rotation:
+                    rot = next_rotation + math.pi * 2
+                else:
+                    rot = next_rotation - math.pi * 2
+            self.move_event = AGVMoveEvent(self, self.point, rot)
+            simulator.event_queue << self.move_event
+
+    def navigate(self):
+        if self.planner is not None:
+            self._navigate_planned()
+            return
+
+        if self.point == self.destination:
+            self._arrive()
+            return
+
+        if self.path is None or False:
+            ignore_nodes = self._ignored_nodes()
+            self.path = self._find_unlocked_path(ignore_nodes)
+            if self.path is None:
+                # print("No valid path considering locked points")
+                self.path = route_cache.find(self.search, self.point.node, self.destination.node, ignore_nodes, False)
+
+            if self.path is not None:
+                self.path = list(self.path)
+
+        if self.path is not None:
+            assert self.path[0] == self.point.node and self.path[-1] == self.destination.node
+
+        locking_succeed = self.update_locked_points()
+
+        if self.path is not None and (next_point := self.path[1].point).locked_by == self and locking_succeed:
+            self._move_towards(next_point)
+        else:
+            self.move_event = None
+            if self.path is None:
+                self._arm_reroute(1)
+                return
+            blocking_point = self.blocking_point
+            holder = blocking_point.locked_by
+            def wait_callback(*_):
+                self._clear_unblock_wait_events()
+                # print("Conflict resolved", self)
+                self.navigate()
+            self.unblock_wait_event = ConditionalEventImpl(
+                lambda: blocking_point.locked_by is not holder,
+                wait_callback,
+                ((blocking_point, "_locked_by"),)
+            )
+            simulator.event_queue << self.unblock_wait_event
+            # Cycles of waiting AGVs are resolved as soon as they close, only a stopped holder needs a timeout
+            if wait_for.wait(self, holder) is None and holder.path is None:
+                self._arm_reroute(5)
+
+    def _ignored_nodes(self) -> set[path_find.Node]:
+        """Nodes this AGV can't drive through, the points of the other shelves while carrying one."""
+        if self.shelf is not None:
+            return {s.parent.node for s in self.shelves if isinstance(s.parent, Point)}
+        return set()
+
+    def _find_unlocked_path(self, ignore_nodes: set[path_find.Node]) -> Optional[Sequence[path_find.Node]]:
+        """Path around the points locked by other AGVs."""
+        return route_cache.find(self.search, self.point.node, self.destination.node, ignore_nodes.union(filter(lambda n: n.point not in self.locked_points, Point.locked_nodes)), True)
+
+    def _take_path(self, path: MutableSequence[path_find.Node]):
+        self._clear_unblock_wait_events()
+        self.path = path
+        self.navigate()
+
+    def _node_id(self, point: Point) -> int:
+        return self.planner.graph.id_of(point)
+
+    def _rotation(self, node: int, next_node: int) -> float:
+        """Rotation of driving from node to next_node, by planner node ids."""
+        rotation = _edge_rotations.get((node, next_node))
+        if rotation is None:
+            p = self.planner.graph.positions
+            # Like the direction in _move_towards, xz of the difference
+            dx = p[3 * next_node] - p[3 * node]
+            dz = p[3 * next_node + 2] - p[3 * node + 2]
+            rotation = normalize_rotation(math.atan2(-dz, dx))
+            _edge_rotations[(node, next_node)] = rotation
+        return rotation
+
+    def _move_duration(self, previous: Optional[int], node: int, next_node: int) -> float:
+        """Time of turning at node towards next_node and driving there, like AGVMoveEvent."""
+        rotation = self.rotation if previous is None else self._rotation(previous, node)
+        turn = rotation_diff(rotation, self._rotation(node, next_node)) / (math.pi * 0.5)
+        return turn + self.planner.graph.distance(node, next_node) / 1.0
+
+    def _navigate_planned(self):
+        """
+        Follow a timed route planned around the reservations of the other AGVs, so there is nothing to wait for
+        but the planned departure times. Locking the next point only guards against AGVs standing where they did
+        not plan to, like ones that found no route.
+        """
+        if self.point == self.destination:
+            self.departures = None
+            self._arrive()
+            return
+
+        now = simulator.sim_time
+        if self.path is None:
+            reservations.release(self)
+            reservations.prune(now)
+            if self.shelf is not None:
+                blocked = {self._node_id(s.parent) for s in self.shelves if isinstance(s.parent, Point)}
+            else:
+                blocked = ()
+            route = self.planner.plan(
+                self._node_id(self.point), self._node_id(self.destination), now, self, blocked, self._move_duration
+            )
+            if route is None:
+                reservations.reserve(self._node_id(self.point), now, math.inf, self)
+            else:
+                self.planner.reserve(route, self)
+                points = self.planner.graph.objects
+                self.path = [points[node].node for node, _, _ in route]
+                self.departures = [departure for _, _, departure in route]
+
+        self.move_event = None
+        locking_succeed = self.update_locked_points(1)
+        if self.path is None or not locking_succeed:
+            def retry_callback(*_):
+                self._clear_unblock_wait_events()
+                self.path = None
+                self.navigate()
+            self.unblock_timeout_event = TimedEventImpl(now + 1, retry_callback)
+            simulator.timers.arm(self.unblock_timeout_event)
+        elif self.departures[0] > now + 1e-9:
+            def depart_callback(*_):
+                self.unblock_timeout_event = None
+                self.navigate()
+            self.unblock_timeout_event = TimedEventImpl(self.departures[0], depart_callback)
+            simulator.timers.arm(self.unblock_timeout_event)
+        else:
+            self._move_towards(self.path[1].point)
+
+
+def _resolve_deadlock(cycle: Sequence[AGV]):
+    """
+    Break a cycle of AGVs waiting for each other as soon as it closes: the first one that has a path around the locked
+    points takes it, otherwise the first one that can backs off to a free neighbouring point. The candidates are the
+    members of the cycle, then the AGVs queued up behind it, nearest first: when the cycle is boxed in, one of them
+    making room is what frees it. Nothing else is touched. While no candidate can move, this is tried again whenever
+    a wait-for edge of a member changes (including an AGV joining or leaving the queue) or a point next to a member
+    is locked or released, until the cycle is gone.
+    """
+    cycle = list(cycle)
+    members = frozenset(cycle)
+    if members in _resolving_deadlocks:
+        return
+    _resolving_deadlocks.add(members)
+    # The members don't move while the cycle lasts
+    neighbours = {path.end for agv in cycle for path in agv.point.outgoing_paths}
+    pending = None
+
+    def act():
+        # The cycle, then the AGVs waiting for it, nearest first
+        candidates = list(cycle)
+        for agv in candidates:
+            for waiter in wait_for.waiters_of(agv):
+                if waiter not in candidates:
+                    candidates.append(waiter)
+        for agv in candidates:
+            path = agv._find_unlocked_path(agv._ignored_nodes())
+            if path is not None:
+                agv._take_path(list(path))
+                return
+        for agv in candidates:
+            ignore_nodes = agv._ignored_nodes()
+            for out_path in agv.point.outgoing_paths:
+                point = out_path.end
+                if point.locked_by is None and point.node not in ignore_nodes:
+                    path = agv.search(point.node, agv.destination.node, ignore_nodes)
+                    if path is not None:
+                        agv._take_path([agv.point.node, *path])
+                        return
+
+    def resolve(*_):
+        nonlocal pending
+        pending = None
+        for i, agv in enumerate(cycle):
+            if wait_for.holder_of(agv) is not cycle[(i + 1) % len(cycle)]:
+                _resolving_deadlocks.discard(members)
+                for member in cycle:
+                    wait_for.unwatch(member, changed)
+                for point in neighbours:
+                    Point._locked_by.unwatch(point, changed)
+                return
+        act()
+
+    def changed():
+        # Resolve once the event that made the change is done, the AGVs involved may be in the middle of navigate()
+        nonlocal pending
+        if pending is None:
+            pending = simulator.schedule(0, resolve)
+
+    for agv in cycle:
+        wait_for.watch(agv, changed)
+    for point in neighbours:
+        Point._locked_by.watch(point, changed)
+    changed()
+
+
+class AGVMoveEvent(TimedEvent):
+    def __init__(self, agv: "AGV", point: Point, rotation: float):
+        if agv.point != point:
+            t = (agv.position | point.position) / 1.0
+        else:
+            t = abs(agv.rotation - rotation) / (math.pi * 0.5)
+        super().__init__(simulator.sim_time + t)
+        self.agv = agv
+        self.point = point
+        self.rotation = rotation
+
+    def execute(self, _: Simulator) -> None:
+        self.agv.point = self.point
+        self.agv.rotation = normalize_rotation(self.rotation)
+        self.agv.navigate()
+
+
+class Shelf(Agent):
+    point = SimInstanceProperty()
+
+    def __init__(self, name: str, point: Point):
+        super().__init__(name)
+        self.point = point
+        self.parent = point
+        self.destination = point
+
+
+class SourceEvent(TimedEvent):
+    def __init__(self, agvs: Sequence[AGV], shelves: Sequence[Shelf], dest_points: Sequence[Point],
+                 agv_index: SpatialIndex):
+        """
+        :param agv_index: index of the AGVs, ranking them by AGV.position
+        """
+        super().__init__(0)
+        self.agvs = agvs
+        self.agv_index = agv_index
+        self.shelves = shelves
+        self.dest_points = dest_points
+        self._unassigned_shelves = list(self.shelves)
+        self.completed_tasks = 0
+
+    def execute(self, simulator: Simulator) -> None:
+        dest_points = list(self.dest_points)
+        for shelf in self.shelves:
+            if shelf.destination in dest_points:
+                dest_points.remove(shelf.destination)
+
+        if dest_points and self._unassigned_shelves:
+            shelf = simulator.random.choice(self._unassigned_shelves)
+            nearest = self.agv_index.nearest(
+                shelf.global_position, 1, lambda a: a.can_do_next_task() and a.shelf is None
+            )
+            if nearest:
+                dest = simulator.random.choice(dest_points)
+                shelf.destination = dest
+                self._unassigned_shelves.remove(shelf)
+                nearest[0].assign_task(shelf, dest, self._task_finished)
+            else:
+                pass
+                # print("No free AGVs found, skipping a task!")
+
+        self.sim_time += .05
+        simulator.event_queue << self
+
+    def _task_finished(self, shelf: Shelf, _):
+        self._unassigned_shelves.append(shelf)
+        self.completed_tasks += 1
+
+
+class _BlockedIds:
+    """The CSR ids of a collection of Point nodes, for the membership tests of the routing searches."""
+
+    __slots__ = "search", "blocked"
+
+    def __init__(self, search: "RouterSearch", blocked: Collection[path_find.Node]):
+        self.search = search
+        self.blocked = blocked
+
+    def __contains__(self, i: int) -> bool:
+        return self.search.nodes[i] in self.blocked
+
+    def __iter__(self) -> Iterator[int]:
+        ids = self.search.ids
+        return (ids[node] for node in self.blocked)
+
+    def __len__(self) -> int:
+        return len(self.blocked)
+
+
+class RouterSearch:
+    """
+    A Search between Point nodes, like path_find.path_find, answered by a Router on the CSRGraph of the network:
+    from its next hop table while the shortest route is free, with A* otherwise.
+    """
+
+    def __init__(self, router: Router):
+        self.router = router
+        graph = router.graph
+        # Point nodes by CSR id and the other way round
+        self.nodes = [point.node for point in graph.objects]
+        self.ids = {node: i for i, node in enumerate(self.nodes)}
+
+    def __call__(self, begin: path_find.Node, end: path_find.Node,
+                 ignore_nodes: Collection[path_find.Node] = ()) -> Optional[Sequence[path_find.Node]]:
+        route = self.router.find(self.ids[begin], self.ids[end], _BlockedIds(self, ignore_nodes))
+        if route is None:
+            return None
+        nodes = self.nodes
+        return [nodes[i] for i in route]
+
+
+class LogisticsModel:
+    """The logistics network, shelves and AGVs described by a config from config_generator, without any frontend."""
+
+    def __init__(self, cfg: dict, cooperative: bool = False, route_tables: Optional[str | os.PathLike] = None):
+        """
+        :param cooperative: AGVs plan conflict-free routes in a shared ReservationTable instead of locking points
+            as they go
+        :param route_tables: directory of the next hop tables written by precompute_routes.py, AGVs locking points
+            route from the table of the network, which is computed and written there first if it is missing
+        """
+        self.root = Agent("Root")
+
+        self.network = Agent("Network")
+        self.network.parent = self.root
+
+        points = []
+        for point in cfg["network"]["points"]:
+            p = Point(point[0], Vec3(*point[1]))
+            p.parent = self.network
+            points.append(p)
+        self.points = points
+
+        self.dest_points = []
+        for dest in cfg["dest_points"]:
+            points[dest].is_dest = True
+            self.dest_points.append(points[dest])
+
+        for path in cfg["network"]["paths"]:
+            Path(path[0], points[path[1]], points[path[2]]).parent = self.network
+
+        update_network(self.network)
+
+        graph = CSRGraph.from_network(self.network) if cooperative or route_tables is not None else None
+        self.planner = None
+        if cooperative:
+            self.planner = CooperativePlanner(graph, reservations)
+        self.search: Search = path_find.path_find
+        if route_tables is not None:
+            self.search = RouterSearch(Router(graph, NextHopTable.for_graph(graph, route_tables)))
+
+        self.shelves = []
+        for shelf in cfg["shelves"]:
+            self.shelves.append(Shelf(shelf[0], points[shelf[1]]))
+
+        self.agvs = Agent("AGVs")
+        self.agvs.parent = self.root
+        for params in cfg["agvs"]:
+            AGV(params[0], points[params[1]], 0, None, self.shelves, self.planner, self.search).parent = self.agvs
+
+        # AGVs are indexed at their point, while driving they are at most one path away from it
+        slack = max((path.begin.position | path.end.position for path in self.network.children
+                     if isinstance(path, Path)), default=0.0)
+        agv_index = SpatialIndex(slack=slack, position_func=lambda agv: agv.position)
+        for agv in self.agvs.children:
+            agv_index.watch(agv, "point", lambda agv=agv: agv.point.position)
+
+        self.source_event = SourceEvent(list(self.agvs.children), self.shelves, self.dest_points, agv_index)
+        simulator.event_queue << self.source_event
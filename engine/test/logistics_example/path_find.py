@@ -1,9 +1,13 @@
 from typing import Optional, Sequence, Collection, Iterable
-from bisect import insort_left
+from heapq import heappush, heappop
 
 from gdmath import *
 
 
+# Incremented for every search, node state stamped with an older search is stale
+_search = 0
+
+
 class Node:
     def __init__(self, pos: Vec3):
         self.pos = pos
@@ -11,50 +15,63 @@ class Node:
         self.parent: Optional[Node] = None
         self.h_cost: Optional[float] = None
         self.g_cost: Optional[float] = None
+        # Search that set parent, h_cost and g_cost, and the search that closed the node
+        self.search = 0
+        self.closed = 0
 
 
 def path_find(begin: Node, end: Node, ignore_nodes: Collection[Node] = ()) -> Optional[Iterable[Node]]:
-    opened = [begin]
-    closed = set()
-
-    while len(opened) > 0:
-        current = opened.pop(0)
-
-        if current == end:
+    """
+    A* from begin to end with the distance between the nodes as the cost, avoiding ignore_nodes.
+    Among open nodes of equal cost the most recently opened one is expanded first.
+    :return: the nodes of the path, begin and end included, or None if end can't be reached
+    """
+    global _search
+    _search += 1
+    search = _search
+    end_pos = end.pos
+
+    begin.search = search
+    begin.parent = None
+    begin.g_cost = 0.0
+    begin.h_cost = begin.pos | end_pos
+    # Entries are (f cost, -push count, node), the push count makes ties LIFO
+    opened = [(begin.h_cost, 0, begin)]
+    pushes = 0
+
+    while opened:
+        f_cost, _, current = heappop(opened)
+        if current.closed == search or f_cost > current.g_cost + current.h_cost:
+            # Already expanded, or superseded by a cheaper entry
+            continue
+
+        if current is end:
             path = [current]
             while (current := current.parent) is not None:
                 path.append(current)
-
-            for node in opened:
-                node.parent = None
-            for node in closed:
-                node.parent = None
-
             return reversed(path)
 
-        closed.add(current)
+        current.closed = search
+        current_pos = current.pos
+        current_g_cost = current.g_cost
 
         for neighbor in current.neighbors:
-            if neighbor in ignore_nodes or neighbor in closed:
+            if neighbor.search != search:
+                if neighbor in ignore_nodes:
+                    continue
+                neighbor.search = search
+                neighbor.h_cost = neighbor.pos | end_pos
+                g_cost = current_g_cost + (neighbor.pos | current_pos)
+            elif neighbor.closed == search:
                 continue
-
-            neighbor_open = neighbor in opened
-
-            g_cost = neighbor.pos | current.pos
-            node = current
-            while node.parent is not None:
-                g_cost += node.pos | node.parent.pos
-                node = node.parent
-
-            if not neighbor_open or g_cost < neighbor.g_cost:
-                neighbor.h_cost = neighbor.pos | end.pos
-                neighbor.g_cost = g_cost
-                neighbor.parent = current
-                if not neighbor_open:
-                    insort_left(opened, neighbor, key=lambda n: n.h_cost + n.g_cost)
-                    opened.append(neighbor)
-
-    for node in closed:
-        node.parent = None
+            else:
+                g_cost = current_g_cost + (neighbor.pos | current_pos)
+                if g_cost >= neighbor.g_cost:
+                    continue
+
+            neighbor.g_cost = g_cost
+            neighbor.parent = current
+            pushes += 1
+            heappush(opened, (g_cost + neighbor.h_cost, -pushes, neighbor))
 
     return None
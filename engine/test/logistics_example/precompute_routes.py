@@ -0,0 +1,29 @@
+import json
+import pathlib
+import sys
+
+from sim.routing.graph import CSRGraph
+from sim.routing.next_hop import NextHopTable
+
+from model import LogisticsModel
+
+
+CACHE_DIR = pathlib.Path(__file__).parent / "route_tables"
+
+
+def main():
+    """
+    Compute the next hop table of the network in a config file (cfg.json by default) into route_tables/, where main.py
+    loads it from instead of computing it on startup.
+    """
+    cfg_path = sys.argv[1] if len(sys.argv) > 1 else "cfg.json"
+    with open(cfg_path, "r") as f:
+        cfg = json.loads(f.read())
+    graph = CSRGraph.from_network(LogisticsModel(cfg).network)
+    table = NextHopTable.for_graph(graph, CACHE_DIR)
+    print(f"{table.path} ({graph.node_count} points, {table.path.stat().st_size / 2 ** 20:.1f} MiB)")
+    table.close()
+
+
+if __name__ == '__main__':
+    main()